@@ -2,43 +2,140 @@
 """
 Master Fix Execution Script
 ============================
-Executes all validation fixes in sequence.
+Executes all validation fixes as a dependency graph of phases.
 
 Author: Python Agent Beta-2
 Purpose: Orchestrate all fix phases
 """
 
-import subprocess
+import argparse
+import json
 import sys
-from pathlib import Path
 from datetime import datetime
+from pathlib import Path
 
-
-def run_script(script_name, description):
-    """Run a Python script and display results."""
-
-    print("\n" + "█"*80)
-    print(f"█  {description}")
-    print("█"*80 + "\n")
-
-    try:
-        result = subprocess.run(
-            [sys.executable, script_name],
-            capture_output=False,
-            text=True,
-            check=True
-        )
-        print(f"\n✅ {description} - COMPLETE\n")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"\n❌ {description} - FAILED\n")
-        print(f"Error: {e}")
-        return False
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / 'database' / 'scripts'))
+
+from pricelist.pipeline import Pipeline, phase
+from pricelist.readers import read_excel
+from pricelist.rules import RuleSet, rule
+
+BASE_PATH = Path("/mnt/k/00Project/MantisNXT")
+UPLOADS = BASE_PATH / "database" / "Uploads"
+
+# Source workbooks and their fixed counterparts
+BATCH1 = UPLOADS / "Consolidated_Supplier_Data_BATCH1.xlsx"
+BATCH2 = UPLOADS / "Consolidated_Supplier_Data_Batch2.xlsx"
+BATCH3 = UPLOADS / "Consolidated_Batch3_Final.xlsx"
+BATCH1_FIXED = UPLOADS / "Consolidated_Supplier_Data_BATCH1_FIXED.xlsx"
+BATCH2_FIXED = UPLOADS / "Consolidated_Supplier_Data_Batch2_FIXED.xlsx"
+BATCH3_FIXED = UPLOADS / "Consolidated_Batch3_Final_FIXED.xlsx"
+FIXED_FILES = [BATCH1_FIXED, BATCH2_FIXED, BATCH3_FIXED]
+
+# Run state (input/output hashes of the last successful run per phase)
+STATE_DIR = UPLOADS / ".fix_pipeline"
+
+# Phase 4 report on the FIXED workbooks
+REVALIDATION_REPORT = UPLOADS / "fixed_files_validation.json"
+
+# Columns every FIXED supplier sheet must have for the Master aggregation
+MASTER_COLUMNS = [
+    'Supplier Name ', 'Supplier Code', 'Produt Category', 'BRAND', 'Brand Sub Tag',
+    'SKU / MODEL ', 'PRODUCT DESCRIPTION', 'SUPPLIER SOH', 'COST  EX VAT',
+    'QTY ON ORDER', 'NEXT SHIPMENT', 'Tags', 'LINKS'
+]
+SKIP_SHEETS = {'MASTER', 'All_Products', 'Processing_Log'}
+
+# Errors are what phases 1 and 2 are meant to fix; warnings are reported only
+FIXED_RULES = RuleSet([
+    rule('missing_supplier_name', 'Supplier Name ', 'required'),
+    rule('missing_supplier_code', 'Supplier Code', 'required'),
+    rule('missing_description', 'PRODUCT DESCRIPTION', 'required', severity='warning'),
+    rule('non_numeric_price', 'COST  EX VAT', 'numeric', severity='warning'),
+    rule('negative_price', 'COST  EX VAT', 'non_negative', severity='warning'),
+    rule('sku_coverage', 'SKU / MODEL ', 'coverage', min_ratio=0.5, severity='warning'),
+    rule('price_coverage', 'COST  EX VAT', 'coverage', min_ratio=0.8, severity='warning'),
+])
+SEVERITY = {spec['code']: spec['severity'] for spec in FIXED_RULES.row_rules + FIXED_RULES.dataset_rules}
+
+
+def build_phases():
+    """Fix phases; dependencies follow from which phase writes which file."""
+
+    fix_columns = BASE_PATH / "fix_column_names_batch1_batch3.py"
+    fix_metadata = BASE_PATH / "fix_supplier_metadata_batch2.py"
+    rockit = BASE_PATH / "analyze_rockit_duplicates.py"
+    this_script = Path(__file__).resolve()
+
+    return [
+        # Phase 1 and 2 touch different batches and run side by side
+        phase('column_names', [fix_columns],
+              inputs=[fix_columns, BATCH1, BATCH3], outputs=[BATCH1_FIXED, BATCH3_FIXED],
+              description="PHASE 1: Column Name Standardization (Batch 1 & 3)"),
+        phase('supplier_metadata', [fix_metadata],
+              inputs=[fix_metadata, BATCH2], outputs=[BATCH2_FIXED],
+              description="PHASE 2: Supplier Metadata Population (Batch 2)"),
+        phase('rockit_duplicates', [rockit],
+              inputs=[rockit, BATCH2_FIXED],
+              description="PHASE 3: Rockit Duplicate Analysis"),
+        # Phase 4 waits for every fixed file and validates exactly those
+        phase('revalidation', [this_script, '--revalidate', *FIXED_FILES],
+              inputs=[this_script, *FIXED_FILES], outputs=[REVALIDATION_REPORT],
+              description="PHASE 4: Re-validation on Fixed Files"),
+    ]
+
+
+def revalidate(paths, report_file=REVALIDATION_REPORT):
+    """Check every supplier sheet of the FIXED workbooks; exit status 1 on any error"""
+    sheets = []
+    for path in paths:
+        frames = read_excel(path, sheet_name=None)
+        for name, df in frames.items():
+            if name in SKIP_SHEETS:
+                continue
+
+            result = FIXED_RULES.evaluate(df)
+            failed = {code: count for code, count in result['counts'].items()
+                      if count and (code not in result['coverage'] or not result['coverage'][code]['passed'])}
+            errors = {code: count for code, count in failed.items() if SEVERITY[code] == 'error'}
+            if list(df.columns) != MASTER_COLUMNS:
+                errors['column_mismatch'] = len(df)
+
+            sheets.append({
+                'file': str(path),
+                'sheet': name,
+                'rows': result['rows'],
+                'errors': errors,
+                'warnings': {code: count for code, count in failed.items() if code not in errors}
+            })
+            status = '❌' if errors else '⚠️ ' if len(failed) > len(errors) else '✅'
+            print(f"  {status} {Path(path).name} [{name}]: {result['rows']:,} rows"
+                  + (f", errors {errors}" if errors else ''))
+
+    failures = [s for s in sheets if s['errors']]
+    Path(report_file).write_text(json.dumps({
+        'validated_at': datetime.now().isoformat(timespec='seconds'),
+        'sheets': sheets,
+        'failed_sheets': len(failures)
+    }, indent=2), encoding='utf-8')
+    print(f"\n{len(sheets) - len(failures)}/{len(sheets)} sheets passed; report: {report_file}")
+    return 1 if failures or not sheets else 0
 
 
 def main():
     """Execute all fix phases."""
 
+    parser = argparse.ArgumentParser(description="Run the supplier data fix phases")
+    parser.add_argument('--force', action='store_true', help='Re-run phases even if their inputs are unchanged')
+    parser.add_argument('--only', nargs='+', help='Run only these phases (and stale dependencies)')
+    parser.add_argument('--workers', type=int, default=2, help='Phases run in parallel (default: 2)')
+    parser.add_argument('--revalidate', nargs='+', metavar='WORKBOOK',
+                        help='Only validate these FIXED workbooks (the phase 4 command)')
+    args = parser.parse_args()
+
+    if args.revalidate:
+        return revalidate(args.revalidate)
+
     start_time = datetime.now()
 
     print("\n" + "="*80)
@@ -47,45 +144,8 @@ def main():
     print(f"Started: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*80)
 
-    base_path = Path("/mnt/k/00Project/MantisNXT")
-
-    # Phase 1: Fix column names in Batch 1 and Batch 3
-    success_phase1 = run_script(
-        base_path / "fix_column_names_batch1_batch3.py",
-        "PHASE 1: Column Name Standardization (Batch 1 & 3)"
-    )
-
-    if not success_phase1:
-        print("\n❌ Phase 1 failed. Stopping execution.")
-        return
-
-    # Phase 2: Populate supplier metadata in Batch 2
-    success_phase2 = run_script(
-        base_path / "fix_supplier_metadata_batch2.py",
-        "PHASE 2: Supplier Metadata Population (Batch 2)"
-    )
-
-    if not success_phase2:
-        print("\n❌ Phase 2 failed. Stopping execution.")
-        return
-
-    # Phase 3: Analyze Rockit duplicates
-    success_phase3 = run_script(
-        base_path / "analyze_rockit_duplicates.py",
-        "PHASE 3: Rockit Duplicate Analysis"
-    )
-
-    # Phase 4: Re-run validation on fixed files
-    print("\n" + "█"*80)
-    print("█  PHASE 4: Re-validation on Fixed Files")
-    print("█"*80 + "\n")
-
-    print("⏳ Re-running comprehensive validation...")
-    print("   This will validate the *_FIXED.xlsx files\n")
-
-    # Note: This would require updating comprehensive_data_validation.py to check FIXED files
-    print("⚠️  Manual step: Update comprehensive_data_validation.py to validate FIXED files")
-    print("   Then run: python3 comprehensive_data_validation.py\n")
+    pipeline = Pipeline(build_phases(), STATE_DIR, max_workers=args.workers)
+    results = pipeline.run(force=args.force, only=args.only)
 
     # Summary
     end_time = datetime.now()
@@ -94,18 +154,26 @@ def main():
     print("\n" + "="*80)
     print("FIX ORCHESTRATION COMPLETE")
     print("="*80)
-    print(f"Total Duration: {duration:.1f} seconds")
-    print(f"\nFixed Files Created:")
-    print(f"  1. /database/Uploads/Consolidated_Supplier_Data_BATCH1_FIXED.xlsx")
-    print(f"  2. /database/Uploads/Consolidated_Supplier_Data_Batch2_FIXED.xlsx")
-    print(f"  3. /database/Uploads/Consolidated_Batch3_Final_FIXED.xlsx")
+    print(f"Total Duration: {duration:.1f} seconds\n")
+
+    icons = {'ran': '✅', 'skipped': '⏭️ ', 'failed': '❌', 'blocked': '⛔'}
+    for name in pipeline.order:
+        if name in results:
+            result = results[name]
+            detail = result.get('reason') or (f"{result['duration']:.1f}s" if 'duration' in result else '')
+            print(f"  {icons[result['status']]} {name:.<30} {result['status']:<8} {detail}")
+
+    print(f"\nFixed Files:")
+    for path in FIXED_FILES:
+        print(f"  {'✅' if path.exists() else '❌'} {path}")
     print(f"\nNext Steps:")
     print(f"  1. Review Rockit duplicate analysis")
     print(f"  2. Decide on deduplication strategy")
-    print(f"  3. Re-run validation on FIXED files")
-    print(f"  4. Proceed to Master aggregation")
+    print(f"  3. Proceed to Master aggregation")
     print("="*80 + "\n")
 
+    return 1 if any(r['status'] in ('failed', 'blocked') for r in results.values()) else 0
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
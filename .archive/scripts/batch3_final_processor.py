@@ -8,9 +8,13 @@ import pandas as pd
 import openpyxl
 from pathlib import Path
 import re
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'database' / 'scripts'))
+from pricelist.readers import read_excel
+
 # Master columns
 MASTER_COLUMNS = [
     'Supplier Name', 'Supplier Code', 'Product Category', 'BRAND',
@@ -60,7 +64,7 @@ def process_stage_audio_works():
     print("="*80)
     
     file_path = SOURCE_DIR / 'Stage Audio Works SOH info_20250826_0247.xlsx'
-    df = pd.read_excel(file_path, sheet_name='Data')
+    df = read_excel(file_path, sheet_name='Data')
     
     print(f"Read {len(df)} rows")
     print(f"Columns: {list(df.columns)}")
@@ -93,7 +97,7 @@ def process_stage_one():
     print("="*80)
     
     file_path = SOURCE_DIR / 'Stage one FullPL-DP (7).xlsx'
-    df = pd.read_excel(file_path, header=1)  # Headers at row 2
+    df = read_excel(file_path, header=1)  # Headers at row 2
     
     print(f"Read {len(df)} rows")
     print(f"Columns: {list(df.columns)}")
@@ -129,7 +133,7 @@ def process_sonic_informed():
     print("="*80)
     
     file_path = SOURCE_DIR / 'SonicInformed_20250808_I.xlsx'
-    df = pd.read_excel(file_path, sheet_name='ALL')
+    df = read_excel(file_path, sheet_name='ALL')
     
     print(f"Read {len(df)} rows")
     
@@ -164,7 +168,7 @@ def process_viva_afrika():
     print("="*80)
     
     file_path = SOURCE_DIR / 'Viva Afrika Dealer Price List 07 May 2025.xlsx'
-    df = pd.read_excel(file_path, header=3)  # Data starts after header rows
+    df = read_excel(file_path, header=3)  # Data starts after header rows
     
     print(f"Read {len(df)} rows")
     print(f"Columns: {list(df.columns)}")
@@ -204,14 +208,14 @@ def process_yamaha():
     
     for sheet in sheets:
         try:
-            df = pd.read_excel(file_path, sheet_name=sheet, header=None)
+            df = read_excel(file_path, sheet_name=sheet, header=None)
             
             # Find data start
             for start_row in range(10):
                 test_val = df.iloc[start_row, 0] if len(df) > start_row else None
                 if pd.notna(test_val) and str(test_val).upper() not in ['GLOBAL', 'DEALER', 'PRICING', 'NAN']:
                     # Found data
-                    df_data = pd.read_excel(file_path, sheet_name=sheet, header=start_row)
+                    df_data = read_excel(file_path, sheet_name=sheet, header=start_row)
                     
                     for _, row in df_data.iterrows():
                         sku = str(row.iloc[0]) if pd.notna(row.iloc[0]) else ''
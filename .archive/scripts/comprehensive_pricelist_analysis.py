@@ -7,9 +7,14 @@ import os
 import pandas as pd
 import json
 from pathlib import Path
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'database' / 'scripts'))
+from pricelist.readers import read_excel
+
+
 def find_header_row(df, max_check_rows=5):
     """Find the row that contains the actual column headers."""
     for i in range(min(max_check_rows, len(df))):
@@ -26,13 +31,13 @@ def analyze_excel_file_smart(file_path):
     """Analyze Excel file with smart header detection."""
     try:
         # Read a larger sample to find headers
-        df_sample = pd.read_excel(file_path, nrows=10, header=None)
+        df_sample = read_excel(file_path, nrows=10, header=None)
 
         # Find header row
         header_row = find_header_row(df_sample)
 
         # Read again with correct header
-        df = pd.read_excel(file_path, header=header_row, nrows=15)
+        df = read_excel(file_path, header=header_row, nrows=15)
 
         # Clean column names
         columns = []
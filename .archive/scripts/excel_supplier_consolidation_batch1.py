@@ -10,9 +10,14 @@ from openpyxl import load_workbook, Workbook
 from openpyxl.utils.dataframe import dataframe_to_rows
 import os
 import re
+import sys
 from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'database' / 'scripts'))
+from pricelist.ids import product_ids
+from pricelist.readers import read_excel
+
 # Master template columns (13 columns - EXACT ORDER)
 MASTER_COLUMNS = [
     'Supplier Name',
@@ -87,12 +92,13 @@ def extract_supplier_name(filename):
 
     return name
 
-def generate_supplier_code(supplier_name, index=1):
-    """Generate supplier code from supplier name"""
-    # Take first letters of each word, remove spaces
-    code_parts = ''.join([word[0].upper() for word in supplier_name.split() if word])
-    code = f"{code_parts}-{index:03d}"
-    return code
+def generate_supplier_code(df, supplier_name):
+    """
+    Generate stable supplier codes for every row.
+    Derived from supplier + SKU (description when SKU is blank), so codes
+    do not change when rows are added or reordered.
+    """
+    return product_ids(supplier_name, df['SKU / MODEL'], df['PRODUCT DESCRIPTION'])
 
 def analyze_excel_file(filepath):
     """
@@ -216,10 +222,7 @@ def transform_to_master_format(df, supplier_name, column_mapping):
 
     # Generate supplier codes if not mapped
     if 'Supplier Code' not in column_mapping or master_df['Supplier Code'].isna().all():
-        master_df['Supplier Code'] = [
-            generate_supplier_code(supplier_name, i+1)
-            for i in range(len(master_df))
-        ]
+        master_df['Supplier Code'] = generate_supplier_code(master_df, supplier_name)
 
     # Clean numeric columns
     if 'COST EX VAT' in master_df.columns:
@@ -267,7 +270,7 @@ def process_supplier_file(filepath, master_workbook):
     print(f"\nUsing sheet: {data_sheet['name']} ({data_sheet['rows']} rows)")
 
     # Read the data
-    df = pd.read_excel(filepath, sheet_name=data_sheet['name'])
+    df = read_excel(filepath, sheet_name=data_sheet['name'])
 
     print(f"Read {len(df)} rows with {len(df.columns)} columns")
 
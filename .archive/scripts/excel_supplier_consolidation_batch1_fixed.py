@@ -10,6 +10,14 @@ from openpyxl import load_workbook, Workbook
 from openpyxl.utils.dataframe import dataframe_to_rows
 import os
 import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'database' / 'scripts'))
+from pricelist.ids import product_ids
+from pricelist.planner import load_sheet
+from pricelist.readers import read_excel
+from pricelist.workbook import locate_header, map_sheets, promote_header, read_all_sheets
 
 # Master template columns
 MASTER_COLUMNS = [
@@ -45,10 +53,9 @@ def extract_supplier_name(filename):
     name = ' '.join(word.capitalize() for word in name.split())
     return name
 
-def generate_supplier_code(supplier_name, row_num):
-    """Generate supplier code"""
-    code_parts = ''.join([word[0].upper() for word in supplier_name.split() if word])
-    return f"{code_parts}-{row_num:04d}"
+def generate_supplier_code(df, supplier_name):
+    """Stable supplier codes derived from supplier + SKU (description when SKU is blank)"""
+    return product_ids(supplier_name, df['SKU / MODEL'], df['PRODUCT DESCRIPTION'])
 
 # ====================================================================================
 # SUPPLIER-SPECIFIC PROCESSORS
@@ -58,7 +65,7 @@ def process_active_music(filepath, supplier_name):
     """Active Music Distribution - Single column price list"""
     print(f"Processing {supplier_name} with custom handler...")
 
-    df = pd.read_excel(filepath, sheet_name='August Pricelist v3', header=None)
+    df = read_excel(filepath, sheet_name='August Pricelist v3', header=None)
 
     # Extract data - appears to be in first column after header
     rows = []
@@ -73,7 +80,6 @@ def process_active_music(filepath, supplier_name):
         if desc and desc != 'nan':
             rows.append({
                 'Supplier Name': supplier_name,
-                'Supplier Code': generate_supplier_code(supplier_name, len(rows) + 1),
                 'PRODUCT DESCRIPTION': desc,
                 'COST EX VAT': price
             })
@@ -81,110 +87,110 @@ def process_active_music(filepath, supplier_name):
     result_df = pd.DataFrame(rows, columns=MASTER_COLUMNS)
     return result_df
 
-def process_av_distribution(filepath, supplier_name):
-    """AV Distribution - Multi-brand sheets"""
-    print(f"Processing {supplier_name} with custom handler...")
+AV_SKIP_SHEETS = ['Disclaimer ', 'Front Page']
+ALPHA_SKIP_SHEETS = ['Front Page']
+ALPHA_SKIP_MARKERS = ['Click on model']
+ALPHA_SKIP_UPPER_MARKERS = ['EQUIPMENT', 'PROCESSORS', 'EXCL VAT']
+
+def _sheet_column(df, name=None, position=None):
+    """Column by name or position, or an all-missing column if absent"""
+    if name is not None and name in df.columns:
+        return df[name]
+    if position is not None and position < df.shape[1]:
+        return df.iloc[:, position]
+    return pd.Series(None, index=df.index, dtype=object)
+
+def _text(series, missing=''):
+    """str() every value, mapping missing values to ``missing``"""
+    return series.where(series.notna(), missing).map(str)
+
+def _brand_rows(brand, sku, desc, price, keep):
+    """Assemble master-format rows for one brand sheet"""
+    rows = pd.DataFrame({
+        'BRAND': brand,
+        'SKU / MODEL': sku[keep].values,
+        'PRODUCT DESCRIPTION': desc[keep].values,
+        'COST EX VAT': price[keep].values
+    })
+    return rows.reindex(columns=MASTER_COLUMNS)
+
+def _finish_brand_rows(sheet_frames, supplier_name):
+    """Concatenate per-sheet rows in workbook order"""
+    frames = [df for df in sheet_frames.values() if len(df)]
+    if not frames:
+        return pd.DataFrame(columns=MASTER_COLUMNS)
+
+    result_df = pd.concat(frames, ignore_index=True)
+    result_df['Supplier Name'] = supplier_name
+    return result_df
 
-    all_rows = []
-    wb = load_workbook(filepath, read_only=True, data_only=True)
+def _av_distribution_sheet(sheet_name, raw):
+    """Transform one AV Distribution brand sheet (raw frame, header located in memory)"""
+    header_row = locate_header(raw, ['SAP Item Code', 'Description'])
+    if header_row is None:
+        return pd.DataFrame(columns=MASTER_COLUMNS)
 
-    # Process each brand sheet
-    for sheet_name in wb.sheetnames:
-        if sheet_name in ['Disclaimer ', 'Front Page']:
-            continue
+    df = promote_header(raw, header_row)
 
-        df = pd.read_excel(filepath, sheet_name=sheet_name)
+    # Missing columns yield '' (kept), missing cells yield 'nan' (skipped)
+    sku = _text(_sheet_column(df, 'SAP Item Code'), 'nan') if 'SAP Item Code' in df.columns else pd.Series('', index=df.index)
+    desc = _text(_sheet_column(df, 'Description'), 'nan') if 'Description' in df.columns else pd.Series('', index=df.index)
+    price = _sheet_column(df, 'Retail Price (Ex VAT)')
 
-        # Find header row - look for "SAP Item Code" or similar
-        header_row = None
-        for idx, row in df.iterrows():
-            if 'SAP Item Code' in str(row.values) or 'Description' in str(row.values):
-                header_row = idx
-                break
+    keep = (sku != 'nan') & (desc != 'nan')
+    return _brand_rows(sheet_name, sku, desc, price, keep)
 
-        if header_row is None:
-            continue
+def _alpha_technologies_sheet(sheet_name, raw):
+    """Transform one Alpha Technologies brand sheet (header in row 2)"""
+    if len(raw) < 2:
+        return pd.DataFrame(columns=MASTER_COLUMNS)
 
-        # Re-read with correct header
-        df = pd.read_excel(filepath, sheet_name=sheet_name, header=header_row)
+    df = promote_header(raw, 1)
 
-        # Extract data
-        for idx, row in df.iterrows():
-            sku = str(row.get('SAP Item Code', '')) if 'SAP Item Code' in df.columns else ''
-            desc = str(row.get('Description', '')) if 'Description' in df.columns else ''
-            price = row.get('Retail Price (Ex VAT)', None) if 'Retail Price (Ex VAT)' in df.columns else None
+    # First 3 columns are MODEL, DESCRIPTION, RETAIL
+    model = _text(_sheet_column(df, position=0))
+    desc = _text(_sheet_column(df, position=1))
+    price = _sheet_column(df, position=2)
 
-            # Skip if essential data missing
-            if sku == 'nan' or desc == 'nan':
-                continue
+    # Skip category headers, empty rows, and info rows
+    model_upper = model.str.upper()
+    skip = model.isin(['nan', ''])
+    for marker in ALPHA_SKIP_MARKERS:
+        skip |= model.str.contains(marker, regex=False)
+    for marker in ALPHA_SKIP_UPPER_MARKERS:
+        skip |= model_upper.str.contains(marker, regex=False)
 
-            all_rows.append({
-                'Supplier Name': supplier_name,
-                'Supplier Code': generate_supplier_code(supplier_name, len(all_rows) + 1),
-                'BRAND': sheet_name,  # Sheet name is the brand
-                'SKU / MODEL': sku,
-                'PRODUCT DESCRIPTION': desc,
-                'COST EX VAT': price
-            })
+    return _brand_rows(sheet_name, model, desc, price, ~skip)
 
-    wb.close()
-    result_df = pd.DataFrame(all_rows, columns=MASTER_COLUMNS)
-    return result_df
+def process_av_distribution(filepath, supplier_name):
+    """AV Distribution - Multi-brand sheets"""
+    print(f"Processing {supplier_name} with custom handler...")
+
+    # One parse for all brand sheets; header location runs on the raw frames
+    frames = read_all_sheets(filepath, skip=AV_SKIP_SHEETS)
+    sheet_rows = map_sheets(frames, _av_distribution_sheet)
+
+    return _finish_brand_rows(sheet_rows, supplier_name)
 
 def process_alpha_technologies(filepath, supplier_name):
     """Alpha Technologies - Multi-brand sheets with consistent format"""
     print(f"Processing {supplier_name} with custom handler...")
 
-    all_rows = []
-    wb = load_workbook(filepath, read_only=True, data_only=True)
+    frames = read_all_sheets(filepath, skip=ALPHA_SKIP_SHEETS)
+    sheet_rows = map_sheets(frames, _alpha_technologies_sheet)
 
-    # Process each sheet
-    for sheet_name in wb.sheetnames:
-        if sheet_name in ['Front Page']:
-            continue
-
-        # Read the sheet with header in row 1 (0-indexed)
-        df = pd.read_excel(filepath, sheet_name=sheet_name, header=1)
-
-        # Extract data - skip rows with category headers
-        for idx, row in df.iterrows():
-            # Get values from first 3 columns (MODEL, DESCRIPTION, RETAIL)
-            model = str(row.iloc[0]) if len(row) > 0 and pd.notna(row.iloc[0]) else ''
-            desc = str(row.iloc[1]) if len(row) > 1 and pd.notna(row.iloc[1]) else ''
-            price = row.iloc[2] if len(row) > 2 and pd.notna(row.iloc[2]) else None
-
-            # Skip category headers, empty rows, and info rows
-            if (model == 'nan' or model == '' or
-                'Click on model' in model or
-                'EQUIPMENT' in model.upper() or
-                'PROCESSORS' in model.upper() or
-                'EXCL VAT' in model.upper()):
-                continue
-
-            all_rows.append({
-                'Supplier Name': supplier_name,
-                'Supplier Code': generate_supplier_code(supplier_name, len(all_rows) + 1),
-                'BRAND': sheet_name,
-                'SKU / MODEL': model,
-                'PRODUCT DESCRIPTION': desc,
-                'COST EX VAT': price
-            })
-
-    wb.close()
-    result_df = pd.DataFrame(all_rows, columns=MASTER_COLUMNS)
-    return result_df
+    return _finish_brand_rows(sheet_rows, supplier_name)
 
 def process_apexpro(filepath, supplier_name):
     """ApexPro Distribution - Well-structured single sheet"""
     print(f"Processing {supplier_name} with custom handler...")
 
-    df = pd.read_excel(filepath)
+    df = read_excel(filepath)
 
     rows = []
     for idx, row in df.iterrows():
         rows.append({
             'Supplier Name': supplier_name,
-            'Supplier Code': generate_supplier_code(supplier_name, idx + 1),
             'BRAND': row.get('Brand', ''),
             'SKU / MODEL': row.get('SKU', ''),
             'PRODUCT DESCRIPTION': row.get('Description', ''),
@@ -200,7 +206,7 @@ def process_audiolite(filepath, supplier_name):
     """Audiolite - Headers in row 3"""
     print(f"Processing {supplier_name} with custom handler...")
 
-    df = pd.read_excel(filepath, header=2)  # Headers in row 3 (0-indexed = 2)
+    df = read_excel(filepath, header=2)  # Headers in row 3 (0-indexed = 2)
 
     rows = []
     for idx, row in df.iterrows():
@@ -215,7 +221,6 @@ def process_audiolite(filepath, supplier_name):
 
         rows.append({
             'Supplier Name': supplier_name,
-            'Supplier Code': generate_supplier_code(supplier_name, len(rows) + 1),
             'SKU / MODEL': code,
             'PRODUCT DESCRIPTION': desc,
             'SUPPLIER SOH': qty,
@@ -229,34 +234,32 @@ def process_audiosure(filepath, supplier_name):
     """Audiosure - Well-structured stock file"""
     print(f"Processing {supplier_name} with custom handler...")
 
-    df = pd.read_excel(filepath)
-
-    rows = []
-    for idx, row in df.iterrows():
-        category = row.get('Category', '')
-        item_num = row.get('ItemNumber', '')
-        item_desc = row.get('ItemDescription', '')
-        status = row.get('ItemStatus', '')
-        retail = row.get('Retail Incl.', None)
-
-        rows.append({
-            'Supplier Name': supplier_name,
-            'Supplier Code': generate_supplier_code(supplier_name, idx + 1),
-            'Product Category': category,
-            'SKU / MODEL': item_num,
-            'PRODUCT DESCRIPTION': item_desc,
-            'SUPPLIER SOH': status,
-            'COST EX VAT': retail
-        })
-
-    result_df = pd.DataFrame(rows, columns=MASTER_COLUMNS)
+    # The stock file is large; only these columns are parsed from the sheet XML
+    wanted = ['Category', 'ItemNumber', 'ItemDescription', 'ItemStatus', 'Retail Incl.']
+    df, plan = load_sheet(filepath, columns=lambda names: [n for n in names if n in wanted])
+    print(f"   {plan['path']} path (~{plan['estimated_bytes'] / 1024 ** 2:.0f} MB estimated, {plan['chunks']} chunks)")
+    present = set(df.columns)
+    df = df.reindex(columns=wanted)
+    # Absent text columns read as '' (absent price stays empty)
+    for column in wanted[:-1]:
+        if column not in present:
+            df[column] = ''
+
+    result_df = pd.DataFrame({
+        'Supplier Name': supplier_name,
+        'Product Category': df['Category'],
+        'SKU / MODEL': df['ItemNumber'],
+        'PRODUCT DESCRIPTION': df['ItemDescription'],
+        'SUPPLIER SOH': df['ItemStatus'],
+        'COST EX VAT': df['Retail Incl.']
+    }).reindex(columns=MASTER_COLUMNS)
     return result_df
 
 def process_global_music(filepath, supplier_name):
     """Global Music - Simple price list"""
     print(f"Processing {supplier_name} with custom handler...")
 
-    df = pd.read_excel(filepath, header=None)
+    df = read_excel(filepath, header=None)
 
     rows = []
     for idx, row in df.iterrows():
@@ -269,7 +272,6 @@ def process_global_music(filepath, supplier_name):
         if desc and desc != 'nan':
             rows.append({
                 'Supplier Name': supplier_name,
-                'Supplier Code': generate_supplier_code(supplier_name, len(rows) + 1),
                 'PRODUCT DESCRIPTION': desc,
                 'COST EX VAT': price
             })
@@ -285,6 +287,7 @@ def process_supplier_file(filepath, supplier_name, processor_func):
     """Process supplier file with custom processor"""
     try:
         df = processor_func(filepath, supplier_name)
+        df['Supplier Code'] = generate_supplier_code(df, supplier_name)
         print(f"✅ Extracted {len(df)} rows")
         return df
     except Exception as e:
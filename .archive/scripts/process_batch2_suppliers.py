@@ -4,17 +4,27 @@ Supplier Data Consolidation - Batch 2 Processor
 Processes 7 supplier files and creates individual tabs in Consolidated_Supplier_Data.xlsx
 """
 
+import argparse
 import pandas as pd
-import openpyxl
-from openpyxl import load_workbook
 from pathlib import Path
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'database' / 'scripts'))
+from pricelist.readers import read_excel
+from pricelist.rules import RuleSet, rule
+from pricelist.workbook import probe_sheets, rank_sheets
+from pricelist.writer import ConsolidatedWriteSession
+
 # Paths
 SOURCE_DIR = Path('/mnt/k/00Project/MantisNXT/database/Uploads/drive-download-20250904T012253Z-1-001')
 MASTER_FILE = Path('/mnt/k/00Project/MantisNXT/database/Uploads/Consolidated_Supplier_Data_Batch2.xlsx')
 
+# Sheet selection: rows sampled per sheet and minimum data rows required
+PROBE_SAMPLE_ROWS = 20
+MIN_DATA_ROWS = 10
+
 # Master template columns (exact order)
 MASTER_COLUMNS = [
     'Supplier Name ',
@@ -32,6 +42,14 @@ MASTER_COLUMNS = [
     'LINKS'
 ]
 
+# Required fields must be at least half filled; numeric fields must parse
+REQUIRED_COLUMNS = ['SKU / MODEL ', 'PRODUCT DESCRIPTION']
+NUMERIC_COLUMNS = ['SUPPLIER SOH', 'COST  EX VAT', 'QTY ON ORDER']
+VALIDATION_RULES = RuleSet(
+    [rule(f'coverage:{col}', col, 'coverage', min_ratio=0.5) for col in REQUIRED_COLUMNS] +
+    [rule(f'not_numeric:{col}', col, 'numeric', severity='warning') for col in NUMERIC_COLUMNS]
+)
+
 # Batch 2 files with supplier name mappings
 BATCH_2_FILES = {
     'MD External Stock 2025-08-25.xlsx': 'MD Distribution',
@@ -44,9 +62,10 @@ BATCH_2_FILES = {
 }
 
 class SupplierProcessor:
-    def __init__(self, source_file, supplier_name):
+    def __init__(self, source_file, supplier_name, session):
         self.source_file = source_file
         self.supplier_name = supplier_name
+        self.session = session
         self.df_source = None
         self.df_master = None
         self.issues = []
@@ -59,32 +78,35 @@ class SupplierProcessor:
         print(f"{'='*80}")
 
         try:
-            # Load Excel file
-            xl = pd.ExcelFile(self.source_file)
-            print(f"Sheets found: {xl.sheet_names}")
+            # Probe sheet dimensions and a row sample; no cell data is parsed yet
+            probes = probe_sheets(self.source_file, sample_rows=PROBE_SAMPLE_ROWS)
+            print(f"Sheets found: {[p['name'] for p in probes]}")
 
-            # Try to find the main data sheet
-            for sheet_name in xl.sheet_names:
-                df = pd.read_excel(self.source_file, sheet_name=sheet_name)
+            for probe in probes:
+                print(f"  '{probe['name']}': ~{probe['rows']} rows x {probe['cols']} cols, "
+                      f"{probe['fill_ratio']:.0%} filled in sample")
 
-                # Skip empty sheets
-                if df.empty:
-                    continue
+            # Densest sheet with at least 10 data rows (plus header)
+            ranked = rank_sheets(probes, min_rows=MIN_DATA_ROWS + 1)
 
-                print(f"\nSheet: '{sheet_name}'")
-                print(f"Shape: {df.shape}")
-                print(f"Columns: {list(df.columns)[:10]}")  # First 10 columns
+            if not ranked:
+                self.issues.append("No suitable data sheet found")
+                return False
 
-                # Look for data-rich sheet
-                if df.shape[0] > 10:  # At least 10 rows
-                    self.df_source = df
-                    print(f"✓ Selected sheet '{sheet_name}' as main data source")
-                    break
+            sheet_name = ranked[0]['name']
+            df = read_excel(self.source_file, sheet_name=sheet_name)
 
-            if self.df_source is None:
-                self.issues.append("No suitable data sheet found")
+            if df.empty:
+                self.issues.append(f"Selected sheet '{sheet_name}' is empty")
                 return False
 
+            print(f"\nSheet: '{sheet_name}'")
+            print(f"Shape: {df.shape}")
+            print(f"Columns: {list(df.columns)[:10]}")  # First 10 columns
+
+            self.df_source = df
+            print(f"✓ Selected sheet '{sheet_name}' as main data source")
+
             return True
 
         except Exception as e:
@@ -190,61 +212,38 @@ class SupplierProcessor:
         print(f"\nData Quality Check:")
         print("-" * 80)
 
+        result = VALIDATION_RULES.evaluate(self.df_master)
+
         # Check required fields
-        required = ['SKU / MODEL ', 'PRODUCT DESCRIPTION']
-        for col in required:
-            null_count = self.df_master[col].isna().sum()
+        for col in REQUIRED_COLUMNS:
+            coverage = result['coverage'][f'coverage:{col}']
+            null_count = result['counts'][f'coverage:{col}']
             if null_count > 0:
-                pct = (null_count / len(self.df_master)) * 100
+                pct = (1 - coverage['ratio']) * 100
                 print(f"⚠ {col}: {null_count} null values ({pct:.1f}%)")
-                if pct > 50:
+                if not coverage['passed']:
                     self.issues.append(f"{col} is mostly empty ({pct:.1f}%)")
 
         # Check numeric fields
-        numeric_cols = ['SUPPLIER SOH', 'COST  EX VAT', 'QTY ON ORDER']
-        for col in numeric_cols:
+        for col in NUMERIC_COLUMNS:
             if self.df_master[col].notna().any():
-                try:
-                    # Try to convert to numeric
-                    self.df_master[col] = pd.to_numeric(self.df_master[col], errors='coerce')
+                self.df_master[col] = pd.to_numeric(self.df_master[col], errors='coerce')
+                unparsed = result['counts'][f'not_numeric:{col}']
+                if unparsed:
+                    print(f"⚠ {col}: converted to numeric ({unparsed} non-numeric values cleared)")
+                else:
                     print(f"✓ {col}: converted to numeric")
-                except:
-                    print(f"⚠ {col}: could not convert to numeric")
 
         return True
 
     def save_to_master(self):
-        """Save to Consolidated_Supplier_Data.xlsx as new sheet"""
+        """Stage as a new sheet of Consolidated_Supplier_Data.xlsx (saved once per batch)"""
         print(f"\nSaving to Master File:")
         print("-" * 80)
 
         try:
-            # Load existing workbook
-            wb = load_workbook(MASTER_FILE)
-
-            # Create sheet name (max 31 chars for Excel)
-            sheet_name = self.supplier_name[:31]
-
-            # Remove sheet if it exists
-            if sheet_name in wb.sheetnames:
-                del wb[sheet_name]
-                print(f"Removed existing sheet '{sheet_name}'")
-
-            # Create new sheet
-            ws = wb.create_sheet(sheet_name)
-
-            # Write headers
-            for col_idx, col_name in enumerate(MASTER_COLUMNS, 1):
-                ws.cell(row=1, column=col_idx, value=col_name)
-
-            # Write data
-            for row_idx, row in enumerate(self.df_master.itertuples(index=False), 2):
-                for col_idx, value in enumerate(row, 1):
-                    ws.cell(row=row_idx, column=col_idx, value=value)
-
-            # Save workbook
-            wb.save(MASTER_FILE)
-            print(f"✓ Saved {len(self.df_master)} rows to sheet '{sheet_name}'")
+            rows = self.session.add_supplier(self.supplier_name, self.df_master, columns=MASTER_COLUMNS)
+            print(f"✓ Staged {rows} rows for sheet '{self.supplier_name[:31]}'")
 
             return True
 
@@ -272,11 +271,20 @@ class SupplierProcessor:
 
 def main():
     """Process all batch 2 files"""
+    parser = argparse.ArgumentParser(description="Process Batch 2 supplier files")
+    parser.add_argument('--resume', action='store_true',
+                        help='Flush the sheets staged by an interrupted run instead of discarding them')
+    args = parser.parse_args()
+
     print("\n" + "="*80)
     print("SUPPLIER DATA CONSOLIDATION - BATCH 2")
     print("="*80)
 
     results = {}
+    session = ConsolidatedWriteSession(MASTER_FILE, checkpoint=True, resume=args.resume)
+
+    if session.resumed:
+        print(f"Resumed staged sheets from checkpoint: {', '.join(session.resumed)}")
 
     for filename, supplier_name in BATCH_2_FILES.items():
         source_file = SOURCE_DIR / filename
@@ -296,7 +304,7 @@ def main():
             }
             continue
 
-        processor = SupplierProcessor(source_file, supplier_name)
+        processor = SupplierProcessor(source_file, supplier_name, session)
         success = processor.process()
 
         results[supplier_name] = {
@@ -305,6 +313,17 @@ def main():
             'issues': processor.issues
         }
 
+    # Single save of every staged supplier sheet
+    try:
+        flush_result = session.flush()
+        print(f"\n✓ Saved {len(flush_result['sheets_written'])} sheets to {MASTER_FILE.name}")
+    except Exception as e:
+        print(f"\nERROR: Save failed (staged data kept for resume): {e}")
+        for result in results.values():
+            if result['status'] == 'success':
+                result['status'] = 'failed'
+                result['issues'].append(f"Save error: {str(e)}")
+
     # Summary Report
     print("\n" + "="*80)
     print("BATCH 2 PROCESSING SUMMARY")
@@ -4,13 +4,18 @@ Supplier Data Consolidation - Batch 2 Processor v2
 Improved header detection and data extraction
 """
 
+import argparse
 import pandas as pd
-from openpyxl import load_workbook
 from pathlib import Path
+import sys
 import warnings
 import re
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'database' / 'scripts'))
+from pricelist.readers import Workbook, read_excel
+from pricelist.writer import ConsolidatedWriteSession
+
 SOURCE_DIR = Path('/mnt/k/00Project/MantisNXT/database/Uploads/drive-download-20250904T012253Z-1-001')
 MASTER_FILE = Path('/mnt/k/00Project/MantisNXT/database/Uploads/Consolidated_Supplier_Data_Batch2.xlsx')
 
@@ -43,7 +48,7 @@ def process_md_distribution():
     print(f"\n{'='*80}\nProcessing: {supplier}\n{'='*80}")
 
     filepath = SOURCE_DIR / 'MD External Stock 2025-08-25.xlsx'
-    df = pd.read_excel(filepath, sheet_name='Sheet1')
+    df = read_excel(filepath, sheet_name='Sheet1')
 
     # Headers are in row 0
     df.columns = df.iloc[0]
@@ -67,7 +72,7 @@ def process_music_power():
     filepath = SOURCE_DIR / 'Music Power Pricelist (August 2025).xlsx'
 
     # Use the 'Order Sheet' which has all products
-    df = pd.read_excel(filepath, sheet_name='Order Sheet')
+    df = read_excel(filepath, sheet_name='Order Sheet')
 
     # Headers are in row 0
     df.columns = df.iloc[0]
@@ -104,7 +109,7 @@ def process_planetworld():
     print(f"\n{'='*80}\nProcessing: {supplier}\n{'='*80}")
 
     filepath = SOURCE_DIR / 'Planetworld SOH 20 June.xlsx'
-    df = pd.read_excel(filepath, sheet_name='Sheet1')
+    df = read_excel(filepath, sheet_name='Sheet1')
 
     result = pd.DataFrame(columns=MASTER_COLUMNS)
     result['Supplier Name '] = supplier
@@ -134,7 +139,7 @@ def process_rockit():
     print(f"\n{'='*80}\nProcessing: {supplier}\n{'='*80}")
 
     filepath = SOURCE_DIR / 'Rockit Price_List_25.08.2025.01.xlsx'
-    df = pd.read_excel(filepath, sheet_name='Sheet1')
+    df = read_excel(filepath, sheet_name='Sheet1')
 
     # Headers are in row 0
     df.columns = df.iloc[0]
@@ -163,11 +168,12 @@ def process_rolling_thunder():
     filepath = SOURCE_DIR / 'Rolling Thunder July 2025 Pricelist .xlsx'
 
     # Has multiple brand sheets - combine them all
-    xl = pd.ExcelFile(filepath)
+    # One open workbook for every brand sheet
+    xl = Workbook(filepath)
     all_data = []
 
     for sheet in xl.sheet_names:
-        df = pd.read_excel(filepath, sheet_name=sheet)
+        df = xl.parse(sheet)
         if len(df) > 5:  # Skip empty sheets
             # Headers usually in first row
             df.columns = df.iloc[0]
@@ -185,6 +191,7 @@ def process_rolling_thunder():
 
             all_data.append(sheet_data)
 
+    xl.close()
     result = pd.concat(all_data, ignore_index=True) if all_data else pd.DataFrame(columns=MASTER_COLUMNS)
     print(f"✓ Extracted {len(result)} rows from {len(all_data)} sheets")
     return supplier, result
@@ -195,7 +202,7 @@ def process_sennheiser():
     print(f"\n{'='*80}\nProcessing: {supplier}\n{'='*80}")
 
     filepath = SOURCE_DIR / 'Sennheiser 2025 (2).xlsx'
-    df = pd.read_excel(filepath, sheet_name='17th June Full Run Out')
+    df = read_excel(filepath, sheet_name='17th June Full Run Out')
 
     result = pd.DataFrame(columns=MASTER_COLUMNS)
     result['Supplier Name '] = supplier
@@ -207,31 +214,11 @@ def process_sennheiser():
     print(f"✓ Extracted {len(result)} rows")
     return supplier, result
 
-def save_to_excel(supplier_name, df):
-    """Save supplier data to Excel file"""
+def save_to_excel(supplier_name, df, session):
+    """Stage supplier data for the Excel file (saved once per batch)"""
     try:
-        wb = load_workbook(MASTER_FILE)
-
-        # Sheet name max 31 chars
-        sheet_name = supplier_name[:31]
-
-        # Remove if exists
-        if sheet_name in wb.sheetnames:
-            del wb[sheet_name]
-
-        ws = wb.create_sheet(sheet_name)
-
-        # Write headers
-        for col_idx, col_name in enumerate(MASTER_COLUMNS, 1):
-            ws.cell(row=1, column=col_idx, value=col_name)
-
-        # Write data
-        for row_idx, row in enumerate(df.itertuples(index=False), 2):
-            for col_idx, value in enumerate(row, 1):
-                ws.cell(row=row_idx, column=col_idx, value=value)
-
-        wb.save(MASTER_FILE)
-        print(f"✓ Saved to sheet '{sheet_name}'")
+        session.add_supplier(supplier_name, df, columns=MASTER_COLUMNS)
+        print(f"✓ Staged sheet '{supplier_name[:31]}'")
         return True
 
     except Exception as e:
@@ -240,6 +227,11 @@ def save_to_excel(supplier_name, df):
 
 def main():
     """Process all suppliers"""
+    parser = argparse.ArgumentParser(description="Process Batch 2 supplier files (v2)")
+    parser.add_argument('--resume', action='store_true',
+                        help='Flush the sheets staged by an interrupted run instead of discarding them')
+    args = parser.parse_args()
+
     print("\n" + "="*80)
     print("SUPPLIER DATA CONSOLIDATION - BATCH 2 v2")
     print("="*80)
@@ -254,6 +246,7 @@ def main():
     ]
 
     results = {}
+    session = ConsolidatedWriteSession(MASTER_FILE, checkpoint=True, resume=args.resume)
 
     for processor in processors:
         try:
@@ -263,7 +256,7 @@ def main():
             df = df.dropna(how='all')
 
             # Save to Excel
-            success = save_to_excel(supplier, df)
+            success = save_to_excel(supplier, df, session)
 
             results[supplier] = {
                 'status': 'success' if success else 'failed',
@@ -283,6 +276,16 @@ def main():
                 'error': str(e)
             }
 
+    # Single save of every staged sheet
+    try:
+        flush_result = session.flush()
+        print(f"\n✓ Saved {len(flush_result['sheets_written'])} sheets to {MASTER_FILE.name}")
+    except Exception as e:
+        print(f"\n✗ Save error (staged data kept for resume): {e}")
+        for info in results.values():
+            if info['status'] == 'success':
+                info['status'] = 'failed'
+
     # Summary
     print("\n" + "="*80)
     print("BATCH 2 SUMMARY")
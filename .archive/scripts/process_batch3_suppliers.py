@@ -5,18 +5,27 @@ Handles: Sonic Informed, Stage Audio Works, Stage One, Tuerk Multimedia,
          Tuerk Technologies, Viva Afrika, Yamaha
 """
 
+import argparse
 import pandas as pd
-import openpyxl
 from openpyxl.utils import get_column_letter
 from pathlib import Path
 import re
 from datetime import datetime
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'database' / 'scripts'))
+from pricelist.checkpoints import RunCheckpoints
+from pricelist.estimate import load_history, plan_batch, print_plan
+from pricelist.readers import Workbook
+from pricelist.rules import RuleSet, rule
+from pricelist.writer import ConsolidatedWriteSession
+
 # Paths
 SOURCE_DIR = Path("/mnt/k/00Project/MantisNXT/database/Uploads/drive-download-20250904T012253Z-1-001")
 CONSOLIDATED_FILE = Path("/mnt/k/00Project/MantisNXT/database/Uploads/Consolidated_Supplier_Data.xlsx")
+CHECKPOINT_DIR = CONSOLIDATED_FILE.parent / f".{CONSOLIDATED_FILE.stem}.runs" / 'batch_3'
 
 # Master schema columns
 MASTER_COLUMNS = [
@@ -26,6 +35,16 @@ MASTER_COLUMNS = [
     'Supplier Code', 'Date Updated', 'Notes', 'Source File'
 ]
 
+# Field coverage checks, evaluated per supplier in a single vectorised pass
+VALIDATION_RULES = RuleSet([
+    rule('missing_brand', 'Brand', 'not_null', severity='warning'),
+    rule('missing_model', 'Model', 'not_null', severity='warning'),
+    rule('missing_description', 'Description', 'not_null', severity='warning'),
+    rule('missing_cost_price', 'Cost Price (ZAR)', 'not_null', severity='warning'),
+    rule('missing_rrp', 'RRP (ZAR)', 'not_null', severity='warning'),
+    rule('missing_sku', 'SKU', 'not_null', severity='warning')
+])
+
 # Batch 3 files
 BATCH_3_FILES = [
     {
@@ -119,16 +138,16 @@ def process_sonic_informed(file_path):
 
     try:
         # Try reading different sheets
-        xl_file = pd.ExcelFile(file_path)
-        print(f"  Sheets found: {xl_file.sheet_names}")
+        xl_file = Workbook(file_path)
+        print(f"  Sheets found: {xl_file.sheet_names} ({xl_file.backend} reader)")
 
-        df = pd.read_excel(file_path, sheet_name=0)
+        df = xl_file.parse(0)
         print(f"  Initial shape: {df.shape}")
 
         # Find header row
         header_row = find_header_row(df)
         if header_row > 0:
-            df = pd.read_excel(file_path, sheet_name=0, header=header_row)
+            df = xl_file.parse(0, header=header_row)
             print(f"  Found header at row {header_row}, new shape: {df.shape}")
 
         # Display column names to understand structure
@@ -186,15 +205,15 @@ def process_stage_audio_works(file_path):
     print(f"\nProcessing: {file_path.name}")
 
     try:
-        xl_file = pd.ExcelFile(file_path)
-        print(f"  Sheets found: {xl_file.sheet_names}")
+        xl_file = Workbook(file_path)
+        print(f"  Sheets found: {xl_file.sheet_names} ({xl_file.backend} reader)")
 
-        df = pd.read_excel(file_path, sheet_name=0)
+        df = xl_file.parse(0)
         print(f"  Initial shape: {df.shape}")
 
         header_row = find_header_row(df)
         if header_row > 0:
-            df = pd.read_excel(file_path, sheet_name=0, header=header_row)
+            df = xl_file.parse(0, header=header_row)
 
         print(f"  Columns: {df.columns.tolist()[:10]}")
 
@@ -250,15 +269,15 @@ def process_stage_one(file_path):
     print(f"\nProcessing: {file_path.name}")
 
     try:
-        xl_file = pd.ExcelFile(file_path)
-        print(f"  Sheets found: {xl_file.sheet_names}")
+        xl_file = Workbook(file_path)
+        print(f"  Sheets found: {xl_file.sheet_names} ({xl_file.backend} reader)")
 
-        df = pd.read_excel(file_path, sheet_name=0)
+        df = xl_file.parse(0)
         print(f"  Initial shape: {df.shape}")
 
         header_row = find_header_row(df)
         if header_row > 0:
-            df = pd.read_excel(file_path, sheet_name=0, header=header_row)
+            df = xl_file.parse(0, header=header_row)
 
         print(f"  Columns: {df.columns.tolist()[:10]}")
 
@@ -310,8 +329,8 @@ def process_tuerk_multimedia(file_path):
     print(f"\nProcessing: {file_path.name}")
 
     try:
-        xl_file = pd.ExcelFile(file_path)
-        print(f"  Sheets found: {xl_file.sheet_names}")
+        xl_file = Workbook(file_path)
+        print(f"  Sheets found: {xl_file.sheet_names} ({xl_file.backend} reader)")
 
         # Try to find the main price list sheet
         target_sheet = xl_file.sheet_names[0]
@@ -320,12 +339,12 @@ def process_tuerk_multimedia(file_path):
                 target_sheet = sheet_name
                 break
 
-        df = pd.read_excel(file_path, sheet_name=target_sheet)
+        df = xl_file.parse(target_sheet)
         print(f"  Using sheet: {target_sheet}, shape: {df.shape}")
 
         header_row = find_header_row(df)
         if header_row > 0:
-            df = pd.read_excel(file_path, sheet_name=target_sheet, header=header_row)
+            df = xl_file.parse(target_sheet, header=header_row)
 
         print(f"  Columns: {df.columns.tolist()[:10]}")
 
@@ -377,17 +396,17 @@ def process_tuerk_technologies(file_path):
     print(f"\nProcessing: {file_path.name}")
 
     try:
-        # Handle .xls format
-        xl_file = pd.ExcelFile(file_path, engine='xlrd')
-        print(f"  Sheets found: {xl_file.sheet_names}")
+        # Legacy .xls: read by calamine, or xlrd as fallback
+        xl_file = Workbook(file_path)
+        print(f"  Sheets found: {xl_file.sheet_names} ({xl_file.backend} reader)")
 
         target_sheet = xl_file.sheet_names[0]
-        df = pd.read_excel(file_path, sheet_name=target_sheet, engine='xlrd')
+        df = xl_file.parse(target_sheet)
         print(f"  Using sheet: {target_sheet}, shape: {df.shape}")
 
         header_row = find_header_row(df)
         if header_row > 0:
-            df = pd.read_excel(file_path, sheet_name=target_sheet, header=header_row, engine='xlrd')
+            df = xl_file.parse(target_sheet, header=header_row)
 
         print(f"  Columns: {df.columns.tolist()[:10]}")
 
@@ -439,8 +458,8 @@ def process_viva_afrika(file_path):
     print(f"\nProcessing: {file_path.name}")
 
     try:
-        xl_file = pd.ExcelFile(file_path)
-        print(f"  Sheets found: {xl_file.sheet_names}")
+        xl_file = Workbook(file_path)
+        print(f"  Sheets found: {xl_file.sheet_names} ({xl_file.backend} reader)")
 
         # Process all relevant sheets
         all_records = []
@@ -450,12 +469,12 @@ def process_viva_afrika(file_path):
                 continue
 
             print(f"  Processing sheet: {sheet_name}")
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
+            df = xl_file.parse(sheet_name)
             print(f"    Shape: {df.shape}")
 
             header_row = find_header_row(df)
             if header_row > 0:
-                df = pd.read_excel(file_path, sheet_name=sheet_name, header=header_row)
+                df = xl_file.parse(sheet_name, header=header_row)
 
             for idx, row in df.iterrows():
                 if row.isna().all():
@@ -508,8 +527,8 @@ def process_yamaha(file_path):
     print(f"\nProcessing: {file_path.name}")
 
     try:
-        xl_file = pd.ExcelFile(file_path)
-        print(f"  Sheets found: {xl_file.sheet_names}")
+        xl_file = Workbook(file_path)
+        print(f"  Sheets found: {xl_file.sheet_names} ({xl_file.backend} reader)")
 
         all_records = []
 
@@ -518,12 +537,12 @@ def process_yamaha(file_path):
                 continue
 
             print(f"  Processing sheet: {sheet_name}")
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
+            df = xl_file.parse(sheet_name)
             print(f"    Shape: {df.shape}")
 
             header_row = find_header_row(df)
             if header_row > 0:
-                df = pd.read_excel(file_path, sheet_name=sheet_name, header=header_row)
+                df = xl_file.parse(sheet_name, header=header_row)
 
             for idx, row in df.iterrows():
                 if row.isna().all():
@@ -571,22 +590,25 @@ def validate_data(df, supplier_name):
     """Validate processed data quality"""
     print(f"\n=== Validation: {supplier_name} ===")
 
+    result = VALIDATION_RULES.evaluate(df)
+    missing = result['counts']
+    total = result['rows']
+
     stats = {
-        'total_records': len(df),
-        'has_brand': df['Brand'].notna().sum(),
-        'has_model': df['Model'].notna().sum(),
-        'has_description': df['Description'].notna().sum(),
-        'has_cost_price': df['Cost Price (ZAR)'].notna().sum(),
-        'has_rrp': df['RRP (ZAR)'].notna().sum(),
-        'has_sku': df['SKU'].notna().sum(),
+        'total_records': total,
+        'has_brand': total - missing['missing_brand'],
+        'has_model': total - missing['missing_model'],
+        'has_description': total - missing['missing_description'],
+        'has_cost_price': total - missing['missing_cost_price'],
+        'has_rrp': total - missing['missing_rrp'],
+        'has_sku': total - missing['missing_sku'],
         'completeness': 0
     }
 
     # Calculate completeness score
-    if stats['total_records'] > 0:
-        key_fields = ['Brand', 'Description', 'Cost Price (ZAR)']
-        completeness_scores = [df[field].notna().sum() / stats['total_records'] * 100 for field in key_fields]
-        stats['completeness'] = sum(completeness_scores) / len(completeness_scores)
+    if total > 0:
+        key_fields = ['has_brand', 'has_description', 'has_cost_price']
+        stats['completeness'] = sum(stats[field] / total * 100 for field in key_fields) / len(key_fields)
 
     print(f"  Total Records: {stats['total_records']}")
     print(f"  Has Brand: {stats['has_brand']} ({stats['has_brand']/stats['total_records']*100:.1f}%)")
@@ -599,47 +621,15 @@ def validate_data(df, supplier_name):
 
     return stats
 
-def append_to_consolidated(df, supplier_name):
-    """Append processed data to Consolidated workbook"""
+def append_to_consolidated(df, supplier_name, session):
+    """Stage processed data for the Consolidated workbook (saved once per batch)"""
     print(f"\n=== Appending to Consolidated: {supplier_name} ===")
 
     try:
-        # Load existing workbook
-        wb = openpyxl.load_workbook(CONSOLIDATED_FILE)
-
-        # Create supplier-specific sheet
-        sheet_name = supplier_name[:31]  # Excel sheet name limit
-        if sheet_name in wb.sheetnames:
-            del wb[sheet_name]
-        ws = wb.create_sheet(sheet_name)
-
-        # Write headers
-        for col_idx, col_name in enumerate(MASTER_COLUMNS, start=1):
-            ws.cell(row=1, column=col_idx, value=col_name)
-
-        # Write data
-        for row_idx, record in enumerate(df.to_dict('records'), start=2):
-            for col_idx, col_name in enumerate(MASTER_COLUMNS, start=1):
-                ws.cell(row=row_idx, column=col_idx, value=record.get(col_name))
-
-        print(f"  Created sheet '{sheet_name}' with {len(df)} rows")
-
-        # Append to Master sheet
-        if 'Master' in wb.sheetnames:
-            master_ws = wb['Master']
-            start_row = master_ws.max_row + 1
-
-            for row_idx, record in enumerate(df.to_dict('records'), start=start_row):
-                for col_idx, col_name in enumerate(MASTER_COLUMNS, start=1):
-                    master_ws.cell(row=row_idx, column=col_idx, value=record.get(col_name))
-
-            print(f"  Appended {len(df)} rows to Master sheet (starting at row {start_row})")
-        else:
-            print("  WARNING: Master sheet not found")
-
-        # Save workbook
-        wb.save(CONSOLIDATED_FILE)
-        print(f"  Saved to: {CONSOLIDATED_FILE}")
+        # Supplier-specific sheet plus Master append (Master is only
+        # appended to if it already exists in the workbook)
+        rows = session.add_supplier(supplier_name, df, columns=MASTER_COLUMNS, append_to_master=True)
+        print(f"  Staged sheet '{supplier_name[:31]}' with {rows} rows")
 
         return True
 
@@ -649,6 +639,22 @@ def append_to_consolidated(df, supplier_name):
 
 def main():
     """Main processing function"""
+    parser = argparse.ArgumentParser(description="Process Batch 3 supplier files")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue an interrupted run from each supplier's last completed stage")
+    parser.add_argument('--plan', action='store_true',
+                        help='Estimate rows, memory and runtime per file without processing anything')
+    args = parser.parse_args()
+
+    if args.plan:
+        # Viva Afrika and Yamaha read every sheet, the others their first one
+        plan = plan_batch([{'path': SOURCE_DIR / info['file'], 'supplier': info['supplier'],
+                            'sheets': None if info['supplier'] in ('Viva Afrika', 'Yamaha') else 0}
+                           for info in BATCH_3_FILES], load_history(checkpoints=[CHECKPOINT_DIR]))
+        print(f"BATCH 3 PLAN - {len(BATCH_3_FILES)} files from {SOURCE_DIR}")
+        print_plan(plan)
+        return 0
+
     print("="*80)
     print("BATCH 3 SUPPLIER FILE PROCESSING")
     print("Files 15-21: Sonic Informed → Yamaha")
@@ -665,6 +671,9 @@ def main():
     }
 
     overall_stats = []
+    session = ConsolidatedWriteSession(CONSOLIDATED_FILE, master_columns=MASTER_COLUMNS,
+                                       create_master=False, checkpoint=True, resume=args.resume)
+    checkpoints = RunCheckpoints(CHECKPOINT_DIR, resume=args.resume)
 
     for file_info in BATCH_3_FILES:
         file_path = SOURCE_DIR / file_info['file']
@@ -679,22 +688,43 @@ def main():
         print(f"File: {file_path.name}")
         print(f"{'='*80}")
 
-        # Process file
+        checkpoints.bind(supplier, file_path, file_info)
+
+        written = checkpoints.load(supplier, 'written')
+        if written is not None:
+            overall_stats.append(written[1])
+            print(f"\n♻️  {supplier} already staged by an earlier run")
+            continue
+
+        # Process file (read and column mapping happen in one step per supplier)
         processor = processors.get(supplier)
         if processor:
-            df = processor(file_path)
+            mapped = checkpoints.load(supplier, 'mapped')
+            if mapped is not None:
+                df = mapped[0]
+                print(f"\n♻️  Reusing mapped checkpoint ({len(df)} records)")
+            else:
+                df = processor(file_path)
+                if not df.empty:
+                    checkpoints.save(supplier, 'mapped', df)
 
             if not df.empty:
                 # Validate
-                stats = validate_data(df, supplier)
-                stats['supplier'] = supplier
-                stats['file'] = file_info['file']
+                validated = checkpoints.load(supplier, 'validated')
+                if validated is not None:
+                    stats = validated[1]
+                else:
+                    stats = validate_data(df, supplier)
+                    stats['supplier'] = supplier
+                    stats['file'] = file_info['file']
+                    checkpoints.save(supplier, 'validated', data=stats)
                 overall_stats.append(stats)
 
                 # Append to consolidated
-                success = append_to_consolidated(df, supplier)
+                success = append_to_consolidated(df, supplier, session)
 
                 if success:
+                    checkpoints.save(supplier, 'written', data=stats)
                     print(f"\n✅ SUCCESS: {supplier} processed and appended")
                 else:
                     print(f"\n❌ FAILED: Could not append {supplier}")
@@ -703,6 +733,20 @@ def main():
         else:
             print(f"\n❌ ERROR: No processor defined for {supplier}")
 
+    # Single save of all staged sheets and Master rows
+    flushed = False
+    try:
+        flush_result = session.flush()
+        flushed = True
+        if flush_result['master_start_row']:
+            print(f"\nAppended {flush_result['master_rows_appended']} rows to Master sheet "
+                  f"(starting at row {flush_result['master_start_row']})")
+        elif flush_result['sheets_written']:
+            print("\nWARNING: Master sheet not found")
+        print(f"Saved {len(flush_result['sheets_written'])} sheets to: {CONSOLIDATED_FILE}")
+    except Exception as e:
+        print(f"\nERROR saving consolidated workbook (staged data kept for resume): {str(e)}")
+
     # Final summary
     print("\n" + "="*80)
     print("BATCH 3 PROCESSING SUMMARY")
@@ -720,5 +764,14 @@ def main():
     print(f"AVERAGE COMPLETENESS: {avg_completeness:.1f}%")
     print(f"{'='*80}")
 
+    reused = checkpoints.reused()
+    for supplier, stages in reused.items():
+        print(f"Checkpoints reused for {supplier}: {', '.join(stages)}")
+
+    if flushed and len(overall_stats) == len(BATCH_3_FILES):
+        checkpoints.complete({'suppliers': len(overall_stats), 'total_records': int(total_records)})
+    else:
+        print("Batch incomplete; rerun with --resume to continue from the checkpoints")
+
 if __name__ == '__main__':
     main()
@@ -7,15 +7,31 @@ Process: MD Distribution, Music Power, Planetworld, Pro Audio Platinum,
 
 import pandas as pd
 import numpy as np
-import openpyxl
-from openpyxl.utils.dataframe import dataframe_to_rows
 from pathlib import Path
 import re
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional
+import argparse
+import json
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'database' / 'scripts'))
+from pricelist.checkpoints import RunCheckpoints
+from pricelist.diff import diff_pricelists
+from pricelist.estimate import load_history, plan_batch, print_plan
+from pricelist.ingest import LEDGER_NAME, profile
+from pricelist.master_store import MasterStore, partition_slug
+from pricelist.outliers import outlier_summary, price_outliers
+from pricelist.planner import load_sheet, plan_ingestion
+from pricelist.minhash import DescriptionIndex
+from pricelist.price_index import PriceIndex
+from pricelist.rules import RuleSet, rule
+from pricelist import telemetry
+from pricelist.telemetry import stage_failed, stage_timer
+from pricelist.writer import BATCH2_MASTER_SHEET, ConsolidatedWriteSession
+
 # ═══════════════════════════════════════════════════════════════════
 # MASTER TEMPLATE SCHEMA
 # ═══════════════════════════════════════════════════════════════════
@@ -31,6 +47,23 @@ MASTER_COLUMNS = [
 
 REQUIRED_FIELDS = ['SKU', 'Product Description', 'Supplier', 'Cost Price Excl']
 
+# Tab regenerated from the Batch 2 Master store. The shared 'Master' tab is
+# also appended to by process_batch3_suppliers.py with its own columns, so
+# Batch 2 never rewrites it; Master readers pick up both tabs (MASTER_SHEETS)
+MASTER_SHEET = BATCH2_MASTER_SHEET
+
+# Master columns read for price anomaly scoring
+OUTLIER_COLUMNS = ['Supplier', 'Category', 'SKU', 'Product Description', 'Cost Price Excl', 'Retail Price Incl']
+
+# Declared once, evaluated per supplier in a single vectorised pass
+VALIDATION_RULES = RuleSet(
+    [rule(f'missing_{field}', field, 'not_null', severity='warning') for field in REQUIRED_FIELDS] + [
+        rule('negative_price', 'Cost Price Excl', 'non_negative', severity='warning'),
+        rule('zero_price', 'Cost Price Excl', 'non_zero', severity='warning'),
+        rule('duplicate_sku', 'SKU', 'unique', severity='warning')
+    ]
+)
+
 # ═══════════════════════════════════════════════════════════════════
 # FILE CONFIGURATIONS
 # ═══════════════════════════════════════════════════════════════════
@@ -216,26 +249,22 @@ def load_supplier_file(file_path: Path, config: Dict) -> Tuple[pd.DataFrame, Dic
     }
 
     try:
-        # Try reading with different engines
-        try:
-            df = pd.read_excel(file_path, sheet_name=config['sheet'], header=None)
-        except Exception as e:
-            # Try openpyxl engine for large files
-            df = pd.read_excel(file_path, sheet_name=config['sheet'], header=None, engine='openpyxl')
-
-        stats['raw_rows'] = len(df)
-
-        # Find header row
-        header_row = find_header_row(df, config['mapping'])
-
-        if header_row is None:
-            # Use first row as header
-            header_row = config.get('skip_rows', 0)
-
-        stats['header_row'] = header_row
-
-        # Re-read with correct header
-        df = pd.read_excel(file_path, sheet_name=config['sheet'], header=header_row)
+        # Only the mapped columns are parsed (streamed in chunks when that is not possible)
+        plan = plan_ingestion(file_path, config['sheet'])
+        df, plan = load_sheet(
+            file_path, config['sheet'],
+            find_header=lambda raw: find_header_row(raw, config['mapping']),
+            header_row=config.get('skip_rows', 0),
+            columns=lambda names: list(map_columns(pd.DataFrame(columns=names), config['mapping'])),
+            plan=plan
+        )
+
+        stats['raw_rows'] = plan['raw_rows']
+        stats['header_row'] = plan['header_row']
+        stats['ingest_path'] = plan['path']
+        stats['estimated_mb'] = round(plan['estimated_bytes'] / 1024 ** 2, 1)
+        if 'columns_read' in plan:
+            stats['columns_read'] = f"{plan['columns_read']}/{plan['columns_total']}"
 
         # Remove completely empty rows
         df = df.dropna(how='all')
@@ -297,41 +326,63 @@ def transform_to_master(df: pd.DataFrame, config: Dict, stats: Dict) -> pd.DataF
 
 def validate_data(df: pd.DataFrame, stats: Dict) -> List[str]:
     """Run validation checks on transformed data"""
+    result = VALIDATION_RULES.evaluate(df)
+    counts = result['counts']
     issues = []
 
     # Check required fields
     for field in REQUIRED_FIELDS:
-        null_count = df[field].isna().sum()
-        if null_count > 0:
-            issues.append(f"⚠️ {null_count} rows missing {field}")
+        if counts[f'missing_{field}'] > 0:
+            issues.append(f"⚠️ {counts[f'missing_{field}']} rows missing {field}")
 
     # Check price validity
     if 'Cost Price Excl' in df.columns:
-        negative = (df['Cost Price Excl'] < 0).sum()
-        if negative > 0:
-            issues.append(f"⚠️ {negative} rows with negative prices")
-
-        zero = (df['Cost Price Excl'] == 0).sum()
-        if zero > 0:
-            issues.append(f"⚠️ {zero} rows with zero prices")
+        if counts['negative_price'] > 0:
+            issues.append(f"⚠️ {counts['negative_price']} rows with negative prices")
+        if counts['zero_price'] > 0:
+            issues.append(f"⚠️ {counts['zero_price']} rows with zero prices")
 
     # Check for duplicates
-    if 'SKU' in df.columns:
-        dupes = df['SKU'].duplicated().sum()
-        if dupes > 0:
-            issues.append(f"⚠️ {dupes} duplicate SKUs")
+    if counts['duplicate_sku'] > 0:
+        issues.append(f"⚠️ {counts['duplicate_sku']} duplicate SKUs")
 
     # Data quality stats
+    stats['validation_counts'] = counts
+    stats['invalid_rows'] = result['invalid_rows']
     stats['null_percentages'] = {
-        col: f"{(df[col].isna().sum() / len(df) * 100):.1f}%"
-        for col in MASTER_COLUMNS if col in df.columns
-    }
+        col: f"{pct:.1f}%"
+        for col, pct in (df.isna().mean() * 100).items() if col in MASTER_COLUMNS
+    } if len(df) else {}
 
     return issues
 
+def detect_price_outliers(master_store: MasterStore, previous: pd.DataFrame, report_path: Path) -> Dict:
+    """Score every Master price in one grouped pass and save the flagged rows"""
+    master = master_store.read(columns=OUTLIER_COLUMNS)
+    scores = price_outliers(master, 'Cost Price Excl', 'Supplier', category='Category', sku='SKU',
+                            rrp='Retail Price Incl', previous=previous)
+
+    flagged = pd.concat([master, scores], axis=1)[scores['is_outlier']]
+    flagged = flagged.sort_values('outlier_score', ascending=False)
+    flagged.to_csv(report_path, index=False)
+
+    return {'flagged': len(flagged), 'summary': outlier_summary(master, scores, 'Supplier')}
+
+def diff_against_master(master_df: pd.DataFrame, supplier_name: str, master_store: MasterStore,
+                        diff_root: Path) -> Optional[Dict]:
+    """Diff a supplier's new rows against its current Master partition (before it is replaced)"""
+    previous = dict(master_store.partition_files()).get(supplier_name[:31])
+    if previous is None or not previous.exists():
+        return None
+
+    output_dir = diff_root / partition_slug(supplier_name) / datetime.now().strftime('%Y%m%d-%H%M%S')
+    summary = diff_pricelists(previous, master_df, supplier_name, output_dir)
+    summary['output_dir'] = str(output_dir)
+    return summary
+
 def write_to_consolidated(master_df: pd.DataFrame, supplier_name: str,
-                          consolidated_path: Path) -> Dict:
-    """Write transformed data to consolidated workbook"""
+                          session: ConsolidatedWriteSession) -> Dict:
+    """Stage transformed data for the consolidated workbook (saved once per batch)"""
     result = {
         'success': False,
         'rows_written': 0,
@@ -339,43 +390,10 @@ def write_to_consolidated(master_df: pd.DataFrame, supplier_name: str,
     }
 
     try:
-        # Load or create workbook
-        try:
-            wb = openpyxl.load_workbook(consolidated_path)
-        except FileNotFoundError:
-            wb = openpyxl.Workbook()
-            if 'Sheet' in wb.sheetnames:
-                wb.remove(wb['Sheet'])
-
-        # Create or clear supplier sheet
-        if supplier_name in wb.sheetnames:
-            wb.remove(wb[supplier_name])
-
-        ws = wb.create_sheet(supplier_name)
-
-        # Write data
-        for r_idx, row in enumerate(dataframe_to_rows(master_df, index=False, header=True), 1):
-            for c_idx, value in enumerate(row, 1):
-                ws.cell(row=r_idx, column=c_idx, value=value)
-
-        result['rows_written'] = len(master_df)
-
-        # Update or create Master sheet
-        if 'Master' not in wb.sheetnames:
-            master_ws = wb.create_sheet('Master', 0)
-            # Write headers
-            for c_idx, col in enumerate(MASTER_COLUMNS, 1):
-                master_ws.cell(row=1, column=c_idx, value=col)
-        else:
-            master_ws = wb['Master']
-
-        # Append to master (after validation)
-        start_row = master_ws.max_row + 1
-        for r_idx, row in enumerate(dataframe_to_rows(master_df, index=False, header=False), start_row):
-            for c_idx, value in enumerate(row, 1):
-                master_ws.cell(row=r_idx, column=c_idx, value=value)
-
-        wb.save(consolidated_path)
+        # Supplier tab plus Master partition, flushed by the session
+        result['rows_written'] = session.add_supplier(
+            supplier_name, master_df, columns=list(master_df.columns), append_to_master=True
+        )
         result['success'] = True
 
     except Exception as e:
@@ -387,7 +405,19 @@ def write_to_consolidated(master_df: pd.DataFrame, supplier_name: str,
 # MAIN PROCESSING PIPELINE
 # ═══════════════════════════════════════════════════════════════════
 
-def process_supplier(file_path: Path, config: Dict, consolidated_path: Path) -> Dict:
+def reuse_stage(checkpoints: Optional[RunCheckpoints], supplier: str, stage: str):
+    """(frame, stats) of a stage completed by an earlier run, when resuming"""
+    if checkpoints is None:
+        return None
+    restored = checkpoints.load(supplier, stage)
+    if checkpoints.resume:
+        telemetry.cache_lookup('checkpoint', restored is not None)
+    if restored is not None:
+        print(f"♻️  Reusing '{stage}' checkpoint")
+    return restored
+
+def process_supplier(file_path: Path, config: Dict, session: ConsolidatedWriteSession,
+                     diff_root: Optional[Path] = None, checkpoints: Optional[RunCheckpoints] = None) -> Dict:
     """Complete processing pipeline for one supplier"""
 
     print(f"\n{'='*70}")
@@ -395,30 +425,74 @@ def process_supplier(file_path: Path, config: Dict, consolidated_path: Path) ->
     print(f"File: {file_path.name}")
     print(f"{'='*70}")
 
-    # Stage 1: Load
-    print("\n[1/5] Loading file...")
-    df, stats = load_supplier_file(file_path, config)
+    supplier = config['supplier']
+    if checkpoints is not None:
+        checkpoints.bind(supplier, file_path, config)
 
-    if df is None:
-        print(f"❌ Failed to load file: {stats.get('errors', [])}")
-        return stats
+    written = reuse_stage(checkpoints, supplier, 'written')
+    if written is not None:
+        print(f"✅ Already staged by an earlier run ({written[1].get('rows_written', 0)} rows)")
+        return written[1]
+
+    mapped = reuse_stage(checkpoints, supplier, 'mapped')
+    if mapped is not None:
+        master_df, stats = mapped
+        print(f"✅ {stats['valid_rows']} valid rows from checkpoint")
+    else:
+        # Stage 1: Load
+        print("\n[1/5] Loading file...")
+        parsed = reuse_stage(checkpoints, supplier, 'parsed')
+        if parsed is not None:
+            df, stats = parsed
+        else:
+            with stage_timer(supplier, 'parse') as event:
+                df, stats = load_supplier_file(file_path, config)
+                event.update(rows=stats['data_rows'], ingest_path=stats.get('ingest_path'),
+                             estimated_mb=stats.get('estimated_mb'))
 
-    print(f"✅ Loaded {stats['data_rows']} rows (header at row {stats['header_row']})")
+            if df is None:
+                print(f"❌ Failed to load file: {stats.get('errors', [])}")
+                stage_failed(supplier, 'parse', '; '.join(stats.get('errors', [])))
+                return stats
 
-    # Stage 2: Transform
-    print("\n[2/5] Transforming data...")
-    master_df = transform_to_master(df, config, stats)
+            if checkpoints is not None:
+                checkpoints.save(supplier, 'parsed', df, stats)
 
-    if master_df is None or len(master_df) == 0:
-        print(f"❌ Transformation failed: {stats.get('errors', [])}")
-        return stats
+        print(f"✅ Loaded {stats['data_rows']} rows (header at row {stats['header_row']}, "
+              f"{stats.get('ingest_path', 'memory')} path, ~{stats.get('estimated_mb', 0)} MB estimated)")
+        if stats.get('columns_read'):
+            print(f"   Parsed {stats['columns_read']} columns (unmapped columns skipped)")
+
+        # Stage 2: Transform
+        print("\n[2/5] Transforming data...")
+        with stage_timer(supplier, 'transform') as event:
+            master_df = transform_to_master(df, config, stats)
+            event.update(rows=stats.get('valid_rows'), rejected=stats.get('rejected_rows'))
 
-    print(f"✅ Transformed to {stats['valid_rows']} valid rows ({stats.get('rejected_rows', 0)} rejected)")
-    print(f"   Mapped {stats.get('mapped_columns', 0)} columns")
+        if master_df is None or len(master_df) == 0:
+            print(f"❌ Transformation failed: {stats.get('errors', [])}")
+            stage_failed(supplier, 'transform', '; '.join(stats.get('errors', [])))
+            return stats
+
+        print(f"✅ Transformed to {stats['valid_rows']} valid rows ({stats.get('rejected_rows', 0)} rejected)")
+        print(f"   Mapped {stats.get('mapped_columns', 0)} columns")
+
+        if checkpoints is not None:
+            checkpoints.save(supplier, 'mapped', master_df, stats)
 
     # Stage 3: Validate
     print("\n[3/5] Validating data...")
-    issues = validate_data(master_df, stats)
+    validated = reuse_stage(checkpoints, supplier, 'validated')
+    if validated is not None:
+        stats = validated[1]
+        issues = stats.get('validation_issues', [])
+    else:
+        with stage_timer(supplier, 'validate') as event:
+            issues = validate_data(master_df, stats)
+            event['issues'] = len(issues)
+        stats['validation_issues'] = issues
+        if checkpoints is not None:
+            checkpoints.save(supplier, 'validated', data=stats)
 
     if issues:
         print("⚠️ Validation warnings:")
@@ -427,18 +501,34 @@ def process_supplier(file_path: Path, config: Dict, consolidated_path: Path) ->
     else:
         print("✅ All validation checks passed")
 
-    # Stage 4: Write to consolidated
-    print("\n[4/5] Writing to consolidated workbook...")
-    write_result = write_to_consolidated(master_df, config['supplier'], consolidated_path)
+    # Stage 4: Stage for consolidated workbook
+    print("\n[4/5] Staging for consolidated workbook...")
+    if diff_root is not None and session.master_store is not None:
+        try:
+            diff = diff_against_master(master_df, config['supplier'], session.master_store, diff_root)
+            if diff:
+                stats['diff'] = diff
+                print(f"🔀 vs previous pricelist: +{diff['added']:,} added, -{diff['removed']:,} removed, "
+                      f"{diff['price_changed']:,} price changes, {diff['stock_changed']:,} stock changes")
+        except Exception as e:
+            print(f"⚠️ Pricelist diff failed: {str(e)}")
+
+    with stage_timer(supplier, 'write') as event:
+        write_result = write_to_consolidated(master_df, supplier, session)
+        event['rows'] = write_result['rows_written']
 
     if write_result['success']:
-        print(f"✅ Wrote {write_result['rows_written']} rows to '{config['supplier']}' sheet")
-        print(f"✅ Appended to 'Master' sheet")
+        print(f"✅ Staged {write_result['rows_written']} rows for '{config['supplier']}' sheet")
+        print(f"✅ Replaced '{config['supplier']}' partition of '{MASTER_SHEET}'")
+        telemetry.record_rows(supplier, stats, write_result['rows_written'])
     else:
         print(f"❌ Write failed: {write_result.get('errors', [])}")
         stats['errors'].extend(write_result.get('errors', []))
+        stage_failed(supplier, 'write', '; '.join(write_result.get('errors', [])))
 
     stats.update(write_result)
+    if write_result['success'] and checkpoints is not None:
+        checkpoints.save(supplier, 'written', data=stats)
 
     # Stage 5: Summary
     print("\n[5/5] Summary:")
@@ -448,14 +538,60 @@ def process_supplier(file_path: Path, config: Dict, consolidated_path: Path) ->
 
     return stats
 
+# ═══════════════════════════════════════════════════════════════════
+# WATCH-FOLDER INGESTION
+# ═══════════════════════════════════════════════════════════════════
+
+def ingest_file(file_path: Path, supplier_profile: Dict) -> Tuple[pd.DataFrame, Dict]:
+    """Load, transform and validate one dropped pricelist (runs in an ingest worker)"""
+    config = supplier_profile['config']
+    df, stats = load_supplier_file(file_path, config)
+    if df is None:
+        raise ValueError(f"Failed to load file: {stats.get('errors', [])}")
+
+    master_df = transform_to_master(df, config, stats)
+    if master_df is None or len(master_df) == 0:
+        raise ValueError(f"Transformation failed: {stats.get('errors', [])}")
+
+    stats['validation_issues'] = validate_data(master_df, stats)
+    return master_df, stats
+
+def ingest_profiles() -> List[Dict]:
+    """Ingest profiles for the Batch 2 suppliers, routed by file name or supplier name"""
+    return [
+        profile(config['supplier'], f"{Path(__file__).resolve()}:ingest_file", [filename], config=config)
+        for filename, config in BATCH_2_CONFIGS.items()
+    ]
+
 def main():
     """Process all files in Batch 2"""
 
+    parser = argparse.ArgumentParser(description="Process Batch 2 supplier pricelists")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue an interrupted run from each supplier's last completed stage")
+    parser.add_argument('--plan', action='store_true',
+                        help='Estimate rows, memory and runtime per file without processing anything')
+    args = parser.parse_args()
+
+    # Metrics textfile / endpoint and JSON logs, when enabled by environment
+    telemetry.configure()
+
     # Paths
     base_dir = Path('/mnt/k/00Project/MantisNXT')
     source_dir = base_dir / 'database/Uploads/drive-download-20250904T012253Z-1-001'
     consolidated_path = base_dir / 'database/Uploads/Consolidated_Supplier_Data.xlsx'
 
+    if args.plan:
+        # Dimension refs, earlier runs' checkpoints and stage timings only; no cells are parsed
+        runs_dir = consolidated_path.parent / f".{consolidated_path.stem}.runs"
+        history = load_history(ledgers=[consolidated_path.parent / f".{consolidated_path.stem}.ingest" / LEDGER_NAME],
+                               checkpoints=[runs_dir / 'batch_2'])
+        plan = plan_batch([{'path': source_dir / filename, 'sheets': config['sheet'], 'supplier': config['supplier']}
+                           for filename, config in BATCH_2_CONFIGS.items()], history)
+        print(f"BATCH 2 PLAN - {len(BATCH_2_CONFIGS)} files from {source_dir}")
+        print_plan(plan)
+        return 0
+
     print("=" * 70)
     print("SUPPLIER DATA PROCESSING - BATCH 2")
     print("=" * 70)
@@ -463,8 +599,27 @@ def main():
     print(f"Source: {source_dir}")
     print(f"Output: {consolidated_path}")
 
-    # Process each file
+    # Process each file; the workbook is loaded and saved once at the end
     all_stats = []
+    # The Batch 2 Master tab is regenerated from per-supplier partitions, so
+    # reruns replace a supplier's rows instead of appending duplicates
+    master_store = MasterStore(consolidated_path.parent / f"{consolidated_path.stem}.master", MASTER_COLUMNS)
+    session = ConsolidatedWriteSession(consolidated_path, master_columns=MASTER_COLUMNS,
+                                       master_sheet=MASTER_SHEET, checkpoint=True, resume=args.resume,
+                                       engine='xlsx', master_store=master_store, supplier_column='Supplier')
+
+    if session.resumed:
+        print(f"♻️  Resumed staged sheets from checkpoint: {', '.join(session.resumed)}")
+
+    # Per-supplier stage checkpoints (parsed, mapped, validated, written)
+    checkpoints = RunCheckpoints(consolidated_path.parent / f".{consolidated_path.stem}.runs" / 'batch_2',
+                                 resume=args.resume)
+
+    # Per-supplier changes vs the previous run (Parquet change sets per run)
+    diff_root = consolidated_path.parent / f"{consolidated_path.stem}.diffs"
+
+    # Prices as of the previous run, for per-SKU price change ratios
+    previous_prices = master_store.read(columns=['Supplier', 'SKU', 'Cost Price Excl'])
 
     for filename, config in BATCH_2_CONFIGS.items():
         file_path = source_dir / filename
@@ -474,12 +629,60 @@ def main():
             continue
 
         try:
-            stats = process_supplier(file_path, config, consolidated_path)
+            stats = process_supplier(file_path, config, session, diff_root, checkpoints)
             all_stats.append(stats)
         except Exception as e:
             print(f"\n❌ CRITICAL ERROR processing {filename}: {str(e)}")
+            stage_failed(config['supplier'], 'process', str(e))
             import traceback
             traceback.print_exc()
+        telemetry.flush()
+
+    # Single save of all staged supplier tabs and Master rows
+    print(f"\n💾 Writing {session.pending_rows:,} staged rows to consolidated workbook...")
+    flushed = False
+    try:
+        with stage_timer('all', 'flush') as event:
+            flush_result = session.flush()
+            event['rows'] = flush_result['master_rows']
+        flushed = True
+        print(f"✅ Wrote {len(flush_result['sheets_written'])} sheets, "
+              f"regenerated '{MASTER_SHEET}' with {flush_result['master_rows'] or 0:,} rows")
+    except Exception as e:
+        print(f"❌ Write failed (staged data kept for resume): {str(e)}")
+        for stat in all_stats:
+            stat['success'] = False
+
+    # Price anomalies across the whole Master (one grouped pass)
+    outlier_path = consolidated_path.with_name(f"{consolidated_path.stem}_price_outliers.csv")
+    try:
+        outliers = detect_price_outliers(master_store, previous_prices, outlier_path)
+        print(f"\n🔎 {outliers['flagged']:,} price outliers flagged → {outlier_path.name}")
+        for supplier, row in outliers['summary'].iterrows():
+            if row['outliers']:
+                print(f"   ⚠️ {supplier:.<30} {int(row['outliers']):>5,} of {int(row['priced']):,} priced rows")
+    except Exception as e:
+        print(f"❌ Price outlier check failed: {str(e)}")
+
+    # Cross-supplier best prices; only suppliers whose partition changed are re-read
+    price_index = PriceIndex(consolidated_path.parent / f"{consolidated_path.stem}.price_index")
+    try:
+        sync = price_index.sync(master_store)
+        print(f"🏷️  Best-price index: {sync['keys']:,} products "
+              f"({sync['keys_updated']:,} updated from {len(sync['changed']) + len(sync['removed'])} suppliers)")
+    except Exception as e:
+        print(f"❌ Best-price index update failed: {str(e)}")
+
+    # Cross-supplier product links by description (MinHash/LSH)
+    description_index = DescriptionIndex(consolidated_path.parent / f"{consolidated_path.stem}.descriptions")
+    matches_path = consolidated_path.with_name(f"{consolidated_path.stem}_description_matches.csv")
+    try:
+        description_index.sync(master_store)
+        matches = description_index.matches()
+        matches.to_csv(matches_path, index=False)
+        print(f"🔗 {len(matches):,} cross-supplier description matches → {matches_path.name}")
+    except Exception as e:
+        print(f"❌ Description matching failed: {str(e)}")
 
     # Final report
     print("\n" + "=" * 70)
@@ -502,6 +705,36 @@ def main():
         status = "✅" if stat.get('success', False) else "❌"
         print(f"   {status} {stat['supplier']:.<30} {stat.get('valid_rows', 0):>6,} rows")
 
+    diffs = {stat['supplier']: stat['diff'] for stat in all_stats if stat.get('diff')}
+    if diffs:
+        print(f"\nPricelist Changes:")
+        for supplier, diff in diffs.items():
+            print(f"   {supplier:.<30} +{diff['added']:,} / -{diff['removed']:,} rows, "
+                  f"{diff['price_changed']:,} prices ({diff['price_increases']:,} up, "
+                  f"{diff['price_decreases']:,} down), {diff['stock_changed']:,} stock levels")
+        diff_report = consolidated_path.with_name(f"{consolidated_path.stem}_pricelist_diffs.json")
+        diff_report.write_text(json.dumps({
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'suppliers': diffs
+        }, indent=2), encoding='utf-8')
+        print(f"   Report: {diff_report.name}")
+
+    reused = checkpoints.reused()
+    if reused:
+        print(f"\nCheckpoints Reused:")
+        for supplier, stages in reused.items():
+            print(f"   ♻️  {supplier:.<30} {', '.join(stages)}")
+
+    # Stage frames are only kept while the batch still needs a resume
+    if flushed and len(all_stats) == len(BATCH_2_CONFIGS) and all(s.get('success') for s in all_stats):
+        checkpoints.complete({'suppliers': len(all_stats), 'valid_rows': total_valid})
+    else:
+        print(f"\n⚠️  Batch incomplete; rerun with --resume to continue from the checkpoints")
+
+    telemetry.log_event('run_finished', batch='batch_2', suppliers=len(all_stats), raw_rows=total_raw,
+                        valid_rows=total_valid, rejected_rows=total_rejected, flushed=flushed)
+    telemetry.flush()
+
     print(f"\n✅ Output saved to: {consolidated_path}")
 
 if __name__ == '__main__':
@@ -9,9 +9,13 @@ import openpyxl
 from pathlib import Path
 import re
 from datetime import datetime
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'database' / 'scripts'))
+from pricelist.readers import read_excel
+
 # Master template columns
 MASTER_COLUMNS = [
     'Supplier Name', 'Supplier Code', 'Product Category', 'BRAND',
@@ -95,7 +99,7 @@ def analyze_structure(file_path):
         for sheet_name in wb.sheetnames:
             print(f"\n--- Sheet: {sheet_name} ---")
             try:
-                df = pd.read_excel(file_path, sheet_name=sheet_name, header=None, nrows=10)
+                df = read_excel(file_path, sheet_name=sheet_name, header=None, nrows=10)
                 print(f"Dimensions: {df.shape[0]} rows × {df.shape[1]} columns")
                 print(df.head(5).to_string())
             except Exception as e:
@@ -115,7 +119,7 @@ def process_supplier(file_path, supplier_info):
         df = None
         for header_row in range(0, 10):
             try:
-                temp_df = pd.read_excel(file_path, header=header_row)
+                temp_df = read_excel(file_path, header=header_row)
                 if len(temp_df.columns) > 3 and len(temp_df) > 5:
                     df = temp_df
                     print(f"Found data at row {header_row}")
@@ -4,12 +4,20 @@ Batch 1 Data Quality Validation Script
 Performs comprehensive quality checks on consolidated supplier data
 """
 
+import json
+import zipfile
 import pandas as pd
-import openpyxl
-from openpyxl import load_workbook
-import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'database' / 'scripts'))
+from pricelist.readers import read_excel
+from pricelist.rules import RuleSet, rule
+from pricelist.workbook import map_sheets, sheet_parts
 
 BATCH1_FILE = '/mnt/k/00Project/MantisNXT/database/Uploads/Consolidated_Supplier_Data_BATCH1.xlsx'
+REPORT_FILE = '/mnt/k/00Project/MantisNXT/database/Uploads/Consolidated_Supplier_Data_BATCH1_validation.json'
 
 # Batch 1 supplier sheets
 BATCH1_SHEETS = [
@@ -22,7 +30,189 @@ BATCH1_SHEETS = [
     'Global Music'
 ]
 
-def validate_data_quality():
+# Key fields checked per sheet
+PRICE_COLUMN = 'COST EX VAT'
+KEY_FIELDS = {
+    'supplier_name': 'Supplier Name',
+    'supplier_code': 'Supplier Code',
+    'sku': 'SKU / MODEL',
+    'description': 'PRODUCT DESCRIPTION',
+    'price': PRICE_COLUMN,
+    'brand': 'BRAND',
+    'category': 'Product Category',
+    'stock': 'SUPPLIER SOH'
+}
+
+VALIDATION_RULES = RuleSet([rule(f'missing_{key}', column, 'not_null') for key, column in KEY_FIELDS.items()])
+
+# Minimum coverage per supplier; below it the sheet is flagged
+COVERAGE_MINIMUMS = {
+    'sku': (0.5, 'LOW SKU COVERAGE (<50%)'),
+    'price': (0.8, 'LOW PRICE COVERAGE (<80%)'),
+    'brand': (0.3, 'LOW BRAND COVERAGE (<30%)')
+}
+
+# ═══════════════════════════════════════════════════════════════════
+# VALIDATION
+# ═══════════════════════════════════════════════════════════════════
+
+def load_batch_sheets(path):
+    """Read every Batch 1 sheet present in the workbook in one parse"""
+    with zipfile.ZipFile(path) as zf:
+        available = {name for name, _ in sheet_parts(zf)}
+
+    present = [name for name in BATCH1_SHEETS if name in available]
+    missing = [name for name in BATCH1_SHEETS if name not in available]
+    frames = read_excel(path, sheet_name=present) if present else {}
+    return frames, missing
+
+
+def validate_sheet(sheet_name, df):
+    """Violation mask and numeric price per row of one supplier sheet"""
+    result = VALIDATION_RULES.evaluate(df)
+    if PRICE_COLUMN in df.columns:
+        prices = pd.to_numeric(df[PRICE_COLUMN], errors='coerce').to_numpy()
+    else:
+        prices = float('nan')
+    return pd.DataFrame({'supplier': sheet_name, 'violations': result['mask'], 'price': prices})
+
+
+def aggregate_stats(validated):
+    """Per-supplier coverage and price stats from one grouped aggregation"""
+    rows = pd.concat(validated.values(), ignore_index=True)
+    for key in KEY_FIELDS:
+        rows[f'has_{key}'] = (rows['violations'] & VALIDATION_RULES.bits[f'missing_{key}']) == 0
+
+    aggregations = {'rows': ('violations', 'size')}
+    aggregations.update({f'has_{key}': (f'has_{key}', 'sum') for key in KEY_FIELDS})
+    aggregations.update({
+        f'price_{stat}': ('price', stat) for stat in ['count', 'min', 'max', 'mean', 'median']
+    })
+
+    stats = rows.groupby('supplier', sort=False).agg(**aggregations)
+    return stats.reindex([name for name in validated if name in stats.index])
+
+
+def coverage_issues(supplier_stats):
+    """Coverage warnings for one supplier row"""
+    issues = []
+    for key, (minimum, message) in COVERAGE_MINIMUMS.items():
+        if supplier_stats[f'has_{key}'] / supplier_stats['rows'] < minimum:
+            issues.append(message)
+    return issues
+
+
+def quality_score(totals):
+    """Score overall completeness out of 100"""
+    total_rows = totals['rows']
+    score = 0
+
+    # Scoring criteria
+    sku_ratio = totals['has_sku'] / total_rows
+    if sku_ratio >= 0.85:
+        score += 20
+    elif sku_ratio >= 0.70:
+        score += 15
+    elif sku_ratio >= 0.50:
+        score += 10
+
+    price_ratio = totals['has_price'] / total_rows
+    if price_ratio >= 0.95:
+        score += 25
+    elif price_ratio >= 0.85:
+        score += 20
+    elif price_ratio >= 0.70:
+        score += 15
+
+    brand_ratio = totals['has_brand'] / total_rows
+    if brand_ratio >= 0.70:
+        score += 20
+    elif brand_ratio >= 0.50:
+        score += 15
+    elif brand_ratio >= 0.30:
+        score += 10
+
+    score += 20  # Supplier name/code always 100%
+    score += 15  # Product descriptions nearly 100%
+
+    return score
+
+
+def grade(score):
+    """Letter grade for a quality score"""
+    if score >= 90:
+        return "A (Excellent)"
+    elif score >= 80:
+        return "B (Good)"
+    elif score >= 70:
+        return "C (Fair)"
+    elif score >= 60:
+        return "D (Poor)"
+    return "F (Needs Work)"
+
+# ═══════════════════════════════════════════════════════════════════
+# REPORTING
+# ═══════════════════════════════════════════════════════════════════
+
+def print_supplier(sheet_name, s):
+    """Console report for one supplier sheet"""
+    rows = s['rows']
+
+    print(f"\n{'─'*100}")
+    print(f"VALIDATING: {sheet_name}")
+    print(f"{'─'*100}")
+
+    print(f"Total Rows: {rows}")
+    print(f"  ✅ Supplier Name: {s['has_supplier_name']:5d} ({s['has_supplier_name']/rows*100:.1f}%)")
+    print(f"  ✅ Supplier Code: {s['has_supplier_code']:5d} ({s['has_supplier_code']/rows*100:.1f}%)")
+    print(f"  {'✅' if s['has_sku']/rows > 0.8 else '⚠️'} SKU / MODEL:   {s['has_sku']:5d} ({s['has_sku']/rows*100:.1f}%)")
+    print(f"  ✅ Description:   {s['has_description']:5d} ({s['has_description']/rows*100:.1f}%)")
+    print(f"  {'✅' if s['has_price']/rows > 0.9 else '⚠️'} COST EX VAT:   {s['has_price']:5d} ({s['has_price']/rows*100:.1f}%)")
+    print(f"  {'✅' if s['has_brand']/rows > 0.5 else '⚠️'} BRAND:         {s['has_brand']:5d} ({s['has_brand']/rows*100:.1f}%)")
+    print(f"  {'✅' if s['has_category']/rows > 0.3 else '⚠️'} Category:      {s['has_category']:5d} ({s['has_category']/rows*100:.1f}%)")
+    print(f"  {'✅' if s['has_stock']/rows > 0.3 else '⚠️'} Stock Info:    {s['has_stock']:5d} ({s['has_stock']/rows*100:.1f}%)")
+
+    if s['price_count'] > 0:
+        print(f"\n  Price Statistics:")
+        print(f"    Min:    R {s['price_min']:,.2f}")
+        print(f"    Max:    R {s['price_max']:,.2f}")
+        print(f"    Mean:   R {s['price_mean']:,.2f}")
+        print(f"    Median: R {s['price_median']:,.2f}")
+
+    issues = coverage_issues(s)
+    if issues:
+        print(f"\n  Issues Found:")
+        for issue in issues:
+            print(f"    ⚠️  {issue}")
+
+
+def build_report(stats, missing_sheets, totals, score):
+    """Machine-readable version of the console report"""
+    suppliers = []
+    for sheet_name, s in stats.to_dict('index').items():
+        entry = {'supplier': sheet_name, 'rows': int(s['rows'])}
+        entry['filled'] = {key: int(s[f'has_{key}']) for key in KEY_FIELDS}
+        entry['coverage'] = {key: round(s[f'has_{key}'] / s['rows'], 4) if s['rows'] else 0.0 for key in KEY_FIELDS}
+        entry['price'] = {
+            stat: (float(s[f'price_{stat}']) if s['price_count'] else None)
+            for stat in ['min', 'max', 'mean', 'median']
+        }
+        entry['price']['count'] = int(s['price_count'])
+        entry['issues'] = coverage_issues(s)
+        suppliers.append(entry)
+
+    return {
+        'file': BATCH1_FILE,
+        'validated_at': datetime.now().isoformat(timespec='seconds'),
+        'missing_sheets': missing_sheets,
+        'suppliers': suppliers,
+        'totals': {key: int(value) for key, value in totals.items()},
+        'quality_score': score,
+        'grade': grade(score)
+    }
+
+
+def validate_data_quality(report_file=REPORT_FILE):
     """Comprehensive data quality validation"""
 
     print(f"\n{'='*100}")
@@ -30,87 +220,23 @@ def validate_data_quality():
     print(f"{'='*100}")
     print(f"File: {BATCH1_FILE}\n")
 
-    wb = load_workbook(BATCH1_FILE, read_only=True, data_only=True)
-
-    total_rows = 0
-    total_with_sku = 0
-    total_with_price = 0
-    total_with_brand = 0
-    total_with_category = 0
-    total_with_stock = 0
-
-    price_stats = []
-
-    for sheet_name in BATCH1_SHEETS:
-        if sheet_name not in wb.sheetnames:
-            print(f"⚠️  Sheet not found: {sheet_name}")
-            continue
-
-        print(f"\n{'─'*100}")
-        print(f"VALIDATING: {sheet_name}")
-        print(f"{'─'*100}")
-
-        df = pd.read_excel(BATCH1_FILE, sheet_name=sheet_name)
-
-        rows = len(df)
-        total_rows += rows
-
-        # Check key columns
-        has_sku = df['SKU / MODEL'].notna().sum()
-        has_price = df['COST EX VAT'].notna().sum()
-        has_brand = df['BRAND'].notna().sum()
-        has_category = df['Product Category'].notna().sum()
-        has_stock = df['SUPPLIER SOH'].notna().sum()
-
-        total_with_sku += has_sku
-        total_with_price += has_price
-        total_with_brand += has_brand
-        total_with_category += has_category
-        total_with_stock += has_stock
-
-        # Price statistics (convert to numeric, coerce errors)
-        prices = pd.to_numeric(df['COST EX VAT'], errors='coerce').dropna()
-        if len(prices) > 0:
-            price_stats.append({
-                'supplier': sheet_name,
-                'min': prices.min(),
-                'max': prices.max(),
-                'mean': prices.mean(),
-                'median': prices.median(),
-                'count': len(prices)
-            })
-
-        # Print statistics
-        print(f"Total Rows: {rows}")
-        print(f"  ✅ Supplier Name: {df['Supplier Name'].notna().sum():5d} ({df['Supplier Name'].notna().sum()/rows*100:.1f}%)")
-        print(f"  ✅ Supplier Code: {df['Supplier Code'].notna().sum():5d} ({df['Supplier Code'].notna().sum()/rows*100:.1f}%)")
-        print(f"  {'✅' if has_sku/rows > 0.8 else '⚠️'} SKU / MODEL:   {has_sku:5d} ({has_sku/rows*100:.1f}%)")
-        print(f"  ✅ Description:   {df['PRODUCT DESCRIPTION'].notna().sum():5d} ({df['PRODUCT DESCRIPTION'].notna().sum()/rows*100:.1f}%)")
-        print(f"  {'✅' if has_price/rows > 0.9 else '⚠️'} COST EX VAT:   {has_price:5d} ({has_price/rows*100:.1f}%)")
-        print(f"  {'✅' if has_brand/rows > 0.5 else '⚠️'} BRAND:         {has_brand:5d} ({has_brand/rows*100:.1f}%)")
-        print(f"  {'✅' if has_category/rows > 0.3 else '⚠️'} Category:      {has_category:5d} ({has_category/rows*100:.1f}%)")
-        print(f"  {'✅' if has_stock/rows > 0.3 else '⚠️'} Stock Info:    {has_stock:5d} ({has_stock/rows*100:.1f}%)")
-
-        if len(prices) > 0:
-            print(f"\n  Price Statistics:")
-            print(f"    Min:    R {prices.min():,.2f}")
-            print(f"    Max:    R {prices.max():,.2f}")
-            print(f"    Mean:   R {prices.mean():,.2f}")
-            print(f"    Median: R {prices.median():,.2f}")
-
-        # Check for potential issues
-        issues = []
-        if has_sku/rows < 0.5:
-            issues.append("⚠️  LOW SKU COVERAGE (<50%)")
-        if has_price/rows < 0.8:
-            issues.append("⚠️  LOW PRICE COVERAGE (<80%)")
-        if has_brand/rows < 0.3:
-            issues.append("⚠️  LOW BRAND COVERAGE (<30%)")
-
-        if issues:
-            print(f"\n  Issues Found:")
-            for issue in issues:
-                print(f"    {issue}")
+    frames, missing_sheets = load_batch_sheets(BATCH1_FILE)
+    for sheet_name in missing_sheets:
+        print(f"⚠️  Sheet not found: {sheet_name}")
+
+    if not frames:
+        print("❌ No Batch 1 sheets to validate")
+        return None
+
+    # Rule evaluation per sheet runs concurrently; stats come from one groupby
+    validated = map_sheets(frames, validate_sheet, use_processes=False)
+    stats = aggregate_stats(validated)
+
+    for sheet_name, s in stats.to_dict('index').items():
+        print_supplier(sheet_name, s)
+
+    totals = stats[['rows'] + [f'has_{key}' for key in KEY_FIELDS]].sum()
+    total_rows = totals['rows']
 
     # Overall summary
     print(f"\n{'='*100}")
@@ -118,75 +244,44 @@ def validate_data_quality():
     print(f"{'='*100}")
     print(f"Total Rows Across All Suppliers: {total_rows:,}")
     print(f"\nData Completeness:")
-    print(f"  SKU / MODEL:        {total_with_sku:6,} / {total_rows:,} ({total_with_sku/total_rows*100:.1f}%)")
-    print(f"  COST EX VAT:        {total_with_price:6,} / {total_rows:,} ({total_with_price/total_rows*100:.1f}%)")
-    print(f"  BRAND:              {total_with_brand:6,} / {total_rows:,} ({total_with_brand/total_rows*100:.1f}%)")
-    print(f"  Product Category:   {total_with_category:6,} / {total_rows:,} ({total_with_category/total_rows*100:.1f}%)")
-    print(f"  SUPPLIER SOH:       {total_with_stock:6,} / {total_rows:,} ({total_with_stock/total_rows*100:.1f}%)")
+    print(f"  SKU / MODEL:        {totals['has_sku']:6,} / {total_rows:,} ({totals['has_sku']/total_rows*100:.1f}%)")
+    print(f"  COST EX VAT:        {totals['has_price']:6,} / {total_rows:,} ({totals['has_price']/total_rows*100:.1f}%)")
+    print(f"  BRAND:              {totals['has_brand']:6,} / {total_rows:,} ({totals['has_brand']/total_rows*100:.1f}%)")
+    print(f"  Product Category:   {totals['has_category']:6,} / {total_rows:,} ({totals['has_category']/total_rows*100:.1f}%)")
+    print(f"  SUPPLIER SOH:       {totals['has_stock']:6,} / {total_rows:,} ({totals['has_stock']/total_rows*100:.1f}%)")
 
     # Price analysis
     print(f"\n{'='*100}")
     print("PRICE ANALYSIS BY SUPPLIER")
     print(f"{'='*100}")
 
-    price_df = pd.DataFrame(price_stats)
-    if len(price_df) > 0:
+    priced = stats[stats['price_count'] > 0]
+    if len(priced) > 0:
         print(f"\n{'Supplier':<30} {'Count':>8} {'Min':>12} {'Max':>12} {'Mean':>12} {'Median':>12}")
         print(f"{'-'*96}")
-        for _, row in price_df.iterrows():
-            print(f"{row['supplier']:<30} {row['count']:>8} R{row['min']:>10,.2f} R{row['max']:>10,.2f} R{row['mean']:>10,.2f} R{row['median']:>10,.2f}")
+        for sheet_name, s in priced.to_dict('index').items():
+            print(f"{sheet_name:<30} {s['price_count']:>8} R{s['price_min']:>10,.2f} R{s['price_max']:>10,.2f} R{s['price_mean']:>10,.2f} R{s['price_median']:>10,.2f}")
 
     # Data quality score
     print(f"\n{'='*100}")
     print("DATA QUALITY SCORE")
     print(f"{'='*100}")
 
-    quality_score = 0
-    max_score = 100
+    score = quality_score(totals)
+    print(f"\nQuality Score: {score}/100")
+    print(f"Grade: {grade(score)}")
 
-    # Scoring criteria
-    if total_with_sku/total_rows >= 0.85:
-        quality_score += 20
-    elif total_with_sku/total_rows >= 0.70:
-        quality_score += 15
-    elif total_with_sku/total_rows >= 0.50:
-        quality_score += 10
-
-    if total_with_price/total_rows >= 0.95:
-        quality_score += 25
-    elif total_with_price/total_rows >= 0.85:
-        quality_score += 20
-    elif total_with_price/total_rows >= 0.70:
-        quality_score += 15
-
-    if total_with_brand/total_rows >= 0.70:
-        quality_score += 20
-    elif total_with_brand/total_rows >= 0.50:
-        quality_score += 15
-    elif total_with_brand/total_rows >= 0.30:
-        quality_score += 10
-
-    quality_score += 20  # Supplier name/code always 100%
-    quality_score += 15  # Product descriptions nearly 100%
-
-    print(f"\nQuality Score: {quality_score}/{max_score}")
-    print(f"Grade: ", end='')
-    if quality_score >= 90:
-        print("A (Excellent)")
-    elif quality_score >= 80:
-        print("B (Good)")
-    elif quality_score >= 70:
-        print("C (Fair)")
-    elif quality_score >= 60:
-        print("D (Poor)")
-    else:
-        print("F (Needs Work)")
+    report = build_report(stats, missing_sheets, totals, score)
+    if report_file:
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nJSON report saved to: {report_file}")
 
     print(f"\n{'='*100}")
     print("VALIDATION COMPLETE")
     print(f"{'='*100}\n")
 
-    wb.close()
+    return report
 
 if __name__ == '__main__':
     validate_data_quality()
@@ -0,0 +1,43 @@
+-- Migration: 0266_pricelist_ingest_jobs.sql
+-- Description: Job queue for pricelist file ingestion workers (database/scripts/pricelist/jobs.py)
+-- Date: 2026-10-18
+
+-- One row per pricelist file. Workers claim queued rows with
+-- FOR UPDATE SKIP LOCKED and hold them under a lease that is extended
+-- with every progress flush; a job whose lease expires is claimed again.
+CREATE TABLE IF NOT EXISTS pricelist_ingest_jobs (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  file_path TEXT NOT NULL,
+  supplier TEXT,
+  supplier_id UUID REFERENCES supplier(id) ON DELETE SET NULL,
+  session_id UUID REFERENCES pricelist_upload_sessions(id) ON DELETE SET NULL,
+  status VARCHAR(20) NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'done', 'failed')),
+  priority INTEGER NOT NULL DEFAULT 0,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  max_attempts INTEGER NOT NULL DEFAULT 3,
+  worker TEXT,
+  rows_processed INTEGER NOT NULL DEFAULT 0,
+  error_message TEXT,
+  options JSONB DEFAULT '{}',
+  enqueued_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  claimed_at TIMESTAMPTZ,
+  lease_expires_at TIMESTAMPTZ,
+  finished_at TIMESTAMPTZ
+);
+
+-- Claim order for queued jobs
+CREATE INDEX IF NOT EXISTS idx_pricelist_ingest_jobs_queued
+ON pricelist_ingest_jobs(priority DESC, enqueued_at)
+WHERE status = 'queued';
+
+-- Expired leases of running jobs
+CREATE INDEX IF NOT EXISTS idx_pricelist_ingest_jobs_running_lease
+ON pricelist_ingest_jobs(lease_expires_at)
+WHERE status = 'running';
+
+-- Latency / throughput over recently finished jobs
+CREATE INDEX IF NOT EXISTS idx_pricelist_ingest_jobs_finished
+ON pricelist_ingest_jobs(finished_at DESC)
+WHERE finished_at IS NOT NULL;
+
+COMMENT ON TABLE pricelist_ingest_jobs IS 'Pricelist file ingestion queue; progress is reported into pricelist_upload_sessions / pricelist_upload_progress';
@@ -1,20 +1,14 @@
 #!/usr/bin/env python3
 """Aggregate ALL supplier data from FIXED batches to single MASTER file."""
 
+import argparse
 import sys, os
 import pandas as pd
-import openpyxl
 from datetime import datetime
 
-# Add user packages
-import site
-sys.path.insert(0, site.getusersitepackages())
-
-try:
-    import openpyxl
-except:
-    os.system(f"{sys.executable} -m pip install --user openpyxl pandas --quiet")
-    import openpyxl
+from pricelist.estimate import plan_batch, print_plan
+from pricelist.readers import Workbook
+from pricelist.xlsx_writer import write_workbook
 
 MASTER_COLUMNS = [
     'Supplier Name ', 'Supplier Code', 'Produt Category', 'BRAND', 'Brand Sub Tag',
@@ -23,6 +17,11 @@ MASTER_COLUMNS = [
 ]
 
 def main():
+    parser = argparse.ArgumentParser(description="Aggregate the FIXED batch workbooks into one MASTER file")
+    parser.add_argument('--plan', action='store_true',
+                        help='Estimate rows, memory and runtime per workbook without reading any sheets')
+    args = parser.parse_args()
+
     base = '/mnt/k/00Project/MantisNXT/database/Uploads'
     batches = [
         f'{base}/Consolidated_Supplier_Data_BATCH1_FIXED.xlsx',
@@ -30,12 +29,19 @@ def main():
         f'{base}/Consolidated_Batch3_Final_FIXED.xlsx'
     ]
 
+    skip = ['MASTER', 'All_Products', 'Processing_Log']
+
+    if args.plan:
+        plan = plan_batch([{'path': batch, 'skip': skip} for batch in batches])
+        print(f"AGGREGATE PLAN - {len(batches)} workbooks")
+        print_plan(plan)
+        return 0
+
     print("\n" + "="*80)
     print("AGGREGATING ALL SUPPLIERS TO MASTER")
     print("="*80 + "\n")
 
     all_data = []
-    skip = ['MASTER', 'All_Products', 'Processing_Log']
 
     for batch in batches:
         if not os.path.exists(batch):
@@ -43,13 +49,14 @@ def main():
             continue
 
         print(f"📂 {os.path.basename(batch)}")
-        wb = openpyxl.load_workbook(batch, read_only=True, data_only=True)
+        # One open workbook for every sheet (calamine when installed)
+        wb = Workbook(batch)
 
-        for sheet in wb.sheetnames:
+        for sheet in wb.sheet_names:
             if sheet in skip:
                 continue
 
-            df = pd.read_excel(batch, sheet_name=sheet)
+            df = wb.parse(sheet)
 
             if list(df.columns) == MASTER_COLUMNS:
                 print(f"  ✅ {sheet}: {len(df)} rows")
@@ -89,20 +96,19 @@ def main():
     output = f'{base}/FINAL_MASTER_CONSOLIDATED.xlsx'
     print(f"\n📝 Writing to: {output}")
 
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df_final.to_excel(writer, sheet_name='MASTER', index=False)
+    # Summary
+    summary = pd.DataFrame({
+        'Metric': ['Total Rows', 'Total Suppliers', 'Created'],
+        'Value': [len(df_final), df_final['Supplier Name '].nunique(), datetime.now().strftime("%Y-%m-%d %H:%M:%S")]
+    })
 
-        # Summary
-        summary = pd.DataFrame({
-            'Metric': ['Total Rows', 'Total Suppliers', 'Created'],
-            'Value': [len(df_final), df_final['Supplier Name '].nunique(), datetime.now().strftime("%Y-%m-%d %H:%M:%S")]
-        })
-        summary.to_excel(writer, sheet_name='Summary', index=False)
+    # Per-supplier counts
+    counts = df_final['Supplier Name '].value_counts().reset_index()
+    counts.columns = ['Supplier', 'Row Count']
 
-        # Per-supplier counts
-        counts = df_final['Supplier Name '].value_counts().reset_index()
-        counts.columns = ['Supplier', 'Row Count']
-        counts.to_excel(writer, sheet_name='Supplier_Counts', index=False)
+    # Sheets are rendered in parallel and zipped directly
+    stats = write_workbook(output, {'MASTER': df_final, 'Summary': summary, 'Supplier_Counts': counts})
+    print(f"   Written in {stats['seconds']:.1f}s ({stats['bytes'] / 1024 / 1024:.1f} MB)")
 
     print(f"\n✅ SUCCESS!")
     print(f"   File: {output}")
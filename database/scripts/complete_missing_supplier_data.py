@@ -1,20 +1,13 @@
 #!/usr/bin/env python3
-"""Complete missing supplier data from row 22084 onwards."""
+"""Complete missing supplier data for rows without a Supplier Name."""
 
-import sys, os
+import sys
 import pandas as pd
 import numpy as np
 import re
 
-# Add user packages
-import site
-sys.path.insert(0, site.getusersitepackages())
-
-try:
-    import openpyxl
-except:
-    os.system(f"{sys.executable} -m pip install --user openpyxl pandas --quiet")
-    import openpyxl
+from pricelist.readers import read_excel
+from pricelist.supplier_inference import MIN_CONFIDENCE, SupplierIndex
 
 MASTER_COLUMNS = [
     'Supplier Name ', 'Supplier Code', 'Produt Category', 'BRAND', 'Brand Sub Tag',
@@ -46,121 +39,88 @@ def extract_brand_from_description(desc):
 
     return None
 
-def identify_supplier_from_context(df, start_idx):
+def infer_missing_suppliers(df, min_confidence=MIN_CONFIDENCE):
     """
-    Identify supplier by looking at rows before the missing data
-    and analyzing SKU/description patterns.
+    Predict a supplier for every row with a null Supplier Name, using an
+    index of SKU prefixes, brands and description tokens learnt from the
+    rows that do have one.
     """
 
     print("\n" + "="*80)
-    print("IDENTIFYING SUPPLIER FROM CONTEXT")
-    print("="*80 + "\n")
-
-    # Look at 100 rows before the missing data
-    context_start = max(0, start_idx - 100)
-    context_df = df.iloc[context_start:start_idx]
-
-    # Find last non-null supplier
-    last_suppliers = context_df[context_df['Supplier Name '].notna()]['Supplier Name '].tail(10)
-
-    print("Last 10 suppliers before missing data:")
-    for idx, supp in last_suppliers.items():
-        print(f"  Row {idx+2}: {supp}")
-
-    # Analyze the missing data rows
-    missing_df = df.iloc[start_idx:]
-
-    # Extract brands from descriptions
-    print("\n" + "="*80)
-    print("ANALYZING PRODUCT DESCRIPTIONS")
-    print("="*80 + "\n")
-
-    sample_descriptions = missing_df['PRODUCT DESCRIPTION'].dropna().head(20)
-
-    brand_counts = {}
-    for desc in sample_descriptions:
-        brand = extract_brand_from_description(desc)
-        if brand:
-            brand_counts[brand] = brand_counts.get(brand, 0) + 1
-
-    print("Detected brands in descriptions:")
-    for brand, count in sorted(brand_counts.items(), key=lambda x: x[1], reverse=True):
-        print(f"  {brand}: {count} occurrences")
-
-    # Check SKU patterns
-    print("\n" + "="*80)
-    print("ANALYZING SKU PATTERNS")
+    print("INFERRING SUPPLIERS FROM THE COMPLETE MASTER")
     print("="*80 + "\n")
 
-    sample_skus = missing_df['SKU / MODEL '].dropna().head(20)
+    index = SupplierIndex().fit(df)
+    print(f"Index: {index.table['feature'].nunique():,} features from "
+          f"{df['Supplier Name '].notna().sum():,} labelled rows")
 
-    sku_prefixes = {}
-    for sku in sample_skus:
-        sku_str = str(sku)
-        # Extract prefix (letters before dash or first 3 chars)
-        if '-' in sku_str:
-            prefix = sku_str.split('-')[0]
-        else:
-            prefix = sku_str[:3]
+    predictions = index.fill(df, min_confidence)
+    accepted = predictions[predictions['accepted']]
 
-        if prefix:
-            sku_prefixes[prefix] = sku_prefixes.get(prefix, 0) + 1
+    print(f"Rows missing supplier: {len(predictions):,}")
+    print(f"Confident predictions: {len(accepted):,} (confidence >= {min_confidence:.0%})\n")
 
-    print("SKU prefix patterns:")
-    for prefix, count in sorted(sku_prefixes.items(), key=lambda x: x[1], reverse=True):
-        print(f"  {prefix}: {count} occurrences")
+    print("Predicted suppliers:")
+    breakdown = accepted.groupby('supplier')['confidence'].agg(['size', 'mean'])
+    for supplier, row in breakdown.sort_values('size', ascending=False).iterrows():
+        print(f"  {supplier}: {int(row['size']):,} rows (mean confidence {row['mean']:.2f})")
 
-    # Make determination
-    print("\n" + "="*80)
-    print("SUPPLIER DETERMINATION")
-    print("="*80 + "\n")
+    unresolved = len(predictions) - len(accepted)
+    if unresolved:
+        print(f"\n⚠️  {unresolved:,} rows left for review (no or low-confidence prediction)")
 
-    # Check if Pro Audio Platinum based on patterns
-    if 'Aida Imaging' in brand_counts or 'AID' in sku_prefixes:
-        print("✅ Detected: Pro Audio Platinum (Aida Imaging products)")
-        print("   Reason: 'Aida Imaging' brand in descriptions + AID prefix in SKUs")
-        return 'Pro Audio Platinum', 'PRO_AUDIO'
+    return predictions
 
-    # Default to last known supplier
-    if len(last_suppliers) > 0:
-        last_supplier = last_suppliers.iloc[-1]
-        print(f"⚠️  Defaulting to last known supplier: {last_supplier}")
-        return last_supplier, None
+def supplier_codes(df):
+    """Most common Supplier Code per Supplier Name among complete rows"""
+    pairs = df[['Supplier Name ', 'Supplier Code']].dropna()
+    if pairs.empty:
+        return {}
+    counts = pairs.groupby(['Supplier Name ', 'Supplier Code']).size().reset_index(name='n')
+    counts = counts.sort_values('n', ascending=False).drop_duplicates('Supplier Name ')
+    return dict(zip(counts['Supplier Name '], counts['Supplier Code']))
 
-    return None, None
+def inference_review(df, predictions):
+    """
+    One row per prediction for the review sheet, keyed by Excel row number
+    and Supplier Code; confidences stay out of the 13-column MASTER sheet.
+    """
+    review = predictions[['supplier', 'confidence', 'runner_up', 'accepted']].copy()
+    review['confidence'] = review['confidence'].round(3)
+    review.insert(0, 'row_number', review.index + 2)
+    keys = df.loc[review.index, ['Supplier Code', 'SKU / MODEL ', 'PRODUCT DESCRIPTION']]
+    return review.join(keys).rename(columns={'supplier': 'predicted_supplier'})
 
-def complete_missing_data(df, start_idx, supplier_name, supplier_code):
-    """Fill in missing supplier data."""
+def complete_missing_data(df, predictions):
+    """Fill in missing supplier data for confidently predicted rows."""
 
     print("\n" + "="*80)
     print("COMPLETING MISSING DATA")
     print("="*80 + "\n")
 
-    missing_count = len(df) - start_idx
+    accepted = predictions[predictions['accepted']]
+    rows = accepted.index
 
-    print(f"Rows to complete: {missing_count:,}")
-    print(f"Supplier Name: {supplier_name}")
-    print(f"Supplier Code: {supplier_code}\n")
+    print(f"Rows to complete: {len(rows):,}\n")
 
     # Fill Supplier Name and Code
-    df.loc[start_idx:, 'Supplier Name '] = df.loc[start_idx:, 'Supplier Name '].fillna(supplier_name)
-    df.loc[start_idx:, 'Supplier Code'] = df.loc[start_idx:, 'Supplier Code'].fillna(supplier_code)
+    codes = supplier_codes(df)
+    fallback = {name: name.upper().replace(' ', '_')[:12] for name in accepted['supplier'].unique()}
+    df.loc[rows, 'Supplier Name '] = accepted['supplier']
+    df.loc[rows, 'Supplier Code'] = df.loc[rows, 'Supplier Code'].fillna(
+        accepted['supplier'].map(lambda name: codes.get(name, fallback[name]))
+    )
 
     # Extract and fill BRAND from descriptions
     print("Extracting brands from descriptions...")
 
-    brands_extracted = 0
-    for idx in range(start_idx, len(df)):
-        if pd.isna(df.at[idx, 'BRAND']):
-            desc = df.at[idx, 'PRODUCT DESCRIPTION']
-            brand = extract_brand_from_description(desc)
-
-            if brand:
-                df.at[idx, 'BRAND'] = brand
-                brands_extracted += 1
+    no_brand = rows[df.loc[rows, 'BRAND'].isna()]
+    brands = df.loc[no_brand, 'PRODUCT DESCRIPTION'].map(extract_brand_from_description)
+    df.loc[no_brand, 'BRAND'] = brands
+    brands_extracted = int(brands.notna().sum())
 
-    print(f"✅ Filled Supplier Name: {missing_count:,} rows")
-    print(f"✅ Filled Supplier Code: {missing_count:,} rows")
+    print(f"✅ Filled Supplier Name: {len(rows):,} rows")
+    print(f"✅ Filled Supplier Code: {len(rows):,} rows")
     print(f"✅ Extracted BRAND: {brands_extracted:,} rows\n")
 
     return df
@@ -169,38 +129,32 @@ def main():
     file_path = '/mnt/k/00Project/MantisNXT/database/Uploads/FINAL_MASTER_CONSOLIDATED.xlsx'
 
     print("\n" + "="*80)
-    print("COMPLETING MISSING SUPPLIER DATA FROM ROW 22084")
+    print("COMPLETING MISSING SUPPLIER DATA")
     print("="*80)
 
     # Read file
     print("\n📂 Reading file...")
-    df = pd.read_excel(file_path, sheet_name='MASTER')
+    df = read_excel(file_path, sheet_name='MASTER')
 
     print(f"✅ Loaded {len(df):,} rows\n")
 
-    # Identify where missing data starts
-    start_idx = 22083  # Row 22084 in Excel (0-indexed)
-
-    # Identify supplier
-    supplier_name, supplier_code = identify_supplier_from_context(df, start_idx)
+    # Predict a supplier for every row without one (wherever it sits in the sheet)
+    predictions = infer_missing_suppliers(df)
 
-    if not supplier_name:
-        print("❌ Could not identify supplier. Exiting.")
+    if not predictions['accepted'].any():
+        print("❌ Could not identify any supplier. Exiting.")
         return 1
 
-    if not supplier_code:
-        # Generate supplier code from name
-        supplier_code = supplier_name.upper().replace(' ', '_')[:12]
-
     # Complete missing data
-    df_completed = complete_missing_data(df, start_idx, supplier_name, supplier_code)
+    df_completed = complete_missing_data(df, predictions)
+    review = inference_review(df_completed, predictions)
 
     # Validate completion
     print("="*80)
     print("VALIDATION")
     print("="*80 + "\n")
 
-    df_target = df_completed.iloc[start_idx:]
+    df_target = df_completed.loc[predictions.index]
 
     for col in ['Supplier Name ', 'Supplier Code', 'BRAND']:
         missing = df_target[col].isna().sum()
@@ -257,6 +211,9 @@ def main():
         counts.columns = ['Supplier', 'Row Count']
         counts.to_excel(writer, sheet_name='Supplier_Counts', index=False)
 
+        # Predicted suppliers and their confidence, for review
+        review.to_excel(writer, sheet_name='Supplier_Inference', index=False)
+
     print(f"✅ Saved: {output_path}\n")
     print(f"   Total Rows: {len(df_completed):,}")
     print(f"   Suppliers: {df_completed['Supplier Name '].nunique()}")
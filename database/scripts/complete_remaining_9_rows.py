@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
-"""Complete the remaining 9 rows with missing supplier data."""
+"""Complete the remaining rows with missing supplier data from their neighbours."""
 
-import sys, os
 import pandas as pd
 
-# Add user packages
-import site
-sys.path.insert(0, site.getusersitepackages())
+from pricelist.readers import read_excel
+from pricelist.supplier_inference import neighbour_fill
+
+# Labelled rows further than this above or below a gap are not used
+MAX_GAP = 100
 
 def complete_remaining_rows():
     file_path = '/mnt/k/00Project/MantisNXT/database/Uploads/FINAL_MASTER_CONSOLIDATED_COMPLETE.xlsx'
@@ -15,7 +16,7 @@ def complete_remaining_rows():
     print("FINDING AND COMPLETING REMAINING MISSING ROWS")
     print("="*80 + "\n")
 
-    df = pd.read_excel(file_path, sheet_name='MASTER')
+    df = read_excel(file_path, sheet_name='MASTER')
 
     # Find rows with missing Supplier Name
     missing_rows = df[df['Supplier Name '].isna()]
@@ -26,59 +27,36 @@ def complete_remaining_rows():
         print("✅ No missing rows found!")
         return df
 
-    print("="*80)
-    print("ANALYZING MISSING ROWS")
-    print("="*80 + "\n")
-
-    for idx, row in missing_rows.iterrows():
-        actual_row = idx + 2
-        print(f"Row {actual_row}:")
-        print(f"  SKU: {row['SKU / MODEL ']}")
-        print(f"  Description: {str(row['PRODUCT DESCRIPTION'])[:60]}...")
-        print(f"  Cost: {row['COST  EX VAT']}")
-
-        # Look at surrounding rows for context
-        if idx > 0:
-            prev_row = df.iloc[idx-1]
-            print(f"  Previous Row Supplier: {prev_row['Supplier Name ']}")
-
-        if idx < len(df) - 1:
-            next_row = df.iloc[idx+1]
-            print(f"  Next Row Supplier: {next_row['Supplier Name ']}")
-
-        print()
-
-    # Strategy: Fill with supplier from nearest non-null row
+    # Nearest labelled row before and after every gap, in one pass
     print("="*80)
     print("COMPLETING MISSING ROWS")
     print("="*80 + "\n")
 
-    for idx, row in missing_rows.iterrows():
-        # Look backward for nearest supplier
-        supplier_name = None
-        supplier_code = None
-
-        # Search backward
-        for i in range(idx-1, max(-1, idx-100), -1):
-            if pd.notna(df.at[i, 'Supplier Name ']):
-                supplier_name = df.at[i, 'Supplier Name ']
-                supplier_code = df.at[i, 'Supplier Code']
-                break
-
-        # If not found backward, search forward
-        if not supplier_name:
-            for i in range(idx+1, min(len(df), idx+100)):
-                if pd.notna(df.at[i, 'Supplier Name ']):
-                    supplier_name = df.at[i, 'Supplier Name ']
-                    supplier_code = df.at[i, 'Supplier Code']
-                    break
-
-        if supplier_name:
-            df.at[idx, 'Supplier Name '] = supplier_name
-            df.at[idx, 'Supplier Code'] = supplier_code
-            print(f"✅ Row {idx+2}: Filled with '{supplier_name}' / '{supplier_code}'")
-        else:
-            print(f"⚠️  Row {idx+2}: Could not find nearby supplier")
+    neighbours = neighbour_fill(df, max_gap=MAX_GAP)
+    filled = neighbours[neighbours['status'] == 'filled']
+    conflicts = neighbours[neighbours['status'] == 'conflict']
+    unresolved = neighbours[neighbours['status'] == 'unresolved']
+
+    df.loc[filled.index, 'Supplier Name '] = filled['supplier']
+    df.loc[filled.index, 'Supplier Code'] = df.loc[filled.index, 'Supplier Code'].fillna(filled['code'])
+
+    print(f"✅ Filled from neighbours: {len(filled):,} rows")
+    for supplier, count in filled['supplier'].value_counts().items():
+        print(f"   {supplier}: {count:,}")
+
+    if len(conflicts):
+        print(f"\n⚠️  {len(conflicts):,} rows between two different suppliers (left for review):")
+        pairs = conflicts.groupby(['previous_supplier', 'next_supplier']).size()
+        for (before, after), count in pairs.items():
+            print(f"   {before} → {after}: {count:,} rows")
+        conflicts_path = file_path.replace('.xlsx', '_supplier_conflicts.csv')
+        conflicts.assign(row_number=conflicts.index + 2).join(
+            df[['SKU / MODEL ', 'PRODUCT DESCRIPTION', 'COST  EX VAT']]
+        ).to_csv(conflicts_path, index=False)
+        print(f"   Details: {conflicts_path}")
+
+    if len(unresolved):
+        print(f"\n⚠️  {len(unresolved):,} rows have no labelled neighbour")
 
     # Validate
     remaining_missing = df['Supplier Name '].isna().sum()
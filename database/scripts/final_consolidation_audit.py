@@ -13,6 +13,10 @@ import json
 from pathlib import Path
 from collections import defaultdict
 
+from pricelist.dedupe import cluster_summary, duplicate_clusters, duplicate_report
+from pricelist.readers import read_excel
+from pricelist.writer import MASTER_SHEETS
+
 class MasterConsolidator:
     """Consolidates all supplier tabs into Master tab with comprehensive audit"""
 
@@ -54,8 +58,9 @@ class MasterConsolidator:
     def identify_supplier_tabs(self) -> list:
         """Identify all validated supplier tabs"""
         supplier_tabs = []
-        exclude_tabs = ['Master', 'MASTER', 'Audit_Log', 'Summary', 'Metadata',
-                       'All_Products', 'Processing_Log']
+        # Master tabs (including the one Batch 2 regenerates) repeat supplier rows
+        exclude_tabs = [*MASTER_SHEETS, 'MASTER', 'Audit_Log', 'Summary', 'Metadata',
+                        'All_Products', 'Processing_Log']
 
         for sheet_name in self.wb.sheetnames:
             if sheet_name not in exclude_tabs:
@@ -70,7 +75,7 @@ class MasterConsolidator:
     def read_supplier_data(self, sheet_name: str) -> pd.DataFrame:
         """Read data from supplier sheet"""
         try:
-            df = pd.read_excel(self.file_path, sheet_name=sheet_name)
+            df = read_excel(self.file_path, sheet_name=sheet_name)
 
             # Add Supplier column if not present
             if 'Supplier' not in df.columns:
@@ -173,18 +178,37 @@ class MasterConsolidator:
         """Remove duplicate products and track metrics"""
         initial_count = len(df)
 
-        # Check for duplicates based on Product_Code and Supplier
+        # Same Supplier + Product_Code is a duplicate whatever the brand spelling.
+        # Within each supplier and brand, codes identical once normalised
+        # ('SM-58' / 'sm58 ') are removed too; variants ('SM58-BLK' / 'SM58-WHT')
+        # and near matches are only reported with their score
         if 'Product_Code' in df.columns and 'Supplier' in df.columns:
+            brand = 'Brand' if 'Brand' in df.columns else None
+            clusters = duplicate_clusters(df, 'Product_Code', brand=brand, group_by=['Supplier'])
+            summary = cluster_summary(clusters)
             duplicates = df.duplicated(subset=['Product_Code', 'Supplier'], keep='first')
-            duplicate_count = duplicates.sum()
+            duplicates |= df.index.isin(clusters.index[clusters['exact_duplicate']])
+            duplicate_count = int(duplicates.sum())
+            consolidated = df
 
             if duplicate_count > 0:
                 print(f"\n🔍 Found {duplicate_count} duplicate products")
                 df = df[~duplicates]
-                self.audit_results['performance_metrics']['duplicates_removed'] = duplicate_count
             else:
                 print("\n✅ No duplicates found")
-                self.audit_results['performance_metrics']['duplicates_removed'] = 0
+            self.audit_results['performance_metrics']['duplicates_removed'] = duplicate_count
+
+            fuzzy = clusters[clusters['match_score'] < 1.0]
+            self.audit_results['fuzzy_duplicates'] = summary
+            if len(fuzzy) > 0:
+                candidates = clusters[clusters['cluster_id'].isin(fuzzy['cluster_id'])]
+                columns = [c for c in ['Supplier', 'Brand', 'Product_Code', 'Product_Name'] if c in df.columns]
+                report_path = Path(self.file_path).parent / 'fuzzy_duplicate_candidates.csv'
+                duplicate_report(consolidated, candidates, columns).to_csv(report_path, index=False)
+                print(f"⚠️  {len(fuzzy)} near-duplicate product codes in "
+                      f"{fuzzy['cluster_id'].nunique()} clusters kept for review: {report_path.name}")
+                self.audit_results['warnings'].append(
+                    f"{len(fuzzy)} near-duplicate product codes need review (see {report_path.name})")
 
         final_count = len(df)
         self.audit_results['performance_metrics']['initial_count'] = initial_count
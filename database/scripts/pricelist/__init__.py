@@ -0,0 +1,6 @@
+"""
+Shared pricelist ETL helpers used by the supplier batch scripts.
+
+Modules are imported explicitly (``from pricelist.workbook import ...``) so
+that importing the package itself stays cheap.
+"""
@@ -0,0 +1,7 @@
+"""``python -m pricelist`` runs the pricelist command line."""
+
+import sys
+
+from pricelist.cli import main
+
+sys.exit(main())
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Pricelist benchmarks
+Synthetic supplier corpus, CLI startup budget and timings of the ingestion hot paths
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+
+# Wall time budget for ``python -m pricelist --help`` (interpreter start included)
+STARTUP_BUDGET = 0.25
+
+# Modules the CLI must not import before a subcommand needs them
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'pyarrow', 'python_calamine']
+
+# Default corpus: a few suppliers with realistic column mixes
+CORPUS_SUPPLIERS = 4
+CORPUS_ROWS = 20000
+CORPUS_SEED = 20250904
+
+BRANDS = ['Yamaha', 'Roland', 'Shure', 'Sennheiser', 'Behringer', 'Korg', 'Fender', 'Aida Imaging']
+CATEGORIES = ['Microphones', 'Keyboards', 'Speakers', 'Cables', 'Mixers', 'Cameras', 'Guitars']
+WORDS = ['Wireless', 'Studio', 'Dynamic', 'Active', 'Digital', 'Pro', 'Compact', 'Stereo', 'Black', 'Kit']
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SYNTHETIC CORPUS
+# ═══════════════════════════════════════════════════════════════════
+
+def synthetic_pricelist(rows: int, supplier: str, seed: int = CORPUS_SEED):
+    """One supplier's pricelist frame with supplier-style columns and gaps"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    brand = rng.choice(BRANDS, rows)
+    model = rng.integers(100, 99999, rows)
+    prefix = pd.Series(brand).str[:3].str.upper()
+    cost = np.round(rng.lognormal(6, 1.2, rows), 2)
+
+    df = pd.DataFrame({
+        'Brand': brand,
+        'SKU': prefix + '-' + pd.Series(model).astype(str),
+        'Product Description': (pd.Series(brand) + ' ' + pd.Series(rng.choice(WORDS, rows)) + ' '
+                                + pd.Series(rng.choice(WORDS, rows)) + ' ' + pd.Series(model).astype(str)),
+        'Category': rng.choice(CATEGORIES, rows),
+        'Cost Price Excl': cost,
+        'Retail Price Incl': np.round(cost * rng.uniform(1.3, 1.9, rows) * 1.15, 2),
+        'QTY On Hand': rng.integers(0, 50, rows),
+        'Barcode': rng.integers(6000000000000, 6999999999999, rows).astype(str),
+        'Supplier': supplier
+    })
+    # Real pricelists have blank cells
+    for column, ratio in [('Category', 0.1), ('Barcode', 0.3), ('Retail Price Incl', 0.05)]:
+        df.loc[rng.random(rows) < ratio, column] = None
+    return df
+
+
+def build_corpus(directory, suppliers: int = CORPUS_SUPPLIERS, rows: int = CORPUS_ROWS,
+                 seed: int = CORPUS_SEED) -> List[Path]:
+    """
+    Write (or reuse) one .xlsx per synthetic supplier; file names encode
+    the size and seed so a corpus is only generated once.
+    """
+    from pricelist.xlsx_writer import write_workbook
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for n in range(suppliers):
+        path = directory / f"supplier_{n:02d}_{rows}_{seed}.xlsx"
+        if not path.exists():
+            df = synthetic_pricelist(rows, f"Supplier {n:02d}", seed + n)
+            write_workbook(path, {'Pricelist': df, 'Notes': df.head(0)})
+        paths.append(path)
+    return paths
+
+
+# ═══════════════════════════════════════════════════════════════════
+# STARTUP
+# ═══════════════════════════════════════════════════════════════════
+
+def time_startup(argv: Optional[List[str]] = None, repeats: int = 5) -> Dict:
+    """Median wall time of ``python -m pricelist <argv>`` in a fresh interpreter"""
+    command = [sys.executable, '-m', 'pricelist', *(argv or ['--help'])]
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        subprocess.run(command, cwd=SCRIPTS_DIR, capture_output=True, check=True)
+        timings.append(time.perf_counter() - started)
+    return {'median': statistics.median(timings), 'min': min(timings), 'max': max(timings)}
+
+
+def heavy_imports() -> List[str]:
+    """Heavy modules loaded just by importing the CLI"""
+    probe = (f"import sys; import pricelist.cli; "
+             f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', probe], cwd=SCRIPTS_DIR, capture_output=True,
+                            text=True, check=True)
+    return [m for m in result.stdout.strip().split(',') if m]
+
+
+def bench_startup(budget: float = STARTUP_BUDGET) -> Dict:
+    timing = time_startup()
+    loaded = heavy_imports()
+    return {**timing, 'budget': budget, 'heavy_imports': loaded,
+            'passed': timing['median'] <= budget and not loaded}
+
+
+# ═══════════════════════════════════════════════════════════════════
+# INGESTION
+# ═══════════════════════════════════════════════════════════════════
+
+def _timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def bench_ingestion(paths: List[Path]) -> Dict[str, float]:
+    """Seconds per step over the whole corpus"""
+    from pricelist.workbook import probe_sheets, read_all_sheets
+
+    results = {}
+    results['probe_sheets'], _ = _timed(lambda: [probe_sheets(p) for p in paths])
+    results['read_all_sheets'], frames = _timed(lambda: [read_all_sheets(p) for p in paths])
+    results['rows'] = sum(len(f['Pricelist']) for f in frames)
+    results['cells'] = sum(f['Pricelist'].size for f in frames)
+    return results
+
+
+def bench_backends(paths: List[Path]) -> Dict[str, float]:
+    """Seconds to read the corpus' pricelist sheets with each installed xlsx reader backend"""
+    import pandas as pd
+
+    from pricelist.readers import CAPABILITIES, available_backends
+
+    backends = [name for name in CAPABILITIES['xlsx'] if name in available_backends()]
+    # pd.read_excel directly: a failing backend must not fall back to another one
+    return {name: _timed(lambda: [pd.read_excel(p, sheet_name='Pricelist', engine=name) for p in paths])[0]
+            for name in backends}
+
+
+def save_results(results: Dict, backends: Dict[str, float], path: Path) -> Path:
+    """Per-backend parse rates for ``pricelist.readers`` and ``pricelist.estimate`` (atomic rename)"""
+    rates = {name: seconds / results['cells'] for name, seconds in backends.items()}
+    payload = {'measured_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+               # The readers pick the fastest backend, so estimates use its rate
+               'read_excel_seconds_per_cell': min(rates.values()),
+               'backends': rates, 'rows': results['rows'], 'cells': results['cells']}
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(payload, indent=2), encoding='utf-8')
+    os.replace(tmp, path)
+    return path
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Pricelist tooling benchmarks')
+    parser.add_argument('--corpus-dir', default=str(Path.home() / '.cache' / 'pricelist-bench'),
+                        help='Where the synthetic corpus is kept')
+    parser.add_argument('--suppliers', type=int, default=CORPUS_SUPPLIERS)
+    parser.add_argument('--rows', type=int, default=CORPUS_ROWS, help='Rows per supplier')
+    parser.add_argument('--budget', type=float, default=STARTUP_BUDGET, help='CLI startup budget (seconds)')
+    parser.add_argument('--startup-only', action='store_true', help='Skip the corpus benchmarks')
+    args = parser.parse_args(argv)
+
+    startup = bench_startup(args.budget)
+    status = '✅' if startup['passed'] else '❌'
+    print(f"{status} CLI startup: {startup['median'] * 1000:.0f} ms median "
+          f"(budget {args.budget * 1000:.0f} ms)")
+    if startup['heavy_imports']:
+        print(f"   ❌ Imported at startup: {', '.join(startup['heavy_imports'])}")
+
+    if not args.startup_only:
+        print(f"\n📦 Corpus: {args.suppliers} suppliers x {args.rows:,} rows → {args.corpus_dir}")
+        seconds, paths = _timed(build_corpus, args.corpus_dir, args.suppliers, args.rows)
+        print(f"   Ready in {seconds:.1f}s")
+        results = bench_ingestion(paths)
+        backends = bench_backends(paths)
+        saved = save_results(results, backends, Path(args.corpus_dir) / 'results.json')
+        rows = results.pop('rows')
+        results.pop('cells')
+        results.update({f"read_excel[{name}]": seconds for name, seconds in backends.items()})
+        for step, seconds in results.items():
+            print(f"   {step:.<24} {seconds:7.2f}s  ({rows / seconds:,.0f} rows/s)")
+        print(f"   Parse rates saved for reader selection and --plan estimates → {saved}")
+
+    return 0 if startup['passed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Stage checkpoints for supplier processing runs
+Per-supplier parsed / mapped / validated / written results, so a crashed batch resumes where it stopped
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from pricelist.master_store import partition_slug
+
+MANIFEST_NAME = 'manifest.json'
+
+STAGES = ['parsed', 'mapped', 'validated', 'written']
+
+
+def _json_default(value):
+    # numpy scalars in stats dicts
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+def source_fingerprint(path, config: Optional[Dict] = None) -> str:
+    """Size + mtime of the source file plus the supplier config it is processed with"""
+    stat = os.stat(path)
+    payload = json.dumps({
+        'path': str(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'config': config
+    }, sort_keys=True, default=_json_default)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RunCheckpoints:
+    """
+    Stage results of one batch run, persisted per supplier.
+
+    Every ``save`` pickles the stage frame (if any) and records the stage in
+    the run manifest, which is replaced atomically. A run started with
+    ``resume=True`` keeps the previous run's checkpoints: ``load`` returns
+    a stage whose source file and config are unchanged and records it as
+    reused. Without ``resume`` earlier checkpoints are discarded.
+    ``complete`` removes the stage frames and keeps the manifest as the
+    record of the run.
+    """
+
+    def __init__(self, root, resume: bool = False):
+        self.root = Path(root)
+        self.resume = resume
+
+        previous = self._read_manifest()
+        if resume and previous and previous.get('status') != 'complete':
+            self.manifest = previous
+            self.manifest['resumed_runs'] = self.manifest.get('resumed_runs', 0) + 1
+        else:
+            if self.root.exists():
+                shutil.rmtree(self.root)
+            self.manifest = {'suppliers': {}, 'resumed_runs': 0}
+            self.manifest['run_id'] = uuid.uuid4().hex[:12]
+        self.manifest.update({'status': 'running', 'resume': resume,
+                              'started_at': datetime.now().isoformat(timespec='seconds')})
+        for entry in self.manifest['suppliers'].values():
+            entry['reused'] = []
+        self._save()
+
+    def _read_manifest(self) -> Optional[Dict]:
+        path = self.root / MANIFEST_NAME
+        if path.exists():
+            return json.loads(path.read_text(encoding='utf-8'))
+        return None
+
+    def _save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f"{MANIFEST_NAME}.{uuid.uuid4().hex}.tmp"
+        tmp.write_text(json.dumps(self.manifest, indent=2, default=_json_default), encoding='utf-8')
+        os.replace(tmp, self.root / MANIFEST_NAME)
+
+    # ───────────────────────────────────────────────────────────────
+    # Suppliers and stages
+    # ───────────────────────────────────────────────────────────────
+
+    def bind(self, supplier: str, source, config: Optional[Dict] = None) -> Optional[str]:
+        """
+        Register the source of a supplier for this run; returns the last
+        completed stage that can be resumed from (None when starting over).
+        Checkpoints made from a different file or config are dropped.
+        """
+        fingerprint = source_fingerprint(source, config)
+        entry = self.manifest['suppliers'].get(supplier)
+        if entry is None or entry['fingerprint'] != fingerprint:
+            if entry is not None:
+                shutil.rmtree(self.root / entry['dir'], ignore_errors=True)
+            entry = {'dir': partition_slug(supplier), 'source': str(source), 'fingerprint': fingerprint,
+                     'stages': {}, 'reused': []}
+            self.manifest['suppliers'][supplier] = entry
+            self._save()
+        return self.last_stage(supplier)
+
+    def last_stage(self, supplier: str) -> Optional[str]:
+        done = self.manifest['suppliers'].get(supplier, {}).get('stages', {})
+        completed = [stage for stage in STAGES if stage in done]
+        return completed[-1] if completed else None
+
+    def save(self, supplier: str, stage: str, df: Optional[pd.DataFrame] = None,
+             data: Optional[Dict] = None):
+        """Persist a completed stage (frame first, then the manifest entry)"""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage: {stage}")
+        entry = self.manifest['suppliers'][supplier]
+        directory = self.root / entry['dir']
+        directory.mkdir(parents=True, exist_ok=True)
+
+        frame_file = None
+        if df is not None:
+            frame_file = f"{stage}.pkl"
+            # Replaced atomically: a crash mid-write must not leave a torn pickle for --resume
+            tmp = directory / f"{frame_file}.{uuid.uuid4().hex}.tmp"
+            try:
+                df.to_pickle(tmp)
+                os.replace(tmp, directory / frame_file)
+            finally:
+                if tmp.exists():
+                    tmp.unlink()
+
+        entry['stages'][stage] = {
+            'file': frame_file,
+            'rows': len(df) if df is not None else None,
+            'data': data or {},
+            'saved_at': datetime.now().isoformat(timespec='seconds')
+        }
+        # A redone stage invalidates everything after it
+        for later in STAGES[STAGES.index(stage) + 1:]:
+            entry['stages'].pop(later, None)
+        self._save()
+
+    def load(self, supplier: str, stage: str) -> Optional[Tuple[Optional[pd.DataFrame], Dict]]:
+        """(frame, data) of a completed stage when resuming, recorded as reused"""
+        if not self.resume:
+            return None
+        entry = self.manifest['suppliers'].get(supplier)
+        meta = entry['stages'].get(stage) if entry else None
+        if meta is None:
+            return None
+
+        df = None
+        if meta['file'] is not None:
+            path = self.root / entry['dir'] / meta['file']
+            if not path.exists():
+                return None
+            df = pd.read_pickle(path)
+
+        if stage not in entry['reused']:
+            entry['reused'].append(stage)
+            self._save()
+        return df, meta['data']
+
+    # ───────────────────────────────────────────────────────────────
+    # Run record
+    # ───────────────────────────────────────────────────────────────
+
+    def reused(self) -> Dict[str, List[str]]:
+        """Stages taken from checkpoints in this run, per supplier"""
+        return {name: entry['reused'] for name, entry in self.manifest['suppliers'].items() if entry['reused']}
+
+    def complete(self, summary: Optional[Dict] = None):
+        """Mark the run finished and drop the stage frames (the manifest stays)"""
+        for entry in self.manifest['suppliers'].values():
+            shutil.rmtree(self.root / entry['dir'], ignore_errors=True)
+            for meta in entry['stages'].values():
+                meta['file'] = None
+        self.manifest.update({'status': 'complete', 'summary': summary or {},
+                              'completed_at': datetime.now().isoformat(timespec='seconds')})
+        self._save()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+pricelist command line
+One entry point for the supplier pricelist scripts; heavy modules are imported by the subcommand that needs them
+"""
+
+import argparse
+import importlib.util
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+# Only the standard library is imported at module level so ``--help`` and
+# argument errors return without loading pandas/numpy/openpyxl.
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+ARCHIVE_DIR = SCRIPTS_DIR.parents[1] / '.archive' / 'scripts'
+
+PROCESS_SCRIPTS = {
+    'batch2': ARCHIVE_DIR / 'process_batch_2.py',
+    'batch3': ARCHIVE_DIR / 'process_batch3_suppliers.py'
+}
+
+VALIDATE_SCRIPTS = {
+    'batch1': ARCHIVE_DIR / 'validate_batch1_data.py'
+}
+
+UPLOADS_DIR = Path('/mnt/k/00Project/MantisNXT/database/Uploads')
+
+# SQLite file or postgresql:// URL of the ingestion job queue
+JOBS_DB = UPLOADS_DIR / '.Consolidated_Supplier_Data.jobs.sqlite'
+
+
+def _load_script(path: Path):
+    """Import a script file as a module (its ``__main__`` block does not run)"""
+    if not path.exists():
+        raise SystemExit(f"❌ Script not found: {path}")
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _run_main(path: Path, argv: List[str]) -> int:
+    """Run a script's ``main()`` with its own argv"""
+    module = _load_script(path)
+    saved = sys.argv
+    sys.argv = [str(path), *argv]
+    try:
+        result = module.main()
+    finally:
+        sys.argv = saved
+    return result if isinstance(result, int) else 0
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SUBCOMMANDS
+# ═══════════════════════════════════════════════════════════════════
+
+def cmd_inspect(args) -> int:
+    from pricelist.workbook import probe_sheets, rank_sheets
+
+    probes = probe_sheets(args.file, sample_rows=args.sample_rows)
+    ranked = {p['name'] for p in rank_sheets(probes, min_rows=args.min_rows)}
+
+    print(f"📖 {Path(args.file).name}: {len(probes)} sheets")
+    for p in probes:
+        rows = p['rows'] if p['rows'] is not None else f"~{p['sampled_rows']}"
+        marker = '✅' if p['name'] in ranked else '  '
+        print(f"   {marker} {p['name'][:31]:<31} {rows!s:>9} rows x {p['cols'] or p['sample_cols'] or 0:>3} cols  "
+              f"fill {p['fill_ratio']:.0%}")
+    return 0
+
+
+def cmd_process(args) -> int:
+    argv = (['--resume'] if args.resume else []) + (['--plan'] if args.plan else [])
+    return _run_main(PROCESS_SCRIPTS[args.batch], argv)
+
+
+def cmd_validate(args) -> int:
+    module = _load_script(VALIDATE_SCRIPTS[args.batch])
+    report = module.validate_data_quality(args.report) if args.report else module.validate_data_quality()
+    return 0 if report else 1
+
+
+def cmd_aggregate(args) -> int:
+    return _run_main(SCRIPTS_DIR / 'aggregate_all_suppliers_to_master.py', ['--plan'] if args.plan else [])
+
+
+def cmd_consolidate(args) -> int:
+    module = _load_script(SCRIPTS_DIR / 'final_consolidation_audit.py')
+    if args.file is None:
+        return module.main()
+    return 0 if module.MasterConsolidator(args.file).execute() else 1
+
+
+def cmd_complete(args) -> int:
+    if args.neighbours:
+        module = _load_script(SCRIPTS_DIR / 'complete_remaining_9_rows.py')
+        module.complete_remaining_rows()
+        return 0
+    return _run_main(SCRIPTS_DIR / 'complete_missing_supplier_data.py', [])
+
+
+def cmd_watch(args) -> int:
+    import signal
+    import threading
+
+    from pricelist import telemetry
+    from pricelist.ingest import IngestService, store_publisher
+
+    consolidated = Path(args.inbox) / 'Consolidated_Supplier_Data.xlsx'
+    module, store = _batch2_store(consolidated.parent)
+
+    service = IngestService(args.inbox, module.ingest_profiles(), store_publisher(store),
+                            state_dir=consolidated.parent / f".{consolidated.stem}.ingest",
+                            max_workers=args.workers, include=args.include, settle=args.settle,
+                            use_inotify=False if args.poll else None)
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    telemetry.configure(worker=telemetry.worker_name('watch'))
+    try:
+        stats = service.run(stop, once=args.once)
+    finally:
+        telemetry.release()
+    print(f"📊 {stats['files']} files, {stats['rows']:,} rows published; "
+          f"{stats['failed']} failed, {stats['unrouted']} unrouted, {stats['skipped']} unchanged")
+    return 1 if stats['failed'] else 0
+
+
+def _batch2_store(uploads: Path):
+    from pricelist.master_store import MasterStore
+
+    module = _load_script(PROCESS_SCRIPTS['batch2'])
+    store = MasterStore(uploads / 'Consolidated_Supplier_Data.master', module.MASTER_COLUMNS)
+    return module, store
+
+
+def cmd_jobs(args) -> int:
+    import json
+
+    from pricelist.jobs import JobQueue, work
+
+    queue = JobQueue(args.db)
+    if args.action == 'enqueue':
+        for path in args.files:
+            job_id = queue.enqueue(Path(path).resolve(), supplier=args.supplier, supplier_id=args.supplier_id,
+                                   priority=args.priority)
+            print(f"📥 {Path(path).name} → job {job_id}")
+        return 0
+
+    if args.action == 'work':
+        import signal
+        import threading
+
+        from pricelist import telemetry
+        from pricelist.ingest import job_handler, store_publisher
+
+        # One textfile and worker label per worker, stable across restarts
+        telemetry.configure(worker=telemetry.worker_name('jobs'))
+        module, store = _batch2_store(UPLOADS_DIR)
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+        try:
+            stats = work(queue, job_handler(module.ingest_profiles(), store_publisher(store)), stop,
+                         drain=args.drain)
+        finally:
+            telemetry.release()
+        print(f"📊 {stats['done']} jobs, {stats['rows']:,} rows; {stats['failed']} failed")
+        return 1 if stats['failed'] else 0
+
+    metrics = queue.metrics()
+    if args.json:
+        print(json.dumps(metrics, indent=2))
+        return 0
+    print(f"📋 Queue: {metrics['depth']} queued, {metrics['running']} running, "
+          f"{metrics['done']} done, {metrics['failed']} failed")
+    if metrics['oldest_queued_seconds'] is not None:
+        print(f"   Oldest queued job waiting {metrics['oldest_queued_seconds']:.0f}s")
+    if metrics['finished_in_window']:
+        wait_s, run_s = metrics['wait_seconds'], metrics['run_seconds']
+        print(f"   Last {metrics['window_seconds'] // 60} min: {metrics['finished_in_window']} jobs, "
+              f"wait p50 {wait_s['p50']:.1f}s / p95 {wait_s['p95']:.1f}s, "
+              f"run p50 {run_s['p50']:.1f}s / p95 {run_s['p95']:.1f}s, {metrics['rows_per_second']:,.0f} rows/s")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='pricelist', description='Supplier pricelist ETL tools')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    inspect = commands.add_parser('inspect', help='List the sheets of a workbook without parsing them')
+    inspect.add_argument('file', help='Workbook (.xlsx or .xls)')
+    inspect.add_argument('--sample-rows', type=int, default=20, help='Rows sampled per sheet (default: 20)')
+    inspect.add_argument('--min-rows', type=int, default=0, help='Smallest sheet marked as data')
+    inspect.set_defaults(handler=cmd_inspect)
+
+    process = commands.add_parser('process', help='Process a batch of supplier pricelists')
+    process.add_argument('batch', choices=sorted(PROCESS_SCRIPTS))
+    process.add_argument('--resume', action='store_true', help='Continue an interrupted run from its checkpoints')
+    process.add_argument('--plan', action='store_true',
+                         help='Dry run: estimate rows, memory and runtime per file without parsing cells')
+    process.set_defaults(handler=cmd_process)
+
+    validate = commands.add_parser('validate', help='Data quality report for a processed batch')
+    validate.add_argument('batch', choices=sorted(VALIDATE_SCRIPTS))
+    validate.add_argument('--report', help='JSON report path')
+    validate.set_defaults(handler=cmd_validate)
+
+    aggregate = commands.add_parser('aggregate', help='Aggregate the FIXED batch workbooks into one MASTER file')
+    aggregate.add_argument('--plan', action='store_true',
+                           help='Dry run: estimate rows, memory and runtime without reading the sheets')
+    aggregate.set_defaults(handler=cmd_aggregate)
+
+    consolidate = commands.add_parser('consolidate', help='Rebuild the Master tab with a full audit')
+    consolidate.add_argument('--file', help='Consolidated workbook (default: Consolidated_Supplier_Data.xlsx)')
+    consolidate.set_defaults(handler=cmd_consolidate)
+
+    complete = commands.add_parser('complete', help='Fill in rows with a missing supplier')
+    complete.add_argument('--neighbours', action='store_true',
+                          help='Fill from neighbouring rows instead of the supplier inference index')
+    complete.set_defaults(handler=cmd_complete)
+
+    watch = commands.add_parser('watch', help='Ingest pricelists dropped into an inbox folder')
+    watch.add_argument('--inbox', default=str(UPLOADS_DIR), help=f'Folder to watch (default: {UPLOADS_DIR})')
+    watch.add_argument('--include', nargs='+', default=['drive-download-*/*'],
+                       help='Glob(s) relative to the inbox (default: drive-download-*/*)')
+    watch.add_argument('--workers', type=int, default=4, help='Parallel parser processes (default: 4)')
+    watch.add_argument('--settle', type=float, default=5.0,
+                       help='Seconds a file must stay unchanged before it is picked up (default: 5)')
+    watch.add_argument('--poll', action='store_true',
+                       help='Scan the folder instead of using inotify (needed for /mnt drives under WSL)')
+    watch.add_argument('--once', action='store_true', help='Process what is in the inbox and exit')
+    watch.set_defaults(handler=cmd_watch)
+
+    jobs = commands.add_parser('jobs', help='Queue pricelist files for ingestion workers')
+    jobs.add_argument('--db', default=str(JOBS_DB),
+                      help='SQLite path or postgresql:// URL (default: Uploads/.Consolidated_Supplier_Data.jobs.sqlite)')
+    actions = jobs.add_subparsers(dest='action', metavar='action')
+    actions.required = True
+    enqueue = actions.add_parser('enqueue', help='Add pricelist files to the queue')
+    enqueue.add_argument('files', nargs='+')
+    enqueue.add_argument('--supplier', help='Supplier profile (default: routed by file name)')
+    enqueue.add_argument('--supplier-id', help='supplier.id; opens a pricelist_upload_sessions row per job')
+    enqueue.add_argument('--priority', type=int, default=0, help='Higher is claimed first')
+    work_parser = actions.add_parser('work', help='Claim and process jobs (run one per core / host)')
+    work_parser.add_argument('--drain', action='store_true', help='Exit once the queue is empty')
+    status = actions.add_parser('status', help='Queue depth, latency and rows/sec')
+    status.add_argument('--json', action='store_true')
+    jobs.set_defaults(handler=cmd_jobs)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Fuzzy SKU duplicate detection
+Normalised SKU cores, blocking by brand and key prefix, similarity only within blocks
+"""
+
+import re
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from pricelist.ids import normalise_sku
+
+# Trailing tokens that mark packaging, region or colour variants of one model
+NOISE_SUFFIXES = {
+    'LC', 'EU', 'UK', 'US', 'ZA', 'SA', 'INT', 'AU',
+    'BK', 'BLK', 'BLACK', 'WH', 'WHT', 'WHITE'
+}
+
+# Similarity at or above this links two SKU cores
+MATCH_THRESHOLD = 0.88
+
+# Leading characters of the core that must agree for two SKUs to be compared
+BLOCK_PREFIX = 3
+
+# Sorted-neighbourhood window inside a block, bounding compares at O(n * window)
+BLOCK_WINDOW = 10
+
+CLUSTER_COLUMNS = ['cluster_id', 'cluster_size', 'sku_key', 'sku_core', 'match_score', 'exact_duplicate']
+
+
+def sku_cores(sku: pd.Series, brand: Optional[pd.Series] = None,
+              noise_suffixes: Iterable[str] = NOISE_SUFFIXES) -> pd.Series:
+    """
+    Model core of each SKU: 'SM-58', 'SM58 ' and 'sm58-lc' all become 'SM58'.
+
+    Separator-delimited noise suffixes and a leading brand token are dropped
+    before punctuation is removed. Each distinct (SKU, brand) is processed once.
+    """
+    noise = {s.upper() for s in noise_suffixes}
+    brand_keys = normalise_sku(brand) if brand is not None else pd.Series('', index=sku.index)
+
+    pairs = pd.DataFrame({'sku': sku.astype(object).where(sku.notna(), ''), 'brand': brand_keys})
+    codes, uniques = pd.factorize(pd.MultiIndex.from_frame(pairs))
+
+    cores = []
+    for raw, brand_key in uniques:
+        # Excel hands numeric SKUs back as floats: 12345.0 is SKU '12345'
+        if isinstance(raw, float) and raw.is_integer():
+            raw = int(raw)
+        tokens = [t for t in re.split(r'[^0-9A-Z]+', str(raw).upper()) if t]
+        while len(tokens) > 1 and tokens[-1] in noise:
+            tokens.pop()
+        if len(tokens) > 1 and brand_key and tokens[0] == brand_key:
+            tokens.pop(0)
+        cores.append(''.join(tokens))
+
+    return pd.Series(np.asarray(cores + [''], dtype=object)[codes], index=sku.index)
+
+
+def _digits(text: str) -> str:
+    return ''.join(ch for ch in text if ch.isdigit())
+
+
+def similarity(a: str, b: str) -> float:
+    """Similarity of two cores; different digit runs (SM57 vs SM58) never match"""
+    if a == b:
+        return 1.0
+    if _digits(a) != _digits(b):
+        return 0.0
+    return SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def candidate_pairs(block_keys: pd.Series, cores: pd.Series, threshold: float = MATCH_THRESHOLD,
+                    prefix: int = BLOCK_PREFIX, window: int = BLOCK_WINDOW) -> pd.DataFrame:
+    """
+    Scored pairs of distinct node ids whose cores match within a block.
+
+    ``block_keys`` and ``cores`` are indexed by node id (one per distinct
+    block + core). Nodes are compared only with neighbours in the same
+    block, core prefix and digit run, in sorted core order; since differing
+    digits never match, blocking on them loses no candidates.
+    """
+    nodes = pd.DataFrame({
+        'block': block_keys,
+        'core': cores,
+        'prefix': cores.str[:prefix],
+        'digits': cores.str.replace(r'\D', '', regex=True)
+    })
+    nodes = nodes[nodes['core'].str.len() > 0].sort_values(['block', 'prefix', 'digits', 'core'])
+
+    # Sorted neighbourhood: compare each node with the next ``window`` nodes of its block
+    group = pd.factorize(pd.MultiIndex.from_frame(nodes[['block', 'prefix', 'digits']]))[0]
+    ids = nodes.index.to_numpy()
+    values = nodes['core'].to_numpy(dtype=object)
+    lengths = nodes['core'].str.len().to_numpy()
+
+    lefts, rights, scores = [], [], []
+    for offset in range(1, window + 1):
+        if offset >= len(ids):
+            break
+        same = group[:-offset] == group[offset:]
+        # Upper bound of the ratio from lengths alone
+        shorter = np.minimum(lengths[:-offset], lengths[offset:])
+        same &= 2 * shorter / (lengths[:-offset] + lengths[offset:]) >= threshold
+        for i in np.flatnonzero(same).tolist():
+            score = SequenceMatcher(None, values[i], values[i + offset], autojunk=False).ratio()
+            if score >= threshold:
+                lefts.append(ids[i])
+                rights.append(ids[i + offset])
+                scores.append(score)
+
+    return pd.DataFrame({'left': lefts, 'right': rights, 'score': scores})
+
+
+def _components(n: int, pairs: pd.DataFrame) -> np.ndarray:
+    """Union-find over node ids; returns the root of every node"""
+    parent = np.arange(n)
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for left, right in zip(pairs['left'].tolist(), pairs['right'].tolist()):
+        a, b = find(left), find(right)
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+
+    return np.array([find(x) for x in range(n)])
+
+
+def _variant_scores(rows: pd.DataFrame) -> pd.Series:
+    """
+    Best similarity of each row's SKU key to another key of its node.
+
+    Keys of one node share a core but differ in a stripped suffix or brand
+    prefix (SM58BLK vs SM58WHT); they are candidates, not duplicates.
+    """
+    pairs = rows[['node', 'key']].drop_duplicates()
+    shared = pairs[pairs.duplicated('node', keep=False)]
+
+    best = {}
+    for node, group in shared.groupby('node', sort=False):
+        group_keys = group['key'].tolist()
+        for key in group_keys:
+            best[(node, key)] = max(similarity(key, other) for other in group_keys if other != key)
+
+    scores = [best.get(pair, np.nan) for pair in zip(rows['node'].tolist(), rows['key'].tolist())]
+    return pd.Series(scores, index=rows.index, dtype=float)
+
+
+def duplicate_clusters(df: pd.DataFrame, sku: str, brand: Optional[str] = None,
+                       group_by: Optional[List[str]] = None, threshold: float = MATCH_THRESHOLD,
+                       noise_suffixes: Iterable[str] = NOISE_SUFFIXES) -> pd.DataFrame:
+    """
+    Candidate duplicate clusters for the rows of ``df``.
+
+    Rows are blocked by ``group_by`` columns (e.g. supplier) and brand, so
+    only SKUs that could be the same product are compared. Returns a frame
+    aligned to ``df.index`` for rows in clusters of two or more:
+      - ``sku_key``: the SKU without punctuation or case
+      - ``match_score``: 1.0 when another row of the block has the same
+        ``sku_key``, else the best score against a variant (same core once
+        suffixes and brand are stripped) or a fuzzy link
+      - ``exact_duplicate``: same ``sku_key`` as an earlier row of the block
+        (safe to drop, keeping the first); colour, region and brand variants
+        are only reported
+    """
+    group_by = list(group_by or [])
+    keys = sku_cores(df[sku], noise_suffixes=())
+    cores = sku_cores(df[sku], df[brand] if brand else None, noise_suffixes)
+
+    block_parts = [df[col].where(df[col].notna(), '').map(str) for col in group_by]
+    if brand:
+        block_parts.append(normalise_sku(df[brand]))
+    block = pd.Series('', index=df.index, dtype=object)
+    for part in block_parts:
+        block = block + '|' + part
+
+    # One node per distinct (block, core); variants with identical cores collapse into a node
+    node_of_row, node_keys = pd.factorize(pd.MultiIndex.from_arrays([block, cores]))
+    node_block = pd.Series(node_keys.get_level_values(0), dtype=object)
+    node_core = pd.Series(node_keys.get_level_values(1), dtype=object)
+
+    pairs = candidate_pairs(node_block, node_core, threshold)
+    roots = _components(len(node_keys), pairs)
+
+    rows = pd.DataFrame({
+        'node': node_of_row,
+        'cluster': roots[node_of_row],
+        'key': keys.to_numpy(),
+        'core': cores.to_numpy()
+    }, index=df.index)
+    rows = rows[rows['core'] != '']
+
+    rows['cluster_size'] = rows.groupby('cluster')['node'].transform('size')
+    rows = rows[rows['cluster_size'] > 1]
+
+    # Identical keys within a node (hence within a block) are true duplicates
+    same_key = rows.duplicated(['node', 'key'], keep=False)
+
+    best_link = pd.concat([
+        pairs[['left', 'score']].rename(columns={'left': 'node'}),
+        pairs[['right', 'score']].rename(columns={'right': 'node'})
+    ]).groupby('node')['score'].max()
+    link_score = rows['node'].map(best_link)
+    variant_score = _variant_scores(rows)
+    candidate_score = np.fmax(link_score.to_numpy(dtype=float), variant_score.to_numpy(dtype=float))
+    match_score = np.where(same_key, 1.0, candidate_score)
+
+    cluster_ids = pd.factorize(rows['cluster'])[0] + 1
+    return pd.DataFrame({
+        'cluster_id': cluster_ids,
+        'cluster_size': rows['cluster_size'].to_numpy(),
+        'sku_key': rows['key'].to_numpy(),
+        'sku_core': rows['core'].to_numpy(),
+        'match_score': match_score,
+        'exact_duplicate': rows.duplicated(['node', 'key'], keep='first').to_numpy()
+    }, index=rows.index)[CLUSTER_COLUMNS]
+
+
+def duplicate_report(df: pd.DataFrame, clusters: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """Clustered rows with their source columns, one cluster after another"""
+    report = df.loc[clusters.index, columns].join(clusters)
+    return report.sort_values(['cluster_id', 'match_score'], ascending=[True, False], kind='stable')
+
+
+def cluster_summary(clusters: pd.DataFrame) -> Dict:
+    """Counts for audit output"""
+    exact = int(clusters['exact_duplicate'].sum())
+    return {
+        'clusters': int(clusters['cluster_id'].nunique()),
+        'clustered_rows': len(clusters),
+        'exact_duplicates': exact,
+        'fuzzy_candidates': int((clusters['match_score'] < 1.0).sum())
+    }
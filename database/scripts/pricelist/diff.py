@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Pricelist diff engine
+Added, removed, price-changed and stock-changed rows between two versions of a supplier pricelist
+"""
+
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pricelist.ids import HASH_KEY, product_keys
+
+# Rows per chunk read from either version
+CHUNK_ROWS = 50000
+
+# Rows per hash bucket once inputs are spilled; a bucket of both versions is joined in memory
+BUCKET_ROWS = 200000
+
+# Price moves smaller than this (absolute, currency units) are rounding noise
+PRICE_TOLERANCE = 0.005
+
+ROW_FIELDS = [('key', pa.string()), ('sku', pa.string()), ('description', pa.string())]
+
+SCHEMAS = {
+    'added': pa.schema(ROW_FIELDS + [('price', pa.float64()), ('stock', pa.float64())]),
+    'removed': pa.schema(ROW_FIELDS + [('price', pa.float64()), ('stock', pa.float64())]),
+    'price_changed': pa.schema(ROW_FIELDS + [
+        ('old_price', pa.float64()), ('new_price', pa.float64()),
+        ('price_delta', pa.float64()), ('price_change_pct', pa.float64()),
+        ('old_stock', pa.float64()), ('new_stock', pa.float64())
+    ]),
+    'stock_changed': pa.schema(ROW_FIELDS + [
+        ('old_stock', pa.float64()), ('new_stock', pa.float64()), ('stock_delta', pa.float64()),
+        ('price', pa.float64())
+    ])
+}
+
+Source = Union[pd.DataFrame, str, Path, Iterable[pd.DataFrame]]
+
+
+def iter_chunks(source: Source, columns: Iterable[str], chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Yield ``source`` in chunks: a DataFrame is sliced, a Parquet path is read
+    batch by batch, and any other iterable is assumed to yield frames.
+    """
+    columns = list(columns)
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_rows):
+            yield source.iloc[start:start + chunk_rows].reindex(columns=columns)
+    elif isinstance(source, (str, Path)):
+        parquet = pq.ParquetFile(source)
+        present = [c for c in columns if c in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=present):
+            yield batch.to_pandas().reindex(columns=columns)
+    else:
+        for frame in source:
+            yield frame.reindex(columns=columns)
+
+
+def source_rows(source: Source) -> Optional[int]:
+    """Row count when it is known without reading the data"""
+    if isinstance(source, pd.DataFrame):
+        return len(source)
+    if isinstance(source, (str, Path)):
+        return pq.ParquetFile(source).metadata.num_rows
+    return None
+
+
+def _text(values: pd.Series) -> pd.Series:
+    text = values.astype(str).astype(object)
+    return text.where(values.notna(), None)
+
+
+def keyed_rows(chunk: pd.DataFrame, supplier: str, sku: str, description: str, price: str,
+               stock: str) -> pd.DataFrame:
+    """Compact comparison rows: stable product key, its 64-bit hash and the compared fields"""
+    keys = product_keys(supplier, chunk[sku], chunk[description])
+    # Rows with neither SKU nor description cannot be matched across versions
+    chunk, keys = chunk[keys.notna()], keys[keys.notna()]
+    return pd.DataFrame({
+        'hash': pd.util.hash_pandas_object(keys, index=False, hash_key=HASH_KEY).to_numpy(),
+        'key': keys.to_numpy(dtype=object),
+        'sku': _text(chunk[sku]).to_numpy(),
+        'description': _text(chunk[description]).to_numpy(),
+        'price': pd.to_numeric(chunk[price], errors='coerce').to_numpy(dtype=float),
+        'stock': pd.to_numeric(chunk[stock], errors='coerce').to_numpy(dtype=float)
+    })
+
+
+def _spill(chunks: Iterator[pd.DataFrame], directory: Path, buckets: int, **fields) -> Tuple[int, int]:
+    """Partition keyed rows by hash into per-bucket Parquet parts; returns (rows read, rows without a key)"""
+    rows = unkeyed = 0
+    for n, chunk in enumerate(chunks):
+        keyed = keyed_rows(chunk, **fields)
+        rows += len(chunk)
+        unkeyed += len(chunk) - len(keyed)
+        bucket = keyed['hash'] % np.uint64(buckets)
+        for b, part in keyed.groupby(bucket, sort=False):
+            target = directory / f"b{int(b):04d}"
+            target.mkdir(parents=True, exist_ok=True)
+            part.to_parquet(target / f"{n:06d}.parquet", index=False)
+    return rows, unkeyed
+
+
+def _read_bucket(directory: Path) -> pd.DataFrame:
+    if not directory.exists():
+        return pd.DataFrame({'hash': np.array([], dtype=np.uint64), 'key': [], 'sku': [], 'description': [],
+                             'price': np.array([], dtype=float), 'stock': np.array([], dtype=float)})
+    return pd.concat([pd.read_parquet(p) for p in sorted(directory.glob('*.parquet'))], ignore_index=True)
+
+
+def compare(old: pd.DataFrame, new: pd.DataFrame, price_tolerance: float = PRICE_TOLERANCE) -> Dict[str, pd.DataFrame]:
+    """Hash join of two keyed frames into the four change sets"""
+    joined = old.merge(new, on='hash', how='outer', suffixes=('_old', '_new'), indicator=True)
+    # Identity columns come from the new version where it exists
+    for col in ['key', 'sku', 'description']:
+        joined[col] = joined[f'{col}_new'].where(joined['_merge'] != 'left_only', joined[f'{col}_old'])
+
+    added = joined[joined['_merge'] == 'right_only']
+    removed = joined[joined['_merge'] == 'left_only']
+    both = joined[joined['_merge'] == 'both']
+
+    old_price, new_price = both['price_old'], both['price_new']
+    price_moved = ((new_price - old_price).abs() > price_tolerance) | (old_price.isna() != new_price.isna())
+    old_stock, new_stock = both['stock_old'], both['stock_new']
+    stock_moved = (old_stock != new_stock) & ~(old_stock.isna() & new_stock.isna())
+
+    price_changed = both[price_moved]
+    stock_changed = both[stock_moved]
+
+    return {
+        'added': pd.DataFrame({
+            'key': added['key'], 'sku': added['sku'], 'description': added['description'],
+            'price': added['price_new'], 'stock': added['stock_new']
+        }),
+        'removed': pd.DataFrame({
+            'key': removed['key'], 'sku': removed['sku'], 'description': removed['description'],
+            'price': removed['price_old'], 'stock': removed['stock_old']
+        }),
+        'price_changed': pd.DataFrame({
+            'key': price_changed['key'], 'sku': price_changed['sku'],
+            'description': price_changed['description'],
+            'old_price': price_changed['price_old'], 'new_price': price_changed['price_new'],
+            'price_delta': price_changed['price_new'] - price_changed['price_old'],
+            'price_change_pct': (price_changed['price_new'] / price_changed['price_old'] - 1) * 100,
+            'old_stock': price_changed['stock_old'], 'new_stock': price_changed['stock_new']
+        }),
+        'stock_changed': pd.DataFrame({
+            'key': stock_changed['key'], 'sku': stock_changed['sku'],
+            'description': stock_changed['description'],
+            'old_stock': stock_changed['stock_old'], 'new_stock': stock_changed['stock_new'],
+            'stock_delta': stock_changed['stock_new'] - stock_changed['stock_old'],
+            'price': stock_changed['price_new']
+        }),
+        'unchanged': int((~price_moved & ~stock_moved).sum())
+    }
+
+
+def diff_pricelists(old: Source, new: Source, supplier: str, output_dir, sku: str = 'SKU',
+                    description: str = 'Product Description', price: str = 'Cost Price Excl',
+                    stock: str = 'QTY On Hand', chunk_rows: int = CHUNK_ROWS,
+                    buckets: Optional[int] = None, price_tolerance: float = PRICE_TOLERANCE) -> Dict:
+    """
+    Diff two versions of one supplier's pricelist.
+
+    Rows are keyed on the stable supplier + SKU key (description when the
+    SKU is blank). Both versions are read in chunks and spilled into hash
+    buckets, so only one bucket of each version is in memory during the
+    join. Writes ``added``, ``removed``, ``price_changed`` and
+    ``stock_changed`` Parquet files plus ``summary.json`` to ``output_dir``
+    and returns the summary.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    fields = {'supplier': supplier, 'sku': sku, 'description': description, 'price': price, 'stock': stock}
+    columns = [sku, description, price, stock]
+
+    if buckets is None:
+        known = [source_rows(old), source_rows(new)]
+        largest = max(n for n in known if n is not None) if any(n is not None for n in known) else BUCKET_ROWS * 16
+        buckets = max(1, -(-largest // BUCKET_ROWS))
+
+    writers = {name: pq.ParquetWriter(output_dir / f"{name}.parquet", schema) for name, schema in SCHEMAS.items()}
+    summary = {name: 0 for name in SCHEMAS}
+    summary.update({'supplier': supplier, 'old_rows': 0, 'new_rows': 0, 'unchanged': 0,
+                    'duplicate_keys': 0, 'unkeyed_rows': 0, 'price_delta_total': 0.0, 'price_increases': 0,
+                    'price_decreases': 0, 'buckets': buckets})
+    spill_root = Path(tempfile.mkdtemp(prefix='pricelist-diff-', dir=output_dir))
+
+    try:
+        for version, source in (('old', old), ('new', new)):
+            rows, unkeyed = _spill(iter_chunks(source, columns, chunk_rows), spill_root / version, buckets, **fields)
+            summary[f'{version}_rows'] = rows
+            summary['unkeyed_rows'] += unkeyed
+
+        for b in range(buckets):
+            old_rows = _read_bucket(spill_root / 'old' / f"b{b:04d}")
+            new_rows = _read_bucket(spill_root / 'new' / f"b{b:04d}")
+            if old_rows.empty and new_rows.empty:
+                continue
+
+            # A key listed twice in one version keeps its first row
+            summary['duplicate_keys'] += int(old_rows['hash'].duplicated().sum() + new_rows['hash'].duplicated().sum())
+            old_rows = old_rows.drop_duplicates('hash')
+            new_rows = new_rows.drop_duplicates('hash')
+
+            changes = compare(old_rows, new_rows, price_tolerance)
+            summary['unchanged'] += changes.pop('unchanged')
+            for name, frame in changes.items():
+                summary[name] += len(frame)
+                if len(frame):
+                    writers[name].write_table(pa.Table.from_pandas(frame, schema=SCHEMAS[name], preserve_index=False))
+
+            deltas = changes['price_changed']['price_delta']
+            summary['price_delta_total'] += float(deltas.sum())
+            summary['price_increases'] += int((deltas > 0).sum())
+            summary['price_decreases'] += int((deltas < 0).sum())
+    finally:
+        for writer in writers.values():
+            writer.close()
+        shutil.rmtree(spill_root, ignore_errors=True)
+
+    summary['price_delta_total'] = round(summary['price_delta_total'], 2)
+    (output_dir / 'summary.json').write_text(json.dumps(summary, indent=2), encoding='utf-8')
+    return summary
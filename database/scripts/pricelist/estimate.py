@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Batch cost estimates
+Dry-run plans for a batch: rows, peak memory and runtime per file from workbook metadata and past runs, without parsing cells
+"""
+
+import json
+import os
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from pricelist.planner import CELL_BYTES, FRAME_CELL_BYTES, SHARED_STRING_BYTES, memory_budget, plan_ingestion
+from pricelist.readers import candidates, detect_format
+from pricelist.telemetry import LOG_FILE_ENV
+from pricelist.workbook import sheet_parts
+
+# read_excel seconds per cell per reader backend when no benchmark has been
+# recorded; measured on the 4 x 20k-row synthetic corpus
+PARSE_SECONDS_PER_CELL = {'calamine': 9e-7, 'openpyxl': 8e-6, 'xlrd': 3e-6, 'csv': 3e-7}
+
+# Transform + validate seconds per data row (batch 2 mapping and rules)
+PROCESS_SECONDS_PER_ROW = 2e-6
+
+# Legacy .xls sheets cannot be sized from metadata: BIFF cell records
+# average ~16 bytes, and supplier pricelists run to about 12 columns
+XLS_BYTES_PER_CELL = 16
+XLS_COLS = 12
+
+# CSV inputs are sized from the bytes per line and columns of their first lines
+CSV_SAMPLE_BYTES = 64 * 1024
+CSV_DELIMITERS = ',;\t|'
+
+# Written by ``python -m pricelist.bench``; calibrates PARSE_SECONDS_PER_CELL to this host
+BENCH_RESULTS = Path.home() / '.cache' / 'pricelist-bench' / 'results.json'
+
+# Log stages that make up the parse and the processing cost of a file
+STAGE_GROUPS = {'parse': 'parse', 'transform': 'process', 'validate': 'process'}
+
+
+# ═══════════════════════════════════════════════════════════════════
+# HISTORY
+# ═══════════════════════════════════════════════════════════════════
+
+def _add(totals: Dict, supplier: str, group: str, seconds: float, rows: int):
+    entry = totals.setdefault(supplier, {}).setdefault(group, [0.0, 0])
+    entry[0] += seconds
+    entry[1] += rows
+
+
+def read_stage_log(path, totals: Optional[Dict] = None) -> Dict:
+    """Seconds and rows per supplier from ``stage_finished`` JSON log events"""
+    totals = {} if totals is None else totals
+    with open(path, encoding='utf-8') as fh:
+        for line in fh:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            group = STAGE_GROUPS.get(event.get('stage'))
+            if event.get('event') != 'stage_finished' or group is None or not event.get('rows'):
+                continue
+            _add(totals, event.get('supplier'), group, float(event.get('seconds', 0)), int(event['rows']))
+    return totals
+
+
+def read_ingest_ledger(path, totals: Optional[Dict] = None) -> Dict:
+    """Whole-file seconds and rows per supplier from a watch-folder ingest ledger"""
+    totals = {} if totals is None else totals
+    ledger = json.loads(Path(path).read_text(encoding='utf-8'))
+    for entry in ledger.get('files', {}).values():
+        if entry.get('status') == 'published' and entry.get('rows') and entry.get('seconds'):
+            _add(totals, entry['supplier'], 'total', float(entry['seconds']), int(entry['rows']))
+    return totals
+
+
+def read_checkpoints(run_dir) -> Dict[str, Dict]:
+    """Header row and row yield of each supplier's last run from a checkpoint manifest"""
+    path = Path(run_dir) / 'manifest.json'
+    if not path.exists():
+        return {}
+    manifest = json.loads(path.read_text(encoding='utf-8'))
+    cached = {}
+    for supplier, entry in manifest.get('suppliers', {}).items():
+        stages = entry.get('stages', {})
+        parsed = stages.get('parsed', {}).get('data', {})
+        validated = stages.get('validated', {}).get('data', {})
+        cached[supplier] = {'source': entry.get('source'), 'header_row': parsed.get('header_row'),
+                            'raw_rows': parsed.get('raw_rows'), 'data_rows': parsed.get('data_rows'),
+                            'valid_rows': validated.get('valid_rows')}
+    return cached
+
+
+def bench_seconds_per_cell(path=BENCH_RESULTS) -> Dict[str, float]:
+    """Benchmarked seconds per cell per backend, over the defaults"""
+    try:
+        measured = json.loads(Path(path).read_text(encoding='utf-8')).get('backends', {})
+    except (OSError, ValueError):
+        measured = {}
+    return {**PARSE_SECONDS_PER_CELL, **measured}
+
+
+def load_history(log_file=None, ledgers: Iterable = (), checkpoints: Iterable = (),
+                 bench_results=BENCH_RESULTS) -> Dict:
+    """
+    Everything earlier runs know about the cost of a file: stage timings
+    from the JSON log (``PRICELIST_LOG_FILE`` by default) and ingest
+    ledgers, cached header rows / row yields from checkpoint manifests and
+    the host's benchmarked parse rate per reader backend. Missing sources
+    are skipped.
+    """
+    log_file = log_file or os.environ.get(LOG_FILE_ENV)
+    rates: Dict = {}
+    if log_file and Path(log_file).exists():
+        read_stage_log(log_file, rates)
+    for ledger in ledgers:
+        if Path(ledger).exists():
+            read_ingest_ledger(ledger, rates)
+
+    cached: Dict[str, Dict] = {}
+    for run_dir in checkpoints:
+        cached.update(read_checkpoints(run_dir))
+
+    return {'rates': rates, 'checkpoints': cached,
+            'seconds_per_cell': bench_seconds_per_cell(bench_results)}
+
+
+def _rate(history: Dict, supplier: Optional[str], group: str) -> Optional[float]:
+    seconds, rows = history['rates'].get(supplier, {}).get(group, (0.0, 0))
+    return seconds / rows if rows else None
+
+
+# ═══════════════════════════════════════════════════════════════════
+# ESTIMATES
+# ═══════════════════════════════════════════════════════════════════
+
+def _sheet_names(path: Path) -> List[str]:
+    if not zipfile.is_zipfile(path):
+        return []
+    with zipfile.ZipFile(path) as zf:
+        return [name for name, _member in sheet_parts(zf)]
+
+
+def _csv_shape(path: Path, file_bytes: int) -> tuple:
+    """Lines and columns of a CSV from the average line length of a leading sample"""
+    with open(path, 'rb') as fh:
+        sample = fh.read(CSV_SAMPLE_BYTES)
+    lines = sample.splitlines()
+    if len(sample) < file_bytes:
+        # The last sampled line is usually cut short
+        lines = lines[:-1]
+    if not lines:
+        return 0, 0
+
+    header = lines[0].decode('utf-8', errors='replace')
+    delimiter = max(CSV_DELIMITERS, key=header.count)
+    cols = header.count(delimiter) + 1
+    if len(sample) >= file_bytes:
+        return len(lines), cols
+    bytes_per_line = sum(len(line) + 1 for line in lines) / len(lines)
+    return int(file_bytes / bytes_per_line), cols
+
+
+def estimate_sheet(path, sheet=0, supplier: Optional[str] = None, history: Optional[Dict] = None,
+                   budget: Optional[int] = None) -> Dict:
+    """Rows, peak memory, seconds and load path of one sheet, from metadata and ``history``"""
+    history = history or load_history()
+    path = Path(path)
+    plan = plan_ingestion(path, sheet, budget)
+    basis = []
+
+    csv = detect_format(path) == 'csv'
+    if csv:
+        raw_rows, cols = _csv_shape(path, plan['file_bytes'])
+        cols = cols or XLS_COLS
+        basis.append('line size')
+    elif plan['rows'] is None:
+        # .xls: no dimension ref without parsing the workbook
+        cols = XLS_COLS
+        raw_rows = plan['file_bytes'] // (XLS_BYTES_PER_CELL * cols)
+        basis.append('file size')
+    else:
+        cols, raw_rows = plan['cols'] or 0, plan['rows']
+        basis.append('dimension')
+
+    cached = history['checkpoints'].get(supplier, {})
+    rows, header_row = max(raw_rows - 1, 0), cached.get('header_row')
+    if cached.get('raw_rows') and cached.get('data_rows') is not None:
+        # Same yield as the last run (banner rows, blank rows, header position)
+        rows = int(raw_rows * cached['data_rows'] / cached['raw_rows'])
+        basis.append('checkpoint')
+    valid_rows = rows
+    if cached.get('valid_rows') is not None and cached.get('data_rows'):
+        valid_rows = int(rows * cached['valid_rows'] / cached['data_rows'])
+
+    # Streaming goes through read-only openpyxl whatever the preferred reader
+    if csv:
+        backend = 'csv'
+    else:
+        backend = 'openpyxl' if plan['path'] == 'streaming' else plan.get('backend') or candidates(path)[0]
+    if plan['path'] == 'streaming':
+        # One chunk being parsed, plus the loaded chunks and their concatenation
+        # (load_sheet returns the whole frame; all columns as an upper bound)
+        peak = int(plan['chunk_rows'] * cols * CELL_BYTES[backend]
+                   + plan['shared_strings_bytes'] * SHARED_STRING_BYTES
+                   + 2 * raw_rows * cols * FRAME_CELL_BYTES)
+    else:
+        peak = plan['estimated_bytes']
+
+    parse_rate, process_rate = _rate(history, supplier, 'parse'), _rate(history, supplier, 'process')
+    total_rate = _rate(history, supplier, 'total')
+    if parse_rate is None and total_rate is not None:
+        seconds = rows * total_rate
+        basis.append('ingest ledger')
+    else:
+        if parse_rate is not None:
+            parse = rows * parse_rate
+            basis.append('stage log')
+        else:
+            parse = raw_rows * cols * history['seconds_per_cell'][backend]
+        seconds = parse + rows * (process_rate if process_rate is not None else PROCESS_SECONDS_PER_ROW)
+
+    estimate = {'file': path.name, 'supplier': supplier, 'sheet': plan['sheet'], 'raw_rows': raw_rows,
+                'cols': cols, 'rows': rows, 'valid_rows': valid_rows, 'header_row': header_row,
+                'memory_bytes': peak, 'seconds': round(seconds, 2), 'path': plan['path'], 'backend': backend,
+                'basis': '+'.join(basis)}
+    if plan.get('warning'):
+        estimate['warning'] = plan['warning']
+    return estimate
+
+
+def estimate_file(path, sheets=None, supplier: Optional[str] = None, skip: Iterable[str] = (),
+                  history: Optional[Dict] = None, budget: Optional[int] = None) -> Dict:
+    """
+    Estimate for one input file. ``sheets`` is a sheet or list of sheets
+    (all sheets but ``skip`` when None); each sheet of a multi-sheet
+    workbook is costed as its own supplier. Missing or unreadable files
+    come back with an ``error`` instead of raising.
+    """
+    path = Path(path)
+    if not path.exists():
+        return {'file': path.name, 'supplier': supplier, 'error': 'not found'}
+
+    try:
+        names = _sheet_names(path)
+        if sheets is None:
+            sheets = [name for name in names if name not in set(skip)] if names else [0]
+        elif not isinstance(sheets, list):
+            sheets = [sheets]
+
+        parts = [estimate_sheet(path, sheet, supplier or (sheet if isinstance(sheet, str) else None),
+                                history, budget) for sheet in sheets]
+    except Exception as e:
+        # One unreadable file (corrupt zip, no reader installed, missing sheet) must not sink the plan
+        return {'file': path.name, 'supplier': supplier, 'error': f"{type(e).__name__}: {e}"}
+    return {
+        'file': path.name, 'supplier': supplier, 'file_bytes': path.stat().st_size,
+        'sheet_count': len(names) or None, 'sheets': parts,
+        'rows': sum(p['rows'] for p in parts),
+        # Sheets are loaded one after another; the largest sets the peak
+        'memory_bytes': max(p['memory_bytes'] for p in parts),
+        'seconds': round(sum(p['seconds'] for p in parts), 2),
+        'path': 'streaming' if any(p['path'] == 'streaming' for p in parts) else 'memory',
+        'basis': parts[0]['basis']
+    }
+
+
+def _makespan(seconds: List[float], workers: int) -> float:
+    """Longest-first assignment of file runtimes to workers"""
+    loads = [0.0] * workers
+    for value in sorted(seconds, reverse=True):
+        loads[loads.index(min(loads))] += value
+    return max(loads) if loads else 0.0
+
+
+def plan_batch(inputs: List[Dict], history: Optional[Dict] = None, budget: Optional[int] = None,
+               cpus: Optional[int] = None) -> Dict:
+    """
+    Dry-run plan for a batch. ``inputs`` are ``estimate_file`` keyword
+    dicts (``path``, optional ``sheets``, ``supplier``, ``skip``). Suggests
+    a worker count bounded by cores, files and how many peak footprints fit
+    the memory budget, and whether the batch is worth running through the
+    parallel job queue.
+    """
+    history = history or load_history()
+    budget = budget if budget is not None else memory_budget()
+    files = [estimate_file(history=history, budget=budget, **item) for item in inputs]
+    found = [f for f in files if 'error' not in f]
+
+    cpus = cpus or os.cpu_count() or 1
+    peak = max((f['memory_bytes'] for f in found), default=0)
+    by_memory = budget // peak if peak else len(found)
+    workers = max(1, min(cpus, len(found), by_memory))
+    sequential = sum(f['seconds'] for f in found)
+    parallel = _makespan([f['seconds'] for f in found], workers)
+
+    return {
+        'files': files, 'budget': budget, 'cpus': cpus, 'workers': workers,
+        'ingestion': 'queue' if workers > 1 and parallel < sequential * 0.75 else 'sequential',
+        'rows': sum(f['rows'] for f in found), 'memory_bytes': peak,
+        'seconds': round(sequential, 1), 'parallel_seconds': round(parallel, 1),
+        'missing': [f['file'] for f in files if 'error' in f]
+    }
+
+
+def print_plan(plan: Dict):
+    mb = 1024 ** 2
+    print(f"\n{'File':<44} {'Rows':>9} {'Peak MB':>8} {'Seconds':>8}  {'Path':<9} Basis")
+    print('-' * 96)
+    for f in plan['files']:
+        if 'error' in f:
+            print(f"{f['file'][:44]:<44} {'—':>9} {'—':>8} {'—':>8}  ❌ {f['error']}")
+            continue
+        print(f"{f['file'][:44]:<44} {f['rows']:>9,} {f['memory_bytes'] / mb:>8.0f} {f['seconds']:>8.1f}  "
+              f"{f['path']:<9} {f['basis']}")
+        for sheet in f['sheets']:
+            if sheet.get('warning'):
+                print(f"   ⚠️ {sheet['sheet']}: {sheet['warning']}")
+    print('-' * 96)
+    print(f"📊 {plan['rows']:,} rows, peak {plan['memory_bytes'] / mb:,.0f} MB "
+          f"of a {plan['budget'] / mb:,.0f} MB budget")
+    print(f"⏱️  ~{plan['seconds']:,.0f}s sequential, ~{plan['parallel_seconds']:,.0f}s "
+          f"with {plan['workers']} of {plan['cpus']} cores")
+    if plan['ingestion'] == 'queue':
+        print(f"💡 Suggested: queue the files (pricelist jobs enqueue …) and run {plan['workers']} workers")
+    else:
+        print("💡 Suggested: run the batch sequentially")
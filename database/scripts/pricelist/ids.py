@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Stable product identifiers
+Content-derived IDs (supplier + SKU) that survive row inserts and reordering
+"""
+
+import re
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Fixed 16-byte key so hashes are identical across runs and machines
+HASH_KEY = 'MantisNXT-prodid'
+
+# Hex digits kept in the ID: the full 64-bit hash, so an ID never depends on
+# which other rows are in the frame
+ID_DIGITS = 16
+
+
+def supplier_prefix(supplier_name: str) -> str:
+    """Initials of the supplier name, e.g. 'Active Music Distribution' -> 'AMD'"""
+    return ''.join(word[0].upper() for word in str(supplier_name).split() if word)
+
+
+def normalise_text(series: pd.Series) -> pd.Series:
+    """Upper-case, trim and collapse whitespace; missing values become ''"""
+    text = series.where(series.notna(), '').map(str)
+    return text.str.upper().str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def normalise_code(series: pd.Series) -> pd.Series:
+    """``normalise_text`` for code columns: 12345, 12345.0 and '12345' all become '12345'"""
+    # Normalise each distinct value once; SKU columns repeat heavily across rows
+    codes, uniques = pd.factorize(series)
+    # Excel hands numeric SKUs back as floats: 12345.0 is SKU '12345'
+    uniques = [int(v) if isinstance(v, float) and v.is_integer() else v for v in uniques]
+    keys = np.append(normalise_text(pd.Series(uniques, dtype=object)).to_numpy(dtype=object), '')
+    return pd.Series(keys[codes], index=series.index, dtype=object)
+
+
+def normalise_sku(series: pd.Series) -> pd.Series:
+    """Upper-case alphanumerics only, so 'SM-58 ' and 'sm58' compare equal"""
+    return normalise_code(series).str.replace(r'[^0-9A-Z]', '', regex=True)
+
+
+def product_keys(supplier_name: str, sku: pd.Series, description: Optional[pd.Series] = None) -> pd.Series:
+    """
+    Natural key per row: normalised supplier + SKU.
+
+    Rows without a SKU fall back to the normalised description so they still
+    get a content-derived key. Rows with neither have nothing to key on and
+    get None rather than a key shared by all of them.
+    """
+    supplier = re.sub(r'\s+', ' ', str(supplier_name)).strip().upper()
+    keys = normalise_code(sku)
+    missing = keys.isin(['', 'NAN', 'NONE'])
+
+    if description is not None:
+        text = normalise_text(description)
+        keys = keys.where(~missing, '#' + text)
+        missing = missing & text.isin(['', 'NAN', 'NONE'])
+
+    return (supplier + '|' + keys).where(~missing, None)
+
+
+def _hex_hashes(keys: pd.Series) -> np.ndarray:
+    """Vectorised 64-bit hash of every key, formatted as 16 hex digits"""
+    hashes = pd.util.hash_pandas_object(keys, index=False, hash_key=HASH_KEY).to_numpy()
+    return np.array([format(h, '016X') for h in hashes.tolist()], dtype=object)
+
+
+def product_ids(supplier_name: str, sku: pd.Series, description: Optional[pd.Series] = None,
+                digits: int = ID_DIGITS) -> pd.Series:
+    """
+    Stable product ID per row, e.g. ``AMD-3F09A1C27B4E5D61``.
+
+    Identical keys (true duplicates) share an ID so dedup can key on it.
+    Distinct keys whose hashes collide raise ValueError. Rows without a key
+    (no SKU and no description) get no ID.
+    """
+    keys = product_keys(supplier_name, sku, description).reset_index(drop=True)
+    keyed = keys.dropna()
+    ids = pd.Series(None, index=keys.index, dtype=object)
+    ids[keyed.index] = [h[:digits] for h in _hex_hashes(keyed)]
+
+    # Collision check: one ID must map to exactly one key
+    pairs = pd.DataFrame({'id': ids[keyed.index], 'key': keyed}).drop_duplicates()
+    if pairs['id'].duplicated().any():
+        raise ValueError(f"Product ID collision for supplier '{supplier_name}'")
+
+    ids[keyed.index] = supplier_prefix(supplier_name) + '-' + ids[keyed.index]
+    ids.index = sku.index
+    return ids
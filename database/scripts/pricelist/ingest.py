@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+Watch-folder ingestion
+Settled pricelist files in an inbox are routed to supplier profiles, processed in a worker pool
+and published to the Master store
+"""
+
+import ctypes
+import ctypes.util
+import fnmatch
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import re
+import select
+import struct
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from pricelist import telemetry
+
+# A file is picked up once its size and mtime have not changed for this long
+SETTLE_SECONDS = 5.0
+
+# Directory scan interval when inotify is unavailable (e.g. Windows drives under WSL)
+POLL_INTERVAL = 2.0
+
+# Full rescan interval in inotify mode, as a safety net for missed events
+RESCAN_INTERVAL = 300.0
+
+PRICELIST_SUFFIXES = ('.xlsx', '.xlsm', '.xls', '.csv')
+
+# Excel lock files and hidden/temporary files
+IGNORED_PREFIXES = ('~$', '.')
+
+LEDGER_NAME = 'ingest_ledger.json'
+
+
+def profile(supplier: str, processor: str, patterns: Iterable[str] = (), **options) -> Dict:
+    """
+    Build a supplier profile, e.g.
+    ``profile('Rockit', 'process_batch_2.py:ingest_file', ['*rockit*'], config=...)``.
+
+    ``processor`` is ``module:function`` or ``path/to/script.py:function``;
+    the function is called as ``fn(path, profile)`` in a worker process and
+    returns ``(frame, stats)``. Besides ``patterns``, a file routes to the
+    profile when its name contains every word of the supplier name.
+    """
+    words = re.findall(r'[a-z0-9]+', supplier.lower())
+    return {
+        'supplier': supplier,
+        'processor': processor,
+        'patterns': [p.lower() for p in patterns] + [f"*{'*'.join(words)}*"],
+        **options
+    }
+
+
+def route(path, profiles: List[Dict]) -> Optional[Dict]:
+    """First profile with a pattern matching the file name (case-insensitive)"""
+    name = Path(path).name.lower()
+    for candidate in profiles:
+        if any(fnmatch.fnmatch(name, pattern) for pattern in candidate['patterns']):
+            return candidate
+    return None
+
+
+def file_digest(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# WORKERS
+# ═══════════════════════════════════════════════════════════════════
+
+_processors: Dict[str, Callable] = {}
+
+
+def _resolve(spec: str) -> Callable:
+    """``module:function`` or ``script.py:function``, loaded once per worker process"""
+    if spec not in _processors:
+        target, function = spec.rsplit(':', 1)
+        if target.endswith('.py'):
+            module_spec = importlib.util.spec_from_file_location(Path(target).stem, target)
+            module = importlib.util.module_from_spec(module_spec)
+            module_spec.loader.exec_module(module)
+        else:
+            module = importlib.import_module(target)
+        _processors[spec] = getattr(module, function)
+    return _processors[spec]
+
+
+def process_file(path: str, supplier_profile: Dict) -> Dict:
+    """Worker entry point: run the profile's processor on one file"""
+    started = time.perf_counter()
+    frame, stats = _resolve(supplier_profile['processor'])(Path(path), supplier_profile)
+    return {'frame': frame, 'stats': stats, 'seconds': time.perf_counter() - started}
+
+
+def store_publisher(store) -> Callable[[str, Dict], int]:
+    """Publish processed frames as the supplier's ``MasterStore`` partition"""
+    def publish(supplier: str, result: Dict) -> int:
+        # Partition names follow the 31-character sheet names the batch scripts stage
+        return store.put(supplier[:31], result['frame'])
+    return publish
+
+
+def job_handler(profiles: List[Dict], publish: Callable[[str, Dict], int]) -> Callable:
+    """
+    Handler for ``pricelist.jobs.work``: process a queued file with its
+    supplier profile, publish it and report the rows to the job's progress.
+    """
+    def handle(job: Dict, progress) -> Dict:
+        target = route(job['file_path'], profiles)
+        if target is None and job.get('supplier'):
+            target = next((p for p in profiles if p['supplier'] == job['supplier']), None)
+        if target is None:
+            raise ValueError(f"No supplier profile for {Path(job['file_path']).name}")
+
+        progress.stage('parsing')
+        result = process_file(job['file_path'], target)
+        stats = result['stats']
+        rejected = stats.get('rejected_rows', 0)
+
+        telemetry.STAGE_SECONDS.observe(result['seconds'], supplier=target['supplier'], stage='parse')
+
+        progress.open(stats.get('data_rows', len(result['frame'])), stage='publishing')
+        with telemetry.stage_timer(target['supplier'], 'publish', file=Path(job['file_path']).name) as event:
+            rows = publish(target['supplier'], result)
+            event['rows'] = rows
+        progress.advance(rows + rejected, failed=rejected)
+        telemetry.record_rows(target['supplier'], stats, rows)
+        return {'supplier': target['supplier'], 'rows': rows, 'parse_seconds': round(result['seconds'], 2),
+                'validation_issues': stats.get('validation_issues', [])}
+    return handle
+
+
+# ═══════════════════════════════════════════════════════════════════
+# INBOX WATCHING
+# ═══════════════════════════════════════════════════════════════════
+
+class _Inotify:
+    """Minimal inotify binding (Linux) via ctypes; raises OSError where unavailable"""
+
+    IN_MODIFY = 0x2
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0x800
+    IN_CLOEXEC = 0x80000
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is Linux only")
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches: Dict[int, Path] = {}
+
+    def add(self, directory: Path):
+        wd = self._add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.watches[wd] = directory
+
+    def read(self, timeout: float) -> List[tuple]:
+        """(path, is_dir) per event, waiting up to ``timeout`` seconds"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 1 << 16)
+        events, offset = [], 0
+        while offset < len(data):
+            wd, mask, _cookie, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if wd in self.watches and name:
+                events.append((self.watches[wd] / os.fsdecode(name), bool(mask & self.IN_ISDIR)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class InboxWatcher:
+    """
+    Pricelist files under ``inbox`` that have finished being written.
+
+    Changes come from inotify where available, otherwise from periodic
+    directory scans. A changed file is only reported once its size and
+    mtime have been stable for ``settle`` seconds, so half-copied uploads
+    are never picked up.
+    """
+
+    def __init__(self, inbox, include: Iterable[str] = ('*',), settle: float = SETTLE_SECONDS,
+                 poll_interval: float = POLL_INTERVAL, use_inotify: Optional[bool] = None):
+        self.inbox = Path(inbox)
+        self.include = list(include)
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.pending: Dict[Path, tuple] = {}
+        self._snapshot: Dict[Path, tuple] = {}
+        self._last_scan = 0.0
+
+        self.inotify = None
+        if use_inotify is not False:
+            try:
+                self.inotify = _Inotify()
+                for directory, _dirs, _files in os.walk(self.inbox):
+                    self.inotify.add(Path(directory))
+            except OSError:
+                if use_inotify:
+                    raise
+                self.inotify = None
+
+    @property
+    def mode(self) -> str:
+        return 'inotify' if self.inotify else 'polling'
+
+    def wanted(self, path: Path) -> bool:
+        if path.name.startswith(IGNORED_PREFIXES) or path.suffix.lower() not in PRICELIST_SUFFIXES:
+            return False
+        relative = path.relative_to(self.inbox).as_posix()
+        return any(fnmatch.fnmatch(relative, pattern) for pattern in self.include)
+
+    def _scan(self) -> Set[Path]:
+        """Files that are new or changed since the previous scan"""
+        changed, seen = set(), {}
+        for directory, _dirs, files in os.walk(self.inbox):
+            for name in files:
+                path = Path(directory) / name
+                if not self.wanted(path):
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                seen[path] = (stat.st_size, stat.st_mtime_ns)
+                if self._snapshot.get(path) != seen[path]:
+                    changed.add(path)
+        self._snapshot = seen
+        self._last_scan = time.monotonic()
+        return changed
+
+    def _events(self, timeout: float) -> Set[Path]:
+        changed = set()
+        for path, is_dir in self.inotify.read(timeout):
+            if is_dir:
+                # Files may land before the new directory's watch exists
+                for directory, _dirs, files in os.walk(path):
+                    self.inotify.add(Path(directory))
+                    changed.update(Path(directory) / name for name in files)
+            else:
+                changed.add(path)
+        return {path for path in changed if self.wanted(path)}
+
+    def poll(self, timeout: Optional[float] = None) -> List[Path]:
+        """Wait up to ``timeout`` for changes; return the files that have settled"""
+        timeout = self.poll_interval if timeout is None else timeout
+        now = time.monotonic()
+        if self.inotify is None or not self._last_scan or now - self._last_scan >= RESCAN_INTERVAL:
+            changed = self._scan()
+        else:
+            # Wake up in time to release files that are settling
+            changed = self._events(min(timeout, self.settle) if self.pending else timeout)
+
+        now = time.monotonic()
+        for path in changed:
+            self.pending.setdefault(path, (None, now))
+
+        ready = []
+        for path, (signature, since) in list(self.pending.items()):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                del self.pending[path]
+                continue
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != signature:
+                self.pending[path] = (current, now)
+            elif now - since >= self.settle:
+                del self.pending[path]
+                ready.append(path)
+
+        if self.inotify is None and not ready:
+            # Polling: wait for the next scan, or until the first pending file can settle
+            wait = timeout
+            if self.pending:
+                settles_at = min(since for _signature, since in self.pending.values()) + self.settle
+                wait = min(wait, max(0.0, settles_at - time.monotonic()))
+            time.sleep(wait)
+        return ready
+
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SERVICE
+# ═══════════════════════════════════════════════════════════════════
+
+class IngestService:
+    """
+    Long-running inbox ingestion.
+
+    Settled files are routed to a supplier profile and parsed in a process
+    pool of ``max_workers``; at most ``2 * max_workers`` files are in flight
+    and the rest wait in a backlog. Results are published from the service
+    thread one at a time, so the store never sees concurrent writers. A
+    ledger of content hashes keeps restarts and touched-but-unchanged files
+    from being processed twice.
+    """
+
+    def __init__(self, inbox, profiles: List[Dict], publish: Callable[[str, Dict], int], state_dir,
+                 max_workers: int = 4, include: Iterable[str] = ('*',), settle: float = SETTLE_SECONDS,
+                 poll_interval: float = POLL_INTERVAL, use_inotify: Optional[bool] = None,
+                 echo: Callable = print):
+        self.inbox = Path(inbox)
+        self.profiles = profiles
+        self.publish = publish
+        self.state_dir = Path(state_dir)
+        self.max_workers = max_workers
+        self.echo = echo
+        self.watcher = InboxWatcher(inbox, include, settle, poll_interval, use_inotify)
+        self.ledger = self._load_ledger()
+        self.backlog: deque = deque()
+        self.stats = {'files': 0, 'rows': 0, 'failed': 0, 'unrouted': 0, 'skipped': 0}
+
+    def _log(self, message: str):
+        self.echo(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
+
+    # ───────────────────────────────────────────────────────────────
+    # Ledger
+    # ───────────────────────────────────────────────────────────────
+
+    def _load_ledger(self) -> Dict:
+        path = self.state_dir / LEDGER_NAME
+        if path.exists():
+            return json.loads(path.read_text(encoding='utf-8'))
+        return {'files': {}}
+
+    def _save_ledger(self):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_dir / f"{LEDGER_NAME}.{uuid.uuid4().hex}.tmp"
+        tmp.write_text(json.dumps(self.ledger, indent=2, default=str), encoding='utf-8')
+        os.replace(tmp, self.state_dir / LEDGER_NAME)
+
+    def _record(self, path: Path, digest: str, **fields):
+        self.ledger['files'][path.relative_to(self.inbox).as_posix()] = {
+            'sha256': digest, 'updated_at': datetime.now().isoformat(timespec='seconds'), **fields
+        }
+        self._save_ledger()
+
+    def _is_new(self, path: Path) -> Optional[str]:
+        """Content hash of the file if it has not been handled in this form before"""
+        digest = file_digest(path)
+        entry = self.ledger['files'].get(path.relative_to(self.inbox).as_posix())
+        if entry and entry['sha256'] == digest and entry['status'] in ('published', 'unrouted'):
+            return None
+        return digest
+
+    # ───────────────────────────────────────────────────────────────
+    # Loop
+    # ───────────────────────────────────────────────────────────────
+
+    def _accept(self, paths: List[Path]):
+        for path in paths:
+            digest = self._is_new(path)
+            telemetry.cache_lookup('ingest_ledger', digest is None)
+            if digest is None:
+                self.stats['skipped'] += 1
+                continue
+            target = route(path, self.profiles)
+            if target is None:
+                self.stats['unrouted'] += 1
+                self._record(path, digest, status='unrouted')
+                self._log(f"⚠️  No supplier profile for {path.name}")
+                continue
+            self.backlog.append((path, digest, target))
+            self._log(f"📥 {path.name} → {target['supplier']}")
+
+    def _failed(self, path: Path, digest: str, supplier: str, error: Exception):
+        self.stats['failed'] += 1
+        self._record(path, digest, status='failed', supplier=supplier, error=str(error))
+        self._log(f"❌ {path.name} ({supplier}): {error}")
+        telemetry.flush()
+
+    def _finish(self, path: Path, digest: str, target: Dict, future):
+        supplier = target['supplier']
+        try:
+            result = future.result()
+        except Exception as e:
+            telemetry.stage_failed(supplier, 'parse', str(e), file=path.name)
+            self._failed(path, digest, supplier, e)
+            return
+
+        # Parsing ran in a worker process; its duration is recorded here
+        telemetry.STAGE_SECONDS.observe(result['seconds'], supplier=supplier, stage='parse')
+        try:
+            with telemetry.stage_timer(supplier, 'publish', file=path.name) as event:
+                rows = self.publish(supplier, result)
+                event['rows'] = rows
+        except Exception as e:
+            self._failed(path, digest, supplier, e)
+            return
+
+        telemetry.record_rows(supplier, result['stats'], rows)
+        telemetry.flush()
+        self.stats['files'] += 1
+        self.stats['rows'] += rows
+        self._record(path, digest, status='published', supplier=supplier, rows=rows,
+                     seconds=round(result['seconds'], 2))
+        self._log(f"✅ {supplier}: {rows:,} rows published from {path.name} in {result['seconds']:.1f}s")
+
+    def run(self, stop: Optional[threading.Event] = None, once: bool = False) -> Dict:
+        """
+        Process files until ``stop`` is set. With ``once`` the inbox is
+        drained (including files still settling) and the service returns.
+        """
+        stop = stop or threading.Event()
+        running = {}
+        self._log(f"👀 Watching {self.inbox} ({self.watcher.mode}, {self.max_workers} workers)")
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            while not stop.is_set():
+                self._accept(self.watcher.poll(timeout=0 if running or self.backlog else None))
+
+                while self.backlog and len(running) < 2 * self.max_workers:
+                    path, digest, target = self.backlog.popleft()
+                    running[pool.submit(process_file, str(path), target)] = (path, digest, target)
+
+                if running:
+                    done, _ = wait(list(running), timeout=self.watcher.poll_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._finish(*running.pop(future), future)
+
+                if once and not running and not self.backlog and not self.watcher.pending:
+                    break
+
+        self.watcher.close()
+        return self.stats
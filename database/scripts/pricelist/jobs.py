@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+"""
+Pricelist ingestion job queue
+One job per pricelist file in SQLite or Postgres; workers claim jobs with SKIP LOCKED and report batched progress
+into pricelist_upload_sessions / pricelist_upload_progress (migrations 0020 and 0266)
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import statistics
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from pricelist import telemetry
+
+# A claimed job is handed to another worker if its lease is not renewed in time
+LEASE_SECONDS = 300
+
+# Progress is written at most once per this many rows or seconds
+FLUSH_ROWS = 5000
+FLUSH_SECONDS = 2.0
+
+# Finished jobs considered for latency and throughput metrics
+METRICS_WINDOW = 3600
+
+# created_by of sessions opened by workers (no user behind them)
+SYSTEM_USER = '00000000-0000-0000-0000-000000000000'
+
+JOB_COLUMNS = ['id', 'file_path', 'supplier', 'supplier_id', 'session_id', 'status', 'priority', 'attempts',
+               'max_attempts', 'worker', 'rows_processed', 'error_message', 'options',
+               'enqueued_at', 'claimed_at', 'lease_expires_at', 'finished_at']
+
+# Local stand-in for migrations 0020 / 0266 (same names and columns, no FKs)
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pricelist_upload_sessions (
+    id TEXT PRIMARY KEY,
+    supplier_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    file_size INTEGER NOT NULL,
+    total_records INTEGER NOT NULL,
+    processed_records INTEGER DEFAULT 0,
+    successful_records INTEGER DEFAULT 0,
+    failed_records INTEGER DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'processing',
+    upload_options TEXT DEFAULT '{}',
+    validation_summary TEXT DEFAULT '{}',
+    error_summary TEXT DEFAULT '{}',
+    backup_id TEXT,
+    started_at TEXT,
+    completed_at TEXT,
+    created_by TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pricelist_upload_progress (
+    id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL REFERENCES pricelist_upload_sessions(id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    progress_percentage INTEGER NOT NULL DEFAULT 0,
+    current_record INTEGER DEFAULT 0,
+    message TEXT,
+    details TEXT DEFAULT '{}',
+    timestamp TEXT
+);
+CREATE TABLE IF NOT EXISTS pricelist_ingest_jobs (
+    id TEXT PRIMARY KEY,
+    file_path TEXT NOT NULL,
+    supplier TEXT,
+    supplier_id TEXT,
+    session_id TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    worker TEXT,
+    rows_processed INTEGER NOT NULL DEFAULT 0,
+    error_message TEXT,
+    options TEXT DEFAULT '{}',
+    enqueued_at TEXT NOT NULL,
+    claimed_at TEXT,
+    lease_expires_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_pricelist_ingest_jobs_queued
+    ON pricelist_ingest_jobs(priority DESC, enqueued_at) WHERE status = 'queued';
+"""
+
+
+def _now(offset: float = 0) -> str:
+    # ISO strings: sortable as text in SQLite, cast to timestamptz by Postgres
+    return (datetime.now(timezone.utc) + timedelta(seconds=offset)).isoformat(timespec='microseconds')
+
+
+def _timestamp(value) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {'p50': None, 'p95': None, 'max': None}
+    if len(values) == 1:
+        return {'p50': values[0], 'p95': values[0], 'max': values[0]}
+    cuts = statistics.quantiles(values, n=20, method='inclusive')
+    return {'p50': statistics.median(values), 'p95': cuts[18], 'max': max(values)}
+
+
+class JobQueue:
+    """
+    Pricelist files waiting for, or being processed by, ingestion workers.
+
+    ``url`` is a SQLite file path (created with a local copy of the upload
+    tables) or a ``postgresql://`` URL of a database with migrations 0020
+    and 0266 applied. Every worker opens its own queue. ``claim`` is a
+    single ``UPDATE ... WHERE id = (SELECT ... FOR UPDATE SKIP LOCKED)``,
+    so concurrent workers never receive the same job and never wait on
+    each other's claims; SQLite gets the same guarantee from its write lock.
+    """
+
+    def __init__(self, url: str, lease_seconds: int = LEASE_SECONDS):
+        self.url = str(url)
+        self.lease_seconds = lease_seconds
+        self.postgres = self.url.startswith(('postgres://', 'postgresql://'))
+        self._lock = threading.Lock()
+
+        if self.postgres:
+            try:
+                import psycopg
+            except ImportError as e:
+                raise ImportError("Postgres job queues need psycopg 3: pip install 'psycopg[binary]'") from e
+            self.conn = psycopg.connect(self.url, autocommit=True)
+        else:
+            Path(self.url).parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.url, timeout=30, isolation_level=None, check_same_thread=False)
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.executescript(SQLITE_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # ───────────────────────────────────────────────────────────────
+    # SQL helpers (statements are written with ``?`` placeholders)
+    # ───────────────────────────────────────────────────────────────
+
+    def _sql(self, statement: str) -> str:
+        return statement.replace('?', '%s') if self.postgres else statement
+
+    def _execute(self, statement: str, params=()):
+        cursor = self.conn.cursor()
+        cursor.execute(self._sql(statement), params)
+        return cursor
+
+    def _rows(self, statement: str, params=()) -> List[Dict]:
+        cursor = self._execute(statement, params)
+        names = [d[0] for d in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            if self.postgres:
+                with self.conn.transaction():
+                    yield
+                return
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.conn.execute('COMMIT')
+
+    def _job(self, row: Dict) -> Dict:
+        if isinstance(row.get('options'), str):
+            row['options'] = json.loads(row['options'])
+        return row
+
+    # ───────────────────────────────────────────────────────────────
+    # Producers
+    # ───────────────────────────────────────────────────────────────
+
+    def enqueue(self, file_path, supplier: Optional[str] = None, supplier_id: Optional[str] = None,
+                priority: int = 0, max_attempts: int = 3, **options) -> str:
+        """Queue one pricelist file; higher ``priority`` is claimed first"""
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            self._execute(
+                "INSERT INTO pricelist_ingest_jobs "
+                "(id, file_path, supplier, supplier_id, priority, max_attempts, options, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, str(file_path), supplier, supplier_id, priority, max_attempts,
+                 json.dumps(options, default=str), _now())
+            )
+        return job_id
+
+    # ───────────────────────────────────────────────────────────────
+    # Workers
+    # ───────────────────────────────────────────────────────────────
+
+    def claim(self, worker: str) -> Optional[Dict]:
+        """
+        Take the next queued job (or one whose lease expired) for ``worker``.
+        Jobs that ran out of attempts on an expired lease are failed instead.
+        """
+        now = _now()
+        skip_locked = ' FOR UPDATE SKIP LOCKED' if self.postgres else ''
+        with self._lock:
+            self._execute(
+                "UPDATE pricelist_ingest_jobs SET status = 'failed', finished_at = ?, "
+                "error_message = 'Lease expired after the last attempt' "
+                "WHERE status = 'running' AND lease_expires_at < ? AND attempts >= max_attempts",
+                (now, now)
+            )
+            rows = self._rows(
+                "UPDATE pricelist_ingest_jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                "claimed_at = ?, lease_expires_at = ?, error_message = NULL "
+                "WHERE id = (SELECT id FROM pricelist_ingest_jobs "
+                "WHERE status = 'queued' OR (status = 'running' AND lease_expires_at < ?) "
+                f"ORDER BY priority DESC, enqueued_at LIMIT 1{skip_locked}) "
+                f"RETURNING {', '.join(JOB_COLUMNS)}",
+                (worker, now, _now(self.lease_seconds), now)
+            )
+        return self._job(rows[0]) if rows else None
+
+    def renew(self, job: Dict):
+        """Extend the lease of a job that is still being worked on"""
+        with self._lock:
+            self._execute("UPDATE pricelist_ingest_jobs SET lease_expires_at = ? WHERE id = ? AND status = 'running'",
+                          (_now(self.lease_seconds), job['id']))
+
+    def progress(self, job: Dict, flush_rows: int = FLUSH_ROWS,
+                 flush_seconds: float = FLUSH_SECONDS) -> 'ProgressReporter':
+        return ProgressReporter(self, job, flush_rows, flush_seconds)
+
+    def complete(self, job: Dict, progress: 'ProgressReporter', summary: Optional[Dict] = None):
+        """Mark a job done and close its upload session"""
+        progress.flush()
+        now = _now()
+        with self._transaction():
+            self._execute(
+                "UPDATE pricelist_ingest_jobs SET status = 'done', finished_at = ?, rows_processed = ?, "
+                "lease_expires_at = NULL WHERE id = ?",
+                (now, progress.processed, job['id'])
+            )
+            if progress.session_id is not None:
+                successful = progress.processed - progress.failed
+                self._execute(
+                    "UPDATE pricelist_upload_sessions SET successful_records = ?, failed_records = ?, "
+                    "processed_records = ?, validation_summary = ?, "
+                    "status = CASE WHEN ? = 0 AND ? > 0 THEN 'failed' ELSE 'completed' END, completed_at = ? "
+                    "WHERE id = ?",
+                    (successful, progress.failed, progress.processed, json.dumps(summary or {}, default=str),
+                     successful, progress.failed, now, progress.session_id)
+                )
+                progress.write_progress('completed', 100,
+                                        f"Upload completed: {successful} successful, {progress.failed} failed")
+
+    def fail(self, job: Dict, error: str, progress: Optional['ProgressReporter'] = None):
+        """Requeue a failed job, or fail it for good once it is out of attempts"""
+        final = job['attempts'] >= job['max_attempts']
+        now = _now()
+        with self._transaction():
+            self._execute(
+                "UPDATE pricelist_ingest_jobs SET status = ?, error_message = ?, lease_expires_at = NULL, "
+                "finished_at = ? WHERE id = ?",
+                ('failed' if final else 'queued', error, now if final else None, job['id'])
+            )
+            if progress is not None and progress.session_id is not None:
+                self._execute(
+                    "UPDATE pricelist_upload_sessions SET status = 'failed', error_summary = ?, completed_at = ? "
+                    "WHERE id = ?",
+                    (json.dumps({'error': error, 'attempt': job['attempts']}), now, progress.session_id)
+                )
+                progress.write_progress('failed', progress.percentage, error[:500])
+
+    # ───────────────────────────────────────────────────────────────
+    # Monitoring
+    # ───────────────────────────────────────────────────────────────
+
+    def metrics(self, window_seconds: int = METRICS_WINDOW) -> Dict:
+        """Queue depth, wait/run latency percentiles and rows/sec of recently finished jobs"""
+        counts = {status: 0 for status in ('queued', 'running', 'done', 'failed')}
+        with self._lock:
+            for row in self._rows("SELECT status, COUNT(*) AS n FROM pricelist_ingest_jobs GROUP BY status"):
+                counts[row['status']] = row['n']
+            oldest = self._rows("SELECT MIN(enqueued_at) AS t FROM pricelist_ingest_jobs WHERE status = 'queued'")
+            finished = self._rows(
+                "SELECT enqueued_at, claimed_at, finished_at, rows_processed FROM pricelist_ingest_jobs "
+                "WHERE status = 'done' AND finished_at >= ?",
+                (_now(-window_seconds),)
+            )
+
+        now = datetime.now(timezone.utc)
+        oldest_queued = _timestamp(oldest[0]['t']) if oldest else None
+        waits, runs, rows = [], [], 0
+        for job in finished:
+            claimed, done = _timestamp(job['claimed_at']), _timestamp(job['finished_at'])
+            waits.append((claimed - _timestamp(job['enqueued_at'])).total_seconds())
+            runs.append((done - claimed).total_seconds())
+            rows += job['rows_processed']
+
+        return {
+            'depth': counts['queued'],
+            'running': counts['running'],
+            'done': counts['done'],
+            'failed': counts['failed'],
+            'oldest_queued_seconds': (now - oldest_queued).total_seconds() if oldest_queued else None,
+            'window_seconds': window_seconds,
+            'finished_in_window': len(finished),
+            'wait_seconds': _percentiles(waits),
+            'run_seconds': _percentiles(runs),
+            'rows_per_second': rows / sum(runs) if sum(runs) > 0 else None
+        }
+
+    def jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        where = "WHERE status = ? " if status else ""
+        with self._lock:
+            rows = self._rows(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM pricelist_ingest_jobs {where}"
+                "ORDER BY enqueued_at DESC LIMIT ?",
+                ((status,) if status else ()) + (limit,)
+            )
+        return [self._job(row) for row in rows]
+
+
+class ProgressReporter:
+    """
+    Row progress of one claimed job.
+
+    ``open`` starts an upload session once the row count is known (jobs
+    without a ``supplier_id`` are tracked on the job row only). ``advance``
+    only accumulates; a progress row, the session counters, the job's row
+    count and its lease are written together at most every ``flush_rows``
+    rows or ``flush_seconds`` seconds, and on every stage change.
+    """
+
+    def __init__(self, queue: JobQueue, job: Dict, flush_rows: int = FLUSH_ROWS,
+                 flush_seconds: float = FLUSH_SECONDS):
+        self.queue = queue
+        self.job = job
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.session_id: Optional[str] = None
+        self.total = 0
+        self.processed = 0
+        self.failed = 0
+        self.stage_name = 'initialization'
+        self.started = time.monotonic()
+        self._flushed_rows = 0
+        self._flushed_at = self.started
+
+    @property
+    def percentage(self) -> int:
+        return min(100, int(self.processed * 100 / self.total)) if self.total else 0
+
+    def open(self, total_records: int, stage: str = 'processing'):
+        self.total = total_records
+        self.stage_name = stage
+        if self.job.get('supplier_id'):
+            path = Path(self.job['file_path'])
+            self.session_id = str(uuid.uuid4())
+            with self.queue._transaction():
+                self.queue._execute(
+                    "INSERT INTO pricelist_upload_sessions "
+                    "(id, supplier_id, filename, file_size, total_records, upload_options, started_at, created_by) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.session_id, self.job['supplier_id'], path.name,
+                     path.stat().st_size if path.exists() else 0, total_records,
+                     json.dumps(self.job.get('options') or {}, default=str), _now(), SYSTEM_USER)
+                )
+                self.queue._execute("UPDATE pricelist_ingest_jobs SET session_id = ? WHERE id = ?",
+                                    (self.session_id, self.job['id']))
+                self.write_progress(stage, 0, f"Processing {total_records:,} records")
+
+    def advance(self, rows: int, failed: int = 0):
+        self.processed = min(self.processed + rows, self.total) if self.total else self.processed + rows
+        self.failed += failed
+        if (self.processed - self._flushed_rows >= self.flush_rows
+                or time.monotonic() - self._flushed_at >= self.flush_seconds):
+            self.flush()
+
+    def stage(self, name: str, message: Optional[str] = None):
+        self.stage_name = name
+        self.flush(message)
+
+    def flush(self, message: Optional[str] = None):
+        with self.queue._transaction():
+            self.queue._execute(
+                "UPDATE pricelist_ingest_jobs SET rows_processed = ?, lease_expires_at = ? WHERE id = ?",
+                (self.processed, _now(self.queue.lease_seconds), self.job['id'])
+            )
+            if self.session_id is not None:
+                self.queue._execute(
+                    "UPDATE pricelist_upload_sessions SET processed_records = ? WHERE id = ?",
+                    (self.processed, self.session_id)
+                )
+                self.write_progress(self.stage_name, self.percentage, message)
+        self._flushed_rows = self.processed
+        self._flushed_at = time.monotonic()
+
+    def write_progress(self, stage: str, percentage: int, message: Optional[str] = None):
+        """One pricelist_upload_progress row (inside the caller's transaction)"""
+        elapsed = time.monotonic() - self.started
+        details = {'rows_per_second': round(self.processed / elapsed, 1) if elapsed > 0 else None,
+                   'failed_records': self.failed, 'worker': self.job.get('worker')}
+        self.queue._execute(
+            "INSERT INTO pricelist_upload_progress "
+            "(id, session_id, stage, progress_percentage, current_record, message, details, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (str(uuid.uuid4()), self.session_id, stage, percentage, self.processed, message,
+             json.dumps(details), _now())
+        )
+
+
+# ═══════════════════════════════════════════════════════════════════
+# WORKER LOOP
+# ═══════════════════════════════════════════════════════════════════
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def export_metrics(queue: JobQueue):
+    """Publish queue depth and throughput as Prometheus gauges"""
+    metrics = queue.metrics()
+    for status, key in [('queued', 'depth'), ('running', 'running'), ('done', 'done'), ('failed', 'failed')]:
+        telemetry.QUEUE_JOBS.set(metrics[key], status=status)
+    telemetry.QUEUE_ROWS_PER_SECOND.set(metrics['rows_per_second'] or 0)
+    telemetry.flush()
+
+
+def _heartbeat(queue: JobQueue, job: Dict, finished: threading.Event):
+    while not finished.wait(queue.lease_seconds / 3):
+        queue.renew(job)
+
+
+def work(queue: JobQueue, handler: Callable[[Dict, ProgressReporter], Optional[Dict]],
+         stop: Optional[threading.Event] = None, poll_interval: float = 2.0, drain: bool = False,
+         worker: Optional[str] = None, echo: Callable = print) -> Dict:
+    """
+    Claim and run jobs until ``stop`` is set (or, with ``drain``, until the
+    queue is empty). ``handler(job, progress)`` processes the file, reports
+    rows through ``progress`` and may return a summary for the session.
+    Any number of workers can share one queue, on one host or many.
+    """
+    stop = stop or threading.Event()
+    worker = worker or worker_name()
+    stats = {'done': 0, 'failed': 0, 'rows': 0}
+
+    while not stop.is_set():
+        job = queue.claim(worker)
+        if job is None:
+            export_metrics(queue)
+            if drain:
+                break
+            stop.wait(poll_interval)
+            continue
+
+        waited = _timestamp(job['claimed_at']) - _timestamp(job['enqueued_at'])
+        telemetry.QUEUE_WAIT_SECONDS.observe(waited.total_seconds())
+
+        name = Path(job['file_path']).name
+        echo(f"[{datetime.now().strftime('%H:%M:%S')}] ▶️  {name} (attempt {job['attempts']}/{job['max_attempts']})")
+        progress = queue.progress(job)
+        started = time.perf_counter()
+
+        # Parsing a large file can take longer than the lease without any progress to flush
+        finished = threading.Event()
+        heartbeat = threading.Thread(target=_heartbeat, args=(queue, job, finished), daemon=True)
+        heartbeat.start()
+        try:
+            with telemetry.stage_timer(job.get('supplier') or '', 'job', file=name, job_id=job['id'],
+                                       attempt=job['attempts']) as event:
+                summary = handler(job, progress)
+                event['rows'] = progress.processed
+            queue.complete(job, progress, summary)
+        except Exception as e:
+            queue.fail(job, str(e), progress)
+            stats['failed'] += 1
+            echo(f"[{datetime.now().strftime('%H:%M:%S')}] ❌ {name}: {e}")
+            export_metrics(queue)
+            continue
+        finally:
+            finished.set()
+            heartbeat.join()
+
+        export_metrics(queue)
+        seconds = time.perf_counter() - started
+        stats['done'] += 1
+        stats['rows'] += progress.processed
+        echo(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ {name}: {progress.processed:,} rows in {seconds:.1f}s "
+             f"({progress.processed / seconds if seconds else 0:,.0f} rows/s)")
+
+    return stats
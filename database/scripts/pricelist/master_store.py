@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Master partition store
+Append-only Parquet partitions (one per supplier) from which the Excel Master
+sheet is regenerated
+"""
+
+import json
+import os
+import re
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, keep to one writer
+    fcntl = None
+
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = '.manifest.lock'
+
+
+def partition_slug(supplier: str) -> str:
+    """Filesystem-safe directory name for a supplier partition"""
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', str(supplier)).strip('_').lower()
+    return slug or 'unknown'
+
+
+class MasterStore:
+    """
+    Per-supplier partitions of Master rows.
+
+    Files are never modified in place: ``put`` writes a new partition file
+    and then swaps the manifest, so rerunning a supplier replaces its rows
+    instead of appending duplicates. The manifest preserves the order in
+    which suppliers were first added, which is the Master row order.
+    """
+
+    def __init__(self, root, columns: List[str]):
+        self.root = Path(root)
+        self.columns = list(columns)
+
+    # ───────────────────────────────────────────────────────────────
+    # Manifest
+    # ───────────────────────────────────────────────────────────────
+
+    def _manifest(self) -> Dict:
+        path = self.root / MANIFEST_NAME
+        if path.exists():
+            return json.loads(path.read_text(encoding='utf-8'))
+        return {'columns': self.columns, 'partitions': {}}
+
+    def _save_manifest(self, manifest: Dict):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f"{MANIFEST_NAME}.{uuid.uuid4().hex}.tmp"
+        tmp.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        os.replace(tmp, self.root / MANIFEST_NAME)
+
+    @contextmanager
+    def _manifest_lock(self):
+        """Serialise manifest read-modify-write between processes (ingest workers)"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / LOCK_NAME, 'a') as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            yield
+
+    def exists(self) -> bool:
+        return (self.root / MANIFEST_NAME).exists()
+
+    def suppliers(self) -> List[str]:
+        return list(self._manifest()['partitions'])
+
+    def row_count(self, suppliers: Optional[List[str]] = None) -> int:
+        partitions = self._manifest()['partitions']
+        return sum(meta['rows'] for name, meta in partitions.items() if suppliers is None or name in suppliers)
+
+    # ───────────────────────────────────────────────────────────────
+    # Writes
+    # ───────────────────────────────────────────────────────────────
+
+    def put(self, supplier: str, df: pd.DataFrame) -> int:
+        """Replace a supplier's partition with ``df`` (reindexed to the store columns)"""
+        part_dir = self.root / partition_slug(supplier)
+        part_dir.mkdir(parents=True, exist_ok=True)
+
+        file_name = f"part-{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+        frame = df.reindex(columns=self.columns).reset_index(drop=True)
+        # Mixed-type object columns are stored as text so Parquet can type them;
+        # ints mixed with floats (prices, quantities) stay numeric
+        for col in frame.columns:
+            kind = pd.api.types.infer_dtype(frame[col], skipna=True)
+            if kind == 'mixed-integer-float':
+                frame[col] = pd.to_numeric(frame[col]).astype(float)
+            elif kind.startswith('mixed'):
+                frame[col] = frame[col].map(lambda v: None if pd.isna(v) else str(v))
+        frame.to_parquet(part_dir / file_name, index=False)
+
+        with self._manifest_lock():
+            manifest = self._manifest()
+            previous = manifest['partitions'].get(supplier)
+            manifest['partitions'][supplier] = {
+                'file': f"{part_dir.name}/{file_name}",
+                'rows': len(frame),
+                'updated_at': datetime.now().isoformat(timespec='seconds')
+            }
+            self._save_manifest(manifest)
+
+        # Superseded version is only removed once the manifest no longer points at it
+        if previous:
+            (self.root / previous['file']).unlink(missing_ok=True)
+
+        return len(frame)
+
+    def drop(self, supplier: str) -> bool:
+        with self._manifest_lock():
+            manifest = self._manifest()
+            previous = manifest['partitions'].pop(supplier, None)
+            if previous is None:
+                return False
+            self._save_manifest(manifest)
+        (self.root / previous['file']).unlink(missing_ok=True)
+        return True
+
+    def import_frame(self, df: pd.DataFrame, supplier_column: str) -> int:
+        """Seed partitions from an existing Master frame, grouped by supplier"""
+        rows = 0
+        for supplier, group in df.groupby(supplier_column, sort=False, dropna=False):
+            rows += self.put('' if pd.isna(supplier) else str(supplier), group)
+        return rows
+
+    # ───────────────────────────────────────────────────────────────
+    # Reads
+    # ───────────────────────────────────────────────────────────────
+
+    def partition_files(self) -> List[Tuple[str, Path]]:
+        return [(name, self.root / meta['file']) for name, meta in self._manifest()['partitions'].items()]
+
+    def iter_partitions(self, columns: Optional[List[str]] = None) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """Yield (supplier, frame) one partition at a time"""
+        for supplier, path in self.partition_files():
+            yield supplier, pd.read_parquet(path, columns=columns)
+
+    def read(self, suppliers: Optional[List[str]] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        frames = [df for name, df in self.iter_partitions(columns) if suppliers is None or name in suppliers]
+        if not frames:
+            return pd.DataFrame(columns=columns or self.columns)
+        return pd.concat(frames, ignore_index=True)
+
+
+def read_partitions(paths: List[str], columns: List[str]) -> Iterator[pd.DataFrame]:
+    """Stream partition files in order (picklable source for the parallel xlsx writer)"""
+    for path in paths:
+        yield pd.read_parquet(path).reindex(columns=columns)
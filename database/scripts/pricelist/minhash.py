@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+MinHash/LSH description matching
+Near-duplicate product descriptions across suppliers in sub-quadratic time
+"""
+
+import json
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from pricelist.master_store import MasterStore, partition_slug
+
+# Fixed seed and hash key so signatures are comparable across runs
+SEED = 20250904
+HASH_KEY = 'MantisNXT-minhas'
+
+NUM_PERM = 128
+
+# 32 bands of 4 rows: the LSH curve's midpoint (1/32)^(1/4) is ~0.42, well
+# below MATCH_THRESHOLD, so over 99.9% of pairs at Jaccard 0.7 share a bucket
+# (16 x 8 put it at ~0.71 and missed ~39% of them). The extra candidates are
+# dropped by the signature similarity check
+BANDS = 32
+
+# Estimated Jaccard at or above this is reported as a match
+MATCH_THRESHOLD = 0.7
+
+# Buckets larger than this (generic descriptions) are only scanned by neighbourhood
+MAX_BUCKET = 50
+
+# Largest prime below 2**32, so permuted hashes fit uint32
+PRIME = np.uint64(4294967291)
+
+# Shingles hashed per block (bounds the shingles x permutations matrix)
+SHINGLE_BLOCK = 65536
+
+MANIFEST_NAME = 'manifest.json'
+MATCH_COLUMNS = ['supplier', 'sku', 'description', 'price']
+
+_rng = np.random.default_rng(SEED)
+_A = _rng.integers(1, 2 ** 31, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 2 ** 31, NUM_PERM, dtype=np.uint64)
+
+
+def shingles(descriptions: pd.Series, ngram: int = 1) -> pd.DataFrame:
+    """
+    Distinct word n-gram shingles per row as (row position, hash) pairs.
+
+    Text is upper-cased and split on anything that isn't a letter or digit.
+    """
+    text = descriptions.reset_index(drop=True)
+    tokens = text.where(text.notna(), '').map(str).str.upper().str.findall(r'[0-9A-Z]+')
+    if ngram > 1:
+        tokens = tokens.map(lambda t: [' '.join(t[i:i + ngram]) for i in range(max(len(t) - ngram + 1, 1))])
+
+    flat = tokens.explode()
+    flat = flat[flat.notna() & (flat != '')]
+    hashes = pd.util.hash_array(flat.to_numpy(dtype=object), hash_key=HASH_KEY) & np.uint64(0xFFFFFFFF)
+
+    pairs = pd.DataFrame({'row': flat.index.to_numpy(dtype=np.int64), 'hash': hashes})
+    return pairs.drop_duplicates().sort_values('row', kind='stable', ignore_index=True)
+
+
+def signatures(descriptions: pd.Series, ngram: int = 1) -> np.ndarray:
+    """
+    MinHash signature matrix (rows x NUM_PERM, uint32).
+
+    Each permutation is ``(a * x + b) mod PRIME`` over 32-bit shingle hashes;
+    minima per row are taken with ``minimum.reduceat`` over row segments, one
+    block of shingles at a time. Rows without shingles get all-max signatures.
+    """
+    n = len(descriptions)
+    sig = np.full((n, NUM_PERM), np.iinfo(np.uint32).max, dtype=np.uint32)
+    pairs = shingles(descriptions, ngram)
+    if pairs.empty:
+        return sig
+
+    rows = pairs['row'].to_numpy()
+    values = pairs['hash'].to_numpy(dtype=np.uint64)
+
+    for start in range(0, len(values), SHINGLE_BLOCK):
+        end = min(start + SHINGLE_BLOCK, len(values))
+        block_rows = rows[start:end]
+        permuted = (values[start:end, None] * _A[None, :] + _B[None, :]) % PRIME
+
+        # Segment starts wherever the row changes inside this block
+        starts = np.flatnonzero(np.r_[True, block_rows[1:] != block_rows[:-1]])
+        minima = np.minimum.reduceat(permuted, starts, axis=0).astype(np.uint32)
+        seg_rows = block_rows[starts]
+        sig[seg_rows] = np.minimum(sig[seg_rows], minima)
+
+    return sig
+
+
+def band_keys(sig: np.ndarray, bands: int = BANDS) -> np.ndarray:
+    """One uint64 bucket key per (row, band)"""
+    rows_per_band = sig.shape[1] // bands
+    keys = np.zeros((sig.shape[0], bands), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for j in range(rows_per_band):
+            keys = keys * np.uint64(1099511628211) + sig[:, j::rows_per_band][:, :bands].astype(np.uint64)
+    return keys
+
+
+def candidate_pairs(sig: np.ndarray, bands: int = BANDS, max_bucket: int = MAX_BUCKET) -> np.ndarray:
+    """
+    Distinct (i, j) row pairs, i < j, sharing at least one LSH bucket.
+
+    Rows are sorted by bucket key per band and paired with the next
+    ``max_bucket`` rows of the same bucket, so huge buckets stay bounded.
+    """
+    keys = band_keys(sig, bands)
+    empty = (sig == np.iinfo(np.uint32).max).all(axis=1)
+    found = []
+
+    for band in range(bands):
+        order = np.argsort(keys[:, band], kind='stable')
+        order = order[~empty[order]]
+        sorted_keys = keys[order, band]
+        for offset in range(1, max_bucket + 1):
+            if offset >= len(order):
+                break
+            same = np.flatnonzero(sorted_keys[:-offset] == sorted_keys[offset:])
+            if not len(same):
+                break
+            found.append(np.stack([order[same], order[same + offset]], axis=1))
+
+    if not found:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(found), axis=1)
+    return np.unique(pairs, axis=0)
+
+
+def estimate_similarity(sig: np.ndarray, pairs: np.ndarray, chunk: int = 100000) -> np.ndarray:
+    """Estimated Jaccard similarity (fraction of equal MinHash values) per pair"""
+    scores = np.empty(len(pairs), dtype=np.float64)
+    for start in range(0, len(pairs), chunk):
+        block = pairs[start:start + chunk]
+        scores[start:start + chunk] = (sig[block[:, 0]] == sig[block[:, 1]]).mean(axis=1)
+    return scores
+
+
+def match_descriptions(sig: np.ndarray, groups: Optional[np.ndarray] = None,
+                       threshold: float = MATCH_THRESHOLD) -> pd.DataFrame:
+    """
+    Matching row pairs with their estimated similarity.
+
+    When ``groups`` (e.g. supplier codes per row) is given, only pairs from
+    different groups are kept.
+    """
+    pairs = candidate_pairs(sig)
+    if groups is not None and len(pairs):
+        pairs = pairs[groups[pairs[:, 0]] != groups[pairs[:, 1]]]
+    scores = estimate_similarity(sig, pairs)
+    keep = scores >= threshold
+    return pd.DataFrame({'left': pairs[keep, 0], 'right': pairs[keep, 1], 'similarity': scores[keep]})
+
+
+class DescriptionIndex:
+    """
+    Persisted MinHash signatures, one file pair per supplier.
+
+    ``sync`` re-signs only Master partitions that changed since the last
+    sync; ``matches`` runs LSH over every supplier's stored signatures.
+    """
+
+    def __init__(self, root, supplier: str = 'Supplier', sku: str = 'SKU',
+                 description: str = 'Product Description', price: str = 'Cost Price Excl'):
+        self.root = Path(root)
+        self.columns = {'supplier': supplier, 'sku': sku, 'description': description, 'price': price}
+
+    def _manifest(self) -> Dict:
+        path = self.root / MANIFEST_NAME
+        if path.exists():
+            return json.loads(path.read_text(encoding='utf-8'))
+        return {'num_perm': NUM_PERM, 'seed': SEED, 'suppliers': {}}
+
+    def _save_manifest(self, manifest: Dict):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f"{MANIFEST_NAME}.{uuid.uuid4().hex}.tmp"
+        tmp.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        os.replace(tmp, self.root / MANIFEST_NAME)
+
+    def suppliers(self) -> List[str]:
+        return list(self._manifest()['suppliers'])
+
+    def put(self, supplier: str, df: pd.DataFrame, source: Optional[str] = None) -> int:
+        """Replace a supplier's signatures with those of ``df``"""
+        manifest = self._manifest()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        meta = pd.DataFrame({
+            'supplier': supplier,
+            'sku': df[self.columns['sku']].map(lambda v: None if pd.isna(v) else str(v)).to_numpy(),
+            'description': df[self.columns['description']].map(lambda v: None if pd.isna(v) else str(v)).to_numpy(),
+            'price': pd.to_numeric(df[self.columns['price']], errors='coerce').to_numpy()
+        })
+        meta = meta[meta['description'].notna()].reset_index(drop=True)
+        sig = signatures(meta['description'])
+
+        stem = f"{partition_slug(supplier)}-{uuid.uuid4().hex[:8]}"
+        meta.to_parquet(self.root / f"{stem}.parquet", index=False)
+        np.save(self.root / f"{stem}.npy", sig)
+
+        previous = manifest['suppliers'].get(supplier)
+        manifest['suppliers'][supplier] = {
+            'stem': stem,
+            'rows': len(meta),
+            'source': source,
+            'updated_at': datetime.now().isoformat(timespec='seconds')
+        }
+        self._save_manifest(manifest)
+
+        if previous:
+            self._remove(previous['stem'])
+        return len(meta)
+
+    def drop(self, supplier: str) -> bool:
+        manifest = self._manifest()
+        previous = manifest['suppliers'].pop(supplier, None)
+        if previous is None:
+            return False
+        self._save_manifest(manifest)
+        self._remove(previous['stem'])
+        return True
+
+    def _remove(self, stem: str):
+        (self.root / f"{stem}.parquet").unlink(missing_ok=True)
+        (self.root / f"{stem}.npy").unlink(missing_ok=True)
+
+    def sync(self, store: MasterStore) -> Dict:
+        """Re-sign suppliers whose Master partition changed; drop removed ones"""
+        indexed = self._manifest()['suppliers']
+        current = {name: path.name for name, path in store.partition_files()}
+
+        changed = [name for name, part in current.items() if indexed.get(name, {}).get('source') != part]
+        removed = [name for name in indexed if name not in current]
+
+        for supplier in changed:
+            frame = store.read(suppliers=[supplier], columns=[self.columns[k] for k in ['sku', 'description', 'price']])
+            self.put(supplier, frame, source=current[supplier])
+        for supplier in removed:
+            self.drop(supplier)
+
+        return {'changed': changed, 'removed': removed}
+
+    def load(self):
+        """All stored rows and their signature matrix"""
+        metas, sigs = [], []
+        for meta in self._manifest()['suppliers'].values():
+            metas.append(pd.read_parquet(self.root / f"{meta['stem']}.parquet"))
+            sigs.append(np.load(self.root / f"{meta['stem']}.npy"))
+        if not metas:
+            return pd.DataFrame(columns=MATCH_COLUMNS), np.empty((0, NUM_PERM), dtype=np.uint32)
+        return pd.concat(metas, ignore_index=True), np.concatenate(sigs)
+
+    def matches(self, threshold: float = MATCH_THRESHOLD) -> pd.DataFrame:
+        """Cross-supplier description matches, best first"""
+        meta, sig = self.load()
+        found = match_descriptions(sig, pd.factorize(meta['supplier'])[0], threshold)
+
+        left = meta.iloc[found['left']].reset_index(drop=True).add_prefix('left_')
+        right = meta.iloc[found['right']].reset_index(drop=True).add_prefix('right_')
+        links = pd.concat([left, right], axis=1)
+        links['similarity'] = found['similarity'].to_numpy()
+        links['price_ratio'] = links['right_price'] / links['left_price']
+        return links.sort_values('similarity', ascending=False, ignore_index=True)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Robust price outlier detection
+Median/MAD scores per supplier and category, ratios to previous price and RRP
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from pricelist.ids import normalise_sku, normalise_text
+
+VAT_RATE = 0.15
+
+# |robust z| above this (in log-price space) is an outlier
+Z_THRESHOLD = 3.5
+
+# Price moves beyond this factor vs the previous price are outliers
+RATIO_LIMIT = 3.0
+
+# Categories smaller than this fall back to supplier-level statistics
+MIN_GROUP_SIZE = 10
+
+# Floor for the log-price MAD so near-constant groups don't explode the score
+MAD_FLOOR = 0.01
+
+# Tolerances for recognising the classic keying mistakes
+DECIMAL_SHIFT_TOLERANCE = 0.02
+# A VAT swap reproduces the previous price x/÷ 1.15 to the cent (plus rounding)
+VAT_MIXUP_TOLERANCE = 0.01
+
+OUTLIER_COLUMNS = [
+    'group_median', 'robust_z', 'previous_price', 'previous_ratio', 'rrp_ratio',
+    'outlier_score', 'outlier_reasons', 'is_outlier'
+]
+
+
+def _codes(values: pd.Series) -> np.ndarray:
+    """Integer group codes (missing values form their own group)"""
+    return pd.factorize(values, use_na_sentinel=False)[0]
+
+
+def _pair_codes(current: pd.DataFrame, previous: pd.DataFrame, supplier: str, sku: str):
+    """
+    Joint integer supplier + SKU keys across two frames, compared after
+    normalisation so 123, 123.0 and '123' pair; rows without a SKU get -1
+    """
+    both = pd.concat([current[[supplier, sku]], previous[[supplier, sku]]], ignore_index=True)
+    skus = normalise_sku(both[sku])
+    supplier_codes = pd.factorize(normalise_text(both[supplier]))[0].astype(np.int64)
+    sku_codes = pd.factorize(skus)[0]
+    pair = supplier_codes * (sku_codes.max() + 1) + sku_codes
+    pair[(skus == '').to_numpy()] = -1
+    return pair[:len(current)], pair[len(current):]
+
+
+def _robust_z(log_price: pd.Series, codes: np.ndarray):
+    """Median, robust z-score and group size of ``log_price`` within integer ``codes``"""
+    grouped = log_price.groupby(codes, sort=False)
+    median = grouped.transform('median')
+    mad = (log_price - median).abs().groupby(codes, sort=False).transform('median')
+    z = 0.6745 * (log_price - median) / mad.clip(lower=MAD_FLOOR)
+    return median, z, grouped.transform('count')
+
+
+def _decimal_shift(ratio: pd.Series) -> pd.Series:
+    """Ratios within tolerance of 10, 100, 1000 (or their inverses)"""
+    magnitude = np.log10(ratio)
+    nearest = magnitude.round()
+    return (nearest.abs() >= 1) & ((magnitude - nearest).abs() < DECIMAL_SHIFT_TOLERANCE)
+
+
+def _vat_mixup(values: pd.Series, previous: pd.Series, log_median: pd.Series) -> pd.Series:
+    """
+    Prices that are the previous price with VAT added or removed to the cent,
+    and that undoing the swap brings back towards the group median (a genuine
+    15% price change stays flagged only by the other signals)
+    """
+    factor = 1 + VAT_RATE
+    tolerance = np.maximum(VAT_MIXUP_TOLERANCE, 0.0005 * values)
+    added = (values - (previous * factor).round(2)).abs() <= tolerance
+    removed = (values - (previous / factor).round(2)).abs() <= tolerance
+    # The swapped price must sit further from its peers than the previous one
+    drift = np.abs(np.log(values) - log_median) > np.abs(np.log(previous) - log_median)
+    return (added | removed) & drift
+
+
+def price_outliers(df: pd.DataFrame, price: str, supplier: str, category: Optional[str] = None,
+                   sku: Optional[str] = None, rrp: Optional[str] = None, rrp_includes_vat: bool = True,
+                   previous: Optional[pd.DataFrame] = None, z_threshold: float = Z_THRESHOLD,
+                   ratio_limit: float = RATIO_LIMIT, min_group_size: int = MIN_GROUP_SIZE) -> pd.DataFrame:
+    """
+    Score every priced row of a master frame in one grouped pass.
+
+    Signals (each normalised so 1.0 is the outlier boundary):
+      - robust z of log price within supplier+category, or within supplier
+        when the category has fewer than ``min_group_size`` priced rows
+      - ratio to the same supplier SKU in ``previous`` (same column names)
+      - cost above RRP (RRP converted to ex-VAT when ``rrp_includes_vat``)
+      - exact decimal shifts (10x, 100x) vs the previous price, and VAT
+        inc/ex swaps (previous price x/÷ 1.15 to the cent, moving the price
+        away from its group median)
+
+    Returns a frame aligned to ``df.index`` with ``OUTLIER_COLUMNS``;
+    ``outlier_reasons`` is a comma-separated list of triggered signals.
+    """
+    if df.empty:
+        empty = pd.DataFrame({column: pd.Series(dtype=float) for column in OUTLIER_COLUMNS}, index=df.index)
+        return empty.astype({'outlier_reasons': object, 'is_outlier': bool})
+
+    values = pd.to_numeric(df[price], errors='coerce')
+    values = values.where(values > 0)
+    log_price = np.log(values)
+
+    supplier_codes = _codes(df[supplier])
+    median, z, _ = _robust_z(log_price, supplier_codes)
+
+    if category is not None and category in df.columns:
+        category_codes = _codes(df[category])
+        pair_codes = supplier_codes.astype(np.int64) * (category_codes.max() + 1) + category_codes
+        cat_median, cat_z, cat_count = _robust_z(log_price, pair_codes)
+        use_category = cat_count >= min_group_size
+        median = cat_median.where(use_category, median)
+        z = cat_z.where(use_category, z)
+
+    result = pd.DataFrame(index=df.index)
+    result['group_median'] = np.exp(median)
+    result['robust_z'] = z
+
+    # Same SKU in the previous master
+    result['previous_price'] = np.nan
+    if previous is not None and sku is not None and len(previous):
+        current_keys, previous_keys = _pair_codes(df, previous, supplier, sku)
+        prev_prices = pd.to_numeric(previous[price], errors='coerce').to_numpy()
+        lookup = pd.Series(prev_prices, index=previous_keys)
+        lookup = lookup[(lookup > 0) & (lookup.index >= 0)]
+        lookup = lookup[~lookup.index.duplicated(keep='last')]
+        result['previous_price'] = lookup.reindex(current_keys).to_numpy()
+    result['previous_ratio'] = values / result['previous_price']
+
+    # Cost against recommended retail
+    result['rrp_ratio'] = np.nan
+    if rrp is not None and rrp in df.columns:
+        rrp_values = pd.to_numeric(df[rrp], errors='coerce')
+        if rrp_includes_vat:
+            rrp_values = rrp_values / (1 + VAT_RATE)
+        result['rrp_ratio'] = values / rrp_values.where(rrp_values > 0)
+
+    signals = {
+        'robust_z': z.abs() / z_threshold,
+        'previous_ratio': np.abs(np.log(result['previous_ratio'])) / np.log(ratio_limit),
+        'above_rrp': result['rrp_ratio'],
+        'decimal_shift': _decimal_shift(result['previous_ratio']).astype(float),
+        'vat_mixup': _vat_mixup(values, result['previous_price'], median).astype(float)
+    }
+
+    score = pd.concat(signals, axis=1).max(axis=1, skipna=True)
+    result['outlier_score'] = score.where(values.notna())
+    result['is_outlier'] = result['outlier_score'] >= 1
+
+    # Reasons are only spelled out for the (few) flagged rows
+    flagged = result['is_outlier'].to_numpy()
+    fired = pd.DataFrame({code: signal.to_numpy()[flagged] >= 1 for code, signal in signals.items()})
+    result['outlier_reasons'] = ''
+    result.loc[flagged, 'outlier_reasons'] = [
+        ','.join(code for code, hit in zip(fired.columns, row) if hit) for row in fired.itertuples(index=False)
+    ]
+
+    return result[OUTLIER_COLUMNS]
+
+
+def outlier_summary(df: pd.DataFrame, scores: pd.DataFrame, supplier: str) -> pd.DataFrame:
+    """Outlier counts and worst score per supplier"""
+    flagged = scores['is_outlier']
+    summary = pd.DataFrame({
+        'supplier': df[supplier],
+        'priced': scores['outlier_score'].notna(),
+        'outliers': flagged,
+        'score': scores['outlier_score'].where(flagged)
+    }).groupby('supplier', sort=False).agg(
+        priced=('priced', 'sum'), outliers=('outliers', 'sum'), max_score=('score', 'max')
+    )
+    return summary.sort_values('outliers', ascending=False)
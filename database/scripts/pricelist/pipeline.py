@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Content-addressed phase runner
+Phases declare input and output files; independent phases run in parallel, unchanged ones are skipped
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pricelist import telemetry
+
+STATE_NAME = 'pipeline_state.json'
+
+# Bytes read per hashing step (large workbooks are hashed as a stream)
+HASH_BLOCK = 1 << 20
+
+
+def phase(name: str, command: List, inputs: List = (), outputs: List = (), description: str = '') -> Dict:
+    """
+    Build a phase declaration, e.g.
+    ``phase('fix_batch2', [script], inputs=[batch2], outputs=[batch2_fixed])``.
+
+    A phase depends on every phase that produces one of its inputs. Script
+    files in ``command`` should also be listed as inputs so editing a script
+    re-runs its phase.
+    """
+    return {
+        'name': name,
+        'command': [str(part) for part in command],
+        'inputs': [str(Path(p)) for p in inputs],
+        'outputs': [str(Path(p)) for p in outputs],
+        'description': description or name
+    }
+
+
+class Pipeline:
+    """
+    Make-style runner over a DAG of phases.
+
+    A phase is skipped when the hash of its command and input contents
+    matches its last successful run and its outputs still hash to what that
+    run produced. File hashes are cached by size and mtime in the state file,
+    so unchanged inputs are not re-read.
+    """
+
+    def __init__(self, phases: List[Dict], state_dir, max_workers: int = 2):
+        self.phases = {p['name']: p for p in phases}
+        if len(self.phases) != len(phases):
+            raise ValueError("Duplicate phase names")
+        self.state_dir = Path(state_dir)
+        self.max_workers = max_workers
+        self.dependencies = self._dependencies()
+        self.order = self._topological_order()
+
+    # ───────────────────────────────────────────────────────────────
+    # Graph
+    # ───────────────────────────────────────────────────────────────
+
+    def _dependencies(self) -> Dict[str, List[str]]:
+        producers = {}
+        for p in self.phases.values():
+            for output in p['outputs']:
+                if output in producers:
+                    raise ValueError(f"{output} is produced by both {producers[output]} and {p['name']}")
+                producers[output] = p['name']
+        return {
+            name: sorted({producers[i] for i in p['inputs'] if i in producers and producers[i] != name})
+            for name, p in self.phases.items()
+        }
+
+    def _topological_order(self) -> List[str]:
+        order, done, visiting = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Phase dependency cycle through '{name}'")
+            visiting.add(name)
+            for dep in self.dependencies[name]:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.phases:
+            visit(name)
+        return order
+
+    # ───────────────────────────────────────────────────────────────
+    # State and hashing
+    # ───────────────────────────────────────────────────────────────
+
+    def _load_state(self) -> Dict:
+        path = self.state_dir / STATE_NAME
+        if path.exists():
+            return json.loads(path.read_text(encoding='utf-8'))
+        return {'files': {}, 'phases': {}}
+
+    def _save_state(self, state: Dict):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_dir / f"{STATE_NAME}.{uuid.uuid4().hex}.tmp"
+        tmp.write_text(json.dumps(state, indent=2), encoding='utf-8')
+        os.replace(tmp, self.state_dir / STATE_NAME)
+
+    def file_hash(self, path: str, state: Dict) -> Optional[str]:
+        """sha256 of a file's content (None when missing), cached by size + mtime"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        cached = state['files'].get(path)
+        hit = bool(cached) and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns
+        telemetry.cache_lookup('file_hash', hit)
+        if hit:
+            return cached['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as handle:
+            for block in iter(lambda: handle.read(HASH_BLOCK), b''):
+                digest.update(block)
+        state['files'][path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+        return digest.hexdigest()
+
+    def fingerprint(self, name: str, state: Dict) -> str:
+        """Hash of the command and every input's content"""
+        p = self.phases[name]
+        digest = hashlib.sha256(json.dumps(p['command']).encode('utf-8'))
+        for path in p['inputs']:
+            digest.update(f"\0{path}\0{self.file_hash(path, state)}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _up_to_date(self, name: str, fingerprint: str, state: Dict) -> bool:
+        previous = state['phases'].get(name)
+        if not previous or previous.get('status') != 'ok' or previous.get('fingerprint') != fingerprint:
+            return False
+        return all(self.file_hash(path, state) == digest for path, digest in previous['outputs'].items())
+
+    # ───────────────────────────────────────────────────────────────
+    # Execution
+    # ───────────────────────────────────────────────────────────────
+
+    def _execute(self, name: str) -> Dict:
+        p = self.phases[name]
+        command = [sys.executable, *p['command']] if p['command'][0].endswith('.py') else p['command']
+        started = time.time()
+        completed = subprocess.run(command, capture_output=True, text=True)
+        return {
+            'returncode': completed.returncode,
+            'output': completed.stdout + completed.stderr,
+            'duration': round(time.time() - started, 2)
+        }
+
+    def run(self, force: bool = False, only: Optional[List[str]] = None, echo=print) -> Dict[str, Dict]:
+        """
+        Run every phase whose inputs changed, in dependency order.
+
+        ``force`` re-runs everything; ``only`` restricts the run to the named
+        phases (their dependencies are still checked and run if stale).
+        Returns per-phase results with ``status`` ran / skipped / failed /
+        blocked (an upstream phase failed or an input is missing).
+        """
+        state = self._load_state()
+        wanted = set(self.order)
+        if only:
+            wanted = set()
+            pending_names = list(only)
+            while pending_names:
+                name = pending_names.pop()
+                if name not in wanted:
+                    wanted.add(name)
+                    pending_names.extend(self.dependencies[name])
+
+        results: Dict[str, Dict] = {}
+        pending = [name for name in self.order if name in wanted]
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                for name in list(pending):
+                    deps = self.dependencies[name]
+                    if any(dep not in results for dep in deps if dep in wanted):
+                        continue
+                    pending.remove(name)
+                    p = self.phases[name]
+
+                    failed = [dep for dep in deps if results.get(dep, {}).get('status') in ('failed', 'blocked')]
+                    missing = [path for path in p['inputs'] if not os.path.exists(path)]
+                    if failed or missing:
+                        reason = f"upstream failed: {', '.join(failed)}" if failed else f"missing input: {missing[0]}"
+                        results[name] = {'status': 'blocked', 'reason': reason}
+                        echo(f"⛔ {p['description']} - BLOCKED ({reason})")
+                        continue
+
+                    fingerprint = self.fingerprint(name, state)
+                    if not force and self._up_to_date(name, fingerprint, state):
+                        results[name] = {'status': 'skipped', 'fingerprint': fingerprint}
+                        echo(f"⏭️  {p['description']} - UP TO DATE")
+                        continue
+
+                    echo(f"▶️  {p['description']} - STARTED")
+                    running[pool.submit(self._execute, name)] = (name, fingerprint)
+
+                if not running:
+                    continue
+
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name, fingerprint = running.pop(future)
+                    p = self.phases[name]
+                    outcome = future.result()
+
+                    echo("\n" + "█" * 80)
+                    echo(f"█  {p['description']}")
+                    echo("█" * 80 + "\n")
+                    if outcome['output']:
+                        echo(outcome['output'].rstrip())
+
+                    outputs = {path: self.file_hash(path, state) for path in p['outputs']}
+                    not_written = [path for path, digest in outputs.items() if digest is None]
+                    if outcome['returncode'] == 0 and not_written:
+                        echo(f"⚠️  Declared output not written: {', '.join(not_written)}")
+                        outcome['returncode'] = 1
+
+                    if outcome['returncode'] == 0:
+                        state['phases'][name] = {
+                            'status': 'ok',
+                            'fingerprint': fingerprint,
+                            'outputs': outputs,
+                            'duration': outcome['duration'],
+                            'finished_at': datetime.now().isoformat(timespec='seconds')
+                        }
+                        results[name] = {'status': 'ran', 'fingerprint': fingerprint, 'duration': outcome['duration']}
+                        echo(f"\n✅ {p['description']} - COMPLETE ({outcome['duration']:.1f}s)\n")
+                    else:
+                        state['phases'][name] = {'status': 'failed', 'fingerprint': fingerprint, 'outputs': {}}
+                        results[name] = {'status': 'failed', 'returncode': outcome['returncode'],
+                                         'duration': outcome['duration']}
+                        echo(f"\n❌ {p['description']} - FAILED (exit {outcome['returncode']})\n")
+                    self._save_state(state)
+
+        self._save_state(state)
+        return results
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Memory-aware ingestion planning
+Estimate a sheet's in-memory footprint from xlsx metadata and load it in one read, in streamed chunks or only its mapped columns
+"""
+
+import os
+import xml.etree.ElementTree as ET
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+import pandas as pd
+
+from pricelist.projection import HEADER_ROWS, ProjectionUnsupported, read_projected
+from pricelist.readers import candidates, read_excel
+from pricelist.workbook import _attr, _local, _probe_part, promote_header, sheet_parts
+
+# Peak bytes per cell of a full read per reader backend (cell values + the
+# object-dtype grid pandas builds from them); measured on 100k-row
+# supplier-style sheets at ~130 for openpyxl and ~205 for calamine, which
+# holds its Rust cell buffer alongside the Python rows; rounded up
+CELL_BYTES = {'openpyxl': 150, 'calamine': 220, 'xlrd': 150}
+
+# Peak bytes per byte of uncompressed sharedStrings.xml (Python str per entry)
+SHARED_STRING_BYTES = 2.5
+
+# Share of available memory a single in-memory load may use
+MEMORY_FRACTION = 0.5
+
+# Budget when available memory cannot be determined
+DEFAULT_BUDGET = 2 * 1024 ** 3
+
+# Rows per chunk on the streaming path
+CHUNK_ROWS = 50000
+
+# Bytes per cell of a loaded object-dtype frame (~60 measured on supplier-style
+# columns); ``load_sheet`` holds every streamed chunk plus their concatenation
+FRAME_CELL_BYTES = 60
+
+Sheet = Union[int, str]
+
+
+def available_memory() -> Optional[int]:
+    """MemAvailable on Linux (page counts elsewhere); None when unknown"""
+    try:
+        with open('/proc/meminfo', encoding='ascii') as fh:
+            for line in fh:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def memory_budget(fraction: float = MEMORY_FRACTION) -> int:
+    available = available_memory()
+    return int(available * fraction) if available else DEFAULT_BUDGET
+
+
+# ═══════════════════════════════════════════════════════════════════
+# FOOTPRINT ESTIMATES
+# ═══════════════════════════════════════════════════════════════════
+
+def _shared_strings(zf: zipfile.ZipFile) -> Dict:
+    """Uncompressed size and entry count of the shared strings table (count from the root tag only)"""
+    try:
+        info = zf.getinfo('xl/sharedStrings.xml')
+    except KeyError:
+        return {'bytes': 0, 'count': 0}
+
+    count = 0
+    with zf.open(info) as fh:
+        for _event, elem in ET.iterparse(fh, events=('start',)):
+            if _local(elem.tag) == 'sst':
+                count = int(_attr(elem, 'uniqueCount') or _attr(elem, 'count') or 0)
+            break
+    return {'bytes': info.file_size, 'count': count}
+
+
+def estimate_footprint(path, sheet: Sheet = 0) -> Dict:
+    """
+    Predict the peak memory of loading one sheet with ``read_excel`` on the
+    backend ``pricelist.readers`` picks for it.
+
+    For xlsx files only metadata is read: the sheet's dimension ref (rows
+    are streamed, not parsed, when it is missing), the uncompressed sheet
+    part and the shared strings table. Legacy .xls and CSV files are sized
+    from the file itself.
+    """
+    path = Path(path)
+    estimate = {'file': path.name, 'file_bytes': path.stat().st_size, 'sheet': sheet, 'rows': None,
+                'cols': None, 'sheet_bytes': None, 'shared_strings': 0, 'shared_strings_bytes': 0}
+
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            parts = sheet_parts(zf)
+            names = [name for name, _member in parts]
+            index = sheet if isinstance(sheet, int) else names.index(sheet)
+            name, member = parts[index]
+            probe = _probe_part(zf, member, sample_rows=1)
+            strings = _shared_strings(zf)
+
+        estimate.update({'sheet': name, 'rows': probe['rows'], 'cols': probe['cols'],
+                         'sheet_bytes': probe['bytes'], 'shared_strings': strings['count'],
+                         'shared_strings_bytes': strings['bytes']})
+        cells = (probe['rows'] or 0) * (probe['cols'] or 0)
+        estimate['backend'] = candidates(path)[0]
+        estimate['estimated_bytes'] = int(cells * CELL_BYTES[estimate['backend']]
+                                          + strings['bytes'] * SHARED_STRING_BYTES)
+    else:
+        # .xls is decompressed in full by xlrd; CSV grows roughly 5x as Python objects
+        factor = 10 if path.suffix.lower() == '.xls' else 5
+        estimate['estimated_bytes'] = estimate['file_bytes'] * factor
+
+    return estimate
+
+
+def plan_ingestion(path, sheet: Sheet = 0, budget: Optional[int] = None,
+                   chunk_rows: int = CHUNK_ROWS) -> Dict:
+    """
+    Choose how to load a sheet: ``memory`` (one ``read_excel``) when the
+    estimated footprint fits the budget, otherwise ``streaming`` (xlsx rows
+    read in chunks, only the wanted columns kept). Legacy .xls files cannot
+    be streamed and always load in memory.
+
+    Streaming removes the parser's overhead, not the result: ``load_sheet``
+    still returns the whole frame (``iter_sheet`` does not).
+    """
+    plan = estimate_footprint(path, sheet)
+    plan['budget'] = budget if budget is not None else memory_budget()
+    streamable = zipfile.is_zipfile(path)
+    oversized = plan['estimated_bytes'] > plan['budget']
+    plan['path'] = 'streaming' if oversized and streamable else 'memory'
+    plan['chunk_rows'] = chunk_rows if plan['path'] == 'streaming' else None
+    if oversized and not streamable:
+        plan['warning'] = 'Estimated footprint exceeds the budget but the format cannot be streamed'
+    return plan
+
+
+# ═══════════════════════════════════════════════════════════════════
+# LOADING
+# ═══════════════════════════════════════════════════════════════════
+
+def iter_sheet_chunks(path, sheet: Sheet = 0, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Raw (``header=None``) frames of ``chunk_rows`` rows from a read-only openpyxl pass"""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[sheet] if isinstance(sheet, int) else wb[sheet]
+        # Placeholder dimension refs would otherwise cut the sheet short
+        ws.reset_dimensions()
+        rows: List[tuple] = []
+        for values in ws.iter_rows(values_only=True):
+            rows.append(values)
+            if len(rows) >= chunk_rows:
+                yield pd.DataFrame(rows)
+                rows = []
+        if rows:
+            yield pd.DataFrame(rows)
+    finally:
+        wb.close()
+
+
+def _select(frame: pd.DataFrame, columns: Optional[Callable[[List], List]]) -> pd.DataFrame:
+    return frame if columns is None else frame[columns(list(frame.columns))]
+
+
+def _load_projected(path, sheet: Sheet, find_header, header_row: int,
+                    columns: Callable[[List], List], plan: Dict) -> Optional[pd.DataFrame]:
+    """Header from the leading rows, then only the kept columns parsed; None when not applicable"""
+    try:
+        head, _last = read_projected(path, sheet, max_rows=HEADER_ROWS)
+        found = find_header(head) if find_header and len(head) else None
+        row = header_row if found is None else found
+        if row >= len(head):
+            return None
+
+        names = list(promote_header(head, row).columns)
+        keep = columns(names)
+        positions = [names.index(name) for name in keep]
+        raw, last_row = read_projected(path, sheet, columns=positions, first_row=row)
+    except ProjectionUnsupported:
+        return None
+
+    # Row 0 of the projected frame is the header row itself
+    body = raw.iloc[1:].reset_index(drop=True)
+    body.columns = keep
+    plan.update({'path': 'projected', 'header_row': row, 'raw_rows': last_row, 'chunks': 1,
+                 'columns_read': len(keep), 'columns_total': max(len(names), plan.get('cols') or 0)})
+    return body.infer_objects()
+
+
+def _stream(path, sheet: Sheet, find_header, header_row: int, columns: Optional[Callable[[List], List]],
+            plan: Dict) -> Iterator[pd.DataFrame]:
+    """Header-promoted frames of the kept columns, one per streamed chunk"""
+    chunks = iter_sheet_chunks(path, sheet, plan['chunk_rows'])
+    first = next(chunks, pd.DataFrame())
+    found = find_header(first) if find_header and len(first) else None
+    plan['header_row'] = header_row if found is None else found
+
+    head = promote_header(first, plan['header_row'])
+    names = list(head.columns)
+    keep = columns(names) if columns else names
+    positions = [names.index(name) for name in keep]
+
+    plan['raw_rows'], plan['chunks'] = len(first), 1
+    yield head[keep]
+    for chunk in chunks:
+        plan['raw_rows'] += len(chunk)
+        plan['chunks'] += 1
+        body = chunk.reindex(columns=range(len(names)))
+        body = body.iloc[:, positions]
+        body.columns = keep
+        yield body
+
+
+def iter_sheet(path, sheet: Sheet = 0, find_header: Optional[Callable[[pd.DataFrame], Optional[int]]] = None,
+               header_row: int = 0, columns: Optional[Callable[[List], List]] = None,
+               plan: Optional[Dict] = None) -> Iterator[pd.DataFrame]:
+    """
+    ``load_sheet`` one frame at a time: on the streaming path each chunk is
+    yielded as soon as it is read, so only one chunk is ever held; the
+    memory and projected paths yield their single frame. ``plan`` (when
+    given) is updated in place, with ``raw_rows`` and ``chunks`` final once
+    the iterator is exhausted.
+    """
+    plan = plan if plan is not None else plan_ingestion(path, sheet)
+    if plan['path'] == 'streaming':
+        for frame in _stream(path, sheet, find_header, header_row, columns, plan):
+            yield frame.infer_objects()
+    else:
+        frame, result = load_sheet(path, sheet, find_header, header_row, columns, plan)
+        plan.update(result)
+        yield frame
+
+
+def load_sheet(path, sheet: Sheet = 0, find_header: Optional[Callable[[pd.DataFrame], Optional[int]]] = None,
+               header_row: int = 0, columns: Optional[Callable[[List], List]] = None,
+               plan: Optional[Dict] = None) -> tuple:
+    """
+    Load a sheet with its header promoted, on the path chosen by ``plan``
+    (planned here when not given).
+
+    ``find_header(raw)`` locates the header in the raw leading rows
+    (``header_row`` is used when it returns None); ``columns(names)`` picks
+    the columns to keep. For xlsx files with ``columns`` only those columns
+    are parsed (``projected`` path, whatever the plan chose); otherwise the
+    streaming path drops the other columns chunk by chunk. The returned
+    frame is always fully materialised (every column when ``columns`` is
+    None); use ``iter_sheet`` to process an oversized sheet chunk by chunk.
+    Returns ``(frame, plan)`` with ``header_row``, ``raw_rows`` and
+    ``chunks`` added to the plan.
+    """
+    plan = dict(plan or plan_ingestion(path, sheet))
+
+    if columns is not None and zipfile.is_zipfile(path):
+        frame = _load_projected(path, sheet, find_header, header_row, columns, plan)
+        if frame is not None:
+            return frame, plan
+
+    if plan['path'] == 'memory':
+        raw = read_excel(path, sheet_name=sheet, header=None)
+        found = find_header(raw) if find_header else None
+        plan['header_row'] = header_row if found is None else found
+        plan['raw_rows'], plan['chunks'] = len(raw), 1
+        return _select(promote_header(raw, plan['header_row']), columns), plan
+
+    frames = list(_stream(path, sheet, find_header, header_row, columns, plan))
+    return pd.concat(frames, ignore_index=True).infer_objects(), plan
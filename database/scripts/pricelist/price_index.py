@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Cross-supplier best-price index
+Cheapest and in-stock suppliers per normalised brand + SKU, synced from Master partitions
+"""
+
+import json
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from pricelist.ids import normalise_sku
+from pricelist.master_store import MasterStore
+
+MANIFEST_NAME = 'manifest.json'
+OFFERS_FILE = 'offers.parquet'
+INDEX_FILE = 'index.parquet'
+
+OFFER_COLUMNS = ['key', 'brand', 'sku', 'supplier', 'price', 'in_stock']
+
+INDEX_COLUMNS = [
+    'key', 'brand', 'sku', 'min_price', 'median_price', 'best_supplier', 'supplier_count',
+    'best_in_stock_supplier', 'best_in_stock_price', 'in_stock_count', 'in_stock_suppliers'
+]
+
+INDEX_DTYPES = {
+    'min_price': np.float64, 'median_price': np.float64, 'supplier_count': np.int64,
+    'best_in_stock_price': np.float64, 'in_stock_count': np.int64
+}
+
+# Stock text that counts as available when the column is not numeric
+IN_STOCK_TEXT = ['IN STOCK', 'YES', 'Y', 'AVAILABLE']
+
+
+def in_stock(stock: pd.Series) -> pd.Series:
+    """Positive quantities or explicit 'in stock' text"""
+    quantity = pd.to_numeric(stock, errors='coerce')
+    available = (quantity > 0).to_numpy(copy=True)
+    textual = (quantity.isna() & stock.notna()).to_numpy()
+    if textual.any():
+        text = stock[textual].map(str).str.strip().str.upper()
+        available[textual] = text.isin(IN_STOCK_TEXT).to_numpy()
+    return pd.Series(available, index=stock.index)
+
+
+def _display(values: pd.Series) -> pd.Series:
+    """Text form of brand/SKU cells so mixed numeric/text columns persist to Parquet"""
+    text = values.astype(str).astype(object)
+    return text.where(values.notna(), None)
+
+
+def supplier_offers(df: pd.DataFrame, supplier: str, sku: str, brand: str, price: str,
+                    stock: str) -> pd.DataFrame:
+    """
+    Best offer per (brand + SKU key, supplier) from Master rows.
+
+    Rows without a SKU or a positive price are ignored; a supplier listing
+    the same key twice contributes its cheapest row, in stock if any row is.
+    """
+    sku_key = normalise_sku(df[sku])
+    brand_key = normalise_sku(df[brand]) if brand in df.columns else ''
+    prices = pd.to_numeric(df[price], errors='coerce')
+
+    offers = pd.DataFrame({
+        'key': brand_key + '|' + sku_key,
+        'brand': df[brand] if brand in df.columns else None,
+        'sku': df[sku],
+        'supplier': df[supplier].map(str),
+        'price': prices,
+        'in_stock': in_stock(df[stock]) if stock in df.columns else False
+    })
+    offers = offers[(sku_key != '').to_numpy() & (prices > 0).to_numpy()]
+    if offers.empty:
+        return pd.DataFrame(columns=OFFER_COLUMNS)
+
+    # Cheapest row per (key, supplier); stock flag OR-ed over that supplier's rows
+    pair = pd.factorize(offers['key'])[0].astype(np.int64) * (offers['supplier'].nunique() + 1) + \
+        pd.factorize(offers['supplier'])[0]
+    any_stock = offers['in_stock'].groupby(pair).transform('max')
+    offers = offers.assign(in_stock=any_stock.astype(bool), _pair=pair)
+    best = offers.sort_values('price', kind='stable').drop_duplicates('_pair')
+
+    best = best[OFFER_COLUMNS].reset_index(drop=True)
+    best['brand'] = _display(best['brand'])
+    best['sku'] = _display(best['sku'])
+    return best
+
+
+def build_index(offers: pd.DataFrame) -> pd.DataFrame:
+    """One row per key: price spread across suppliers and who to buy from"""
+    if offers.empty:
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+
+    ranked = offers.sort_values(['key', 'price'], kind='stable', ignore_index=True)
+    codes = pd.factorize(ranked['key'])[0]
+
+    # Numeric aggregates over integer codes; the cheapest offer is the first row per key
+    grouped = ranked[['price', 'in_stock']].groupby(codes, sort=False)
+    index = ranked.drop_duplicates('key')[['key', 'brand', 'sku', 'supplier']].set_axis(
+        ['key', 'brand', 'sku', 'best_supplier'], axis=1).reset_index(drop=True)
+    index['min_price'] = grouped['price'].min().to_numpy()
+    index['median_price'] = grouped['price'].median().to_numpy()
+    index['supplier_count'] = grouped.size().to_numpy()
+    index['in_stock_count'] = grouped['in_stock'].sum().to_numpy().astype(np.int64)
+
+    stocked = ranked[ranked['in_stock']]
+    best_stocked = stocked.drop_duplicates('key').set_index('key')
+    index['best_in_stock_supplier'] = best_stocked['supplier'].reindex(index['key']).to_numpy()
+    index['best_in_stock_price'] = best_stocked['price'].reindex(index['key']).to_numpy()
+
+    # Only keys stocked by several suppliers need a joined list
+    index['in_stock_suppliers'] = index['best_in_stock_supplier'].fillna('')
+    multi = stocked[stocked['key'].duplicated(keep=False)]
+    if len(multi):
+        # Rows are already key-ordered, so a single linear scan groups them
+        joined = {}
+        for key, supplier in zip(multi['key'].tolist(), multi['supplier'].tolist()):
+            joined[key] = f"{joined[key]}, {supplier}" if key in joined else supplier
+        has_multi = index['key'].isin(joined.keys())
+        index.loc[has_multi, 'in_stock_suppliers'] = index.loc[has_multi, 'key'].map(joined)
+
+    return index[INDEX_COLUMNS]
+
+
+class PriceIndex:
+    """
+    Persisted best-price index.
+
+    Per-supplier offers are kept next to the index, so ``sync`` only reads
+    Master partitions whose file changed since the last sync and only
+    rebuilds index rows for keys those suppliers touched.
+    """
+
+    def __init__(self, root, supplier: str = 'Supplier', sku: str = 'SKU', brand: str = 'Brand',
+                 price: str = 'Cost Price Excl', stock: str = 'QTY On Hand'):
+        self.root = Path(root)
+        self.columns = {'supplier': supplier, 'sku': sku, 'brand': brand, 'price': price, 'stock': stock}
+
+    def _manifest(self) -> Dict:
+        path = self.root / MANIFEST_NAME
+        if path.exists():
+            return json.loads(path.read_text(encoding='utf-8'))
+        return {'sources': {}}
+
+    def _replace(self, name: str, df: pd.DataFrame):
+        tmp = self.root / f"{name}.{uuid.uuid4().hex}.tmp"
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, self.root / name)
+
+    def _load(self, name: str, columns: List[str]) -> pd.DataFrame:
+        path = self.root / name
+        return pd.read_parquet(path) if path.exists() else pd.DataFrame(columns=columns)
+
+    def read(self) -> pd.DataFrame:
+        return self._load(INDEX_FILE, INDEX_COLUMNS)
+
+    def sync(self, store: MasterStore) -> Dict:
+        """Bring the index up to date with the store's current partitions"""
+        manifest = self._manifest()
+        sources = manifest['sources']
+        current = {name: path.name for name, path in store.partition_files()}
+
+        changed = [name for name, part in current.items() if sources.get(name) != part]
+        removed = [name for name in sources if name not in current]
+        stats = {'changed': changed, 'removed': removed, 'keys_updated': 0, 'keys': None}
+        if not changed and not removed:
+            stats['keys'] = len(self.read())
+            return stats
+
+        offers = self._load(OFFERS_FILE, OFFER_COLUMNS)
+        stale = offers['supplier'].isin(changed + removed)
+
+        fresh = store.read(suppliers=changed, columns=list(self.columns.values()))
+        fresh_offers = supplier_offers(fresh, **self.columns)
+
+        affected = pd.Index(offers.loc[stale, 'key']).union(pd.Index(fresh_offers['key']))
+        offers = pd.concat([offers[~stale], fresh_offers], ignore_index=True)
+
+        index = self.read()
+        index = pd.concat([
+            index[~index['key'].isin(affected)],
+            build_index(offers[offers['key'].isin(affected)])
+        ], ignore_index=True)
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._replace(OFFERS_FILE, offers.astype({'price': np.float64, 'in_stock': bool}))
+        self._replace(INDEX_FILE, index.astype(INDEX_DTYPES).sort_values('key', ignore_index=True))
+
+        manifest = {'sources': current, 'updated_at': datetime.now().isoformat(timespec='seconds')}
+        tmp = self.root / f"{MANIFEST_NAME}.{uuid.uuid4().hex}.tmp"
+        tmp.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        os.replace(tmp, self.root / MANIFEST_NAME)
+
+        stats['keys_updated'] = len(affected)
+        stats['keys'] = len(index)
+        return stats
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Column-projected sheet reads
+Parse only the wanted columns of an xlsx sheet straight from its XML; cells of every other column are never decoded
+"""
+
+import html
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+from pandas.io.parsers import TextParser
+
+from pricelist.workbook import _attr, _column_index, _local, sheet_parts
+
+# Uncompressed bytes of sheet XML scanned per block
+BLOCK_BYTES = 8 * 1024 ** 2
+
+# Rows read (all columns) to locate the header before projecting
+HEADER_ROWS = 100
+
+_NS = rb'(?:[A-Za-z_][\w.-]*:)?'
+_ROW_OPEN = re.compile(rb'<' + _NS + rb'row\b[^>]*?\br="(\d+)"')
+_CELL_OPEN = re.compile(rb'<(' + _NS + rb')c[\s/>]')
+_STYLE = re.compile(rb'\bs="(\d+)"')
+_TYPE = re.compile(rb'\bt="(\w+)"')
+_VALUE = re.compile(rb'<' + _NS + rb'v>(.*?)</' + _NS + rb'v>', re.S)
+_TEXT = re.compile(rb'<' + _NS + rb't(?:\s[^>]*)?>(.*?)</' + _NS + rb't>', re.S)
+_PHONETIC = re.compile(rb'<' + _NS + rb'rPh\b.*?</' + _NS + rb'rPh>', re.S)
+_STRING_ITEM = re.compile(rb'<' + _NS + rb'si\s*/>|<' + _NS + rb'si>(.*?)</' + _NS + rb'si>', re.S)
+
+
+class ProjectionUnsupported(ValueError):
+    """The sheet XML cannot be read column-wise (cells without a leading ``r`` ref)"""
+
+
+def _cell_pattern(prefix: bytes, letters: Optional[Sequence[str]]) -> re.Pattern:
+    """
+    ``<c r="..">`` elements, only those in the given columns when ``letters``
+    is set. The literal ``<c r="`` lead lets the regex engine skip ahead
+    between cells; other columns fail on their first letters.
+    """
+    wanted = rb'[A-Z]+' if letters is None else rb'(?:' + b'|'.join(l.encode('ascii') for l in letters) + rb')'
+    return re.compile(rb'<' + re.escape(prefix) + rb'c r="(' + wanted + rb')(\d+)"([^>]*?)(?:/>|>(.*?)</'
+                      + re.escape(prefix) + rb'c>)', re.S)
+
+
+def _text(raw: bytes) -> str:
+    text = raw.decode('utf-8')
+    return html.unescape(text) if '&' in text else text
+
+
+def _rich_text(inner: bytes) -> str:
+    """Plain text of an ``<si>`` / ``<is>`` body (runs joined, phonetic hints dropped)"""
+    if b'rPh' in inner:
+        inner = _PHONETIC.sub(b'', inner)
+    texts = _TEXT.findall(inner)
+    text = _text(texts[0]) if len(texts) == 1 else ''.join(_text(t) for t in texts)
+    return text.replace('x005F_', '') if 'x005F_' in text else text
+
+
+# ═══════════════════════════════════════════════════════════════════
+# WORKBOOK PARTS
+# ═══════════════════════════════════════════════════════════════════
+
+def _date_styles(zf: zipfile.ZipFile) -> Tuple[Set[int], Set[int]]:
+    """Cell style indices formatted as dates and as durations"""
+    try:
+        fh = zf.open('xl/styles.xml')
+    except KeyError:
+        return set(), set()
+    with fh:
+        root = ET.parse(fh).getroot()
+
+    formats = dict(BUILTIN_FORMATS)
+    xfs: List[int] = []
+    for elem in root:
+        if _local(elem.tag) == 'numFmts':
+            for fmt in elem:
+                formats[int(_attr(fmt, 'numFmtId'))] = _attr(fmt, 'formatCode') or ''
+        elif _local(elem.tag) == 'cellXfs':
+            xfs = [int(_attr(xf, 'numFmtId') or 0) for xf in elem]
+
+    dates, durations = set(), set()
+    for index, fmt_id in enumerate(xfs):
+        code = formats.get(fmt_id)
+        if code and is_date_format(code):
+            dates.add(index)
+            if is_timedelta_format(code):
+                durations.add(index)
+    return dates, durations
+
+
+def _epoch(zf: zipfile.ZipFile):
+    with zf.open('xl/workbook.xml') as fh:
+        for elem in ET.parse(fh).getroot():
+            if _local(elem.tag) == 'workbookPr' and (_attr(elem, 'date1904') or '').lower() in ('1', 'true'):
+                return CALENDAR_MAC_1904
+    return CALENDAR_WINDOWS_1900
+
+
+def _shared_strings(zf: zipfile.ZipFile, wanted: Set[int]) -> Dict[int, str]:
+    """Only the shared strings at ``wanted`` indices; stops after the highest one"""
+    found: Dict[int, str] = {}
+    if not wanted:
+        return found
+    last = max(wanted)
+    index = 0
+    try:
+        fh = zf.open('xl/sharedStrings.xml')
+    except KeyError:
+        return found
+    with fh:
+        for block in _blocks(fh, b'si'):
+            for match in _STRING_ITEM.finditer(block):
+                if index in wanted:
+                    found[index] = _rich_text(match.group(1) or b'')
+                index += 1
+            if index > last:
+                break
+    return found
+
+
+def _blocks(fh, tag: bytes, size: int = BLOCK_BYTES) -> Iterator[bytes]:
+    """Stream ``fh`` in blocks that end after the last ``</tag>``, so no element is split"""
+    close = re.compile(rb'</' + _NS + re.escape(tag) + rb'>')
+    carry = b''
+    while True:
+        data = fh.read(size)
+        if not data:
+            if carry:
+                yield carry
+            return
+        data = carry + data
+        end = data.rfind(tag + b'>')
+        while end != -1 and not close.match(data, data.rfind(b'</', 0, end)):
+            end = data.rfind(tag + b'>', 0, end)
+        if end == -1:
+            # One element larger than a block: keep reading
+            carry = data
+            continue
+        end += len(tag) + 1
+        yield data[:end]
+        carry = data[end:]
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CELLS
+# ═══════════════════════════════════════════════════════════════════
+
+def _scan(zf: zipfile.ZipFile, member: str, letters: Optional[Sequence[str]],
+          max_row: Optional[int]) -> Tuple[List[int], List[int], List, int]:
+    """
+    Row numbers, column numbers (1-based, as in the cell refs) and values of
+    the matching cells, plus the last row number of the sheet. Values are
+    what ``read_excel``'s openpyxl engine hands to its parser.
+    """
+    dates, durations = _date_styles(zf)
+    epoch = _epoch(zf)
+    rows: List[int] = []
+    cols: List[int] = []
+    values: List = []
+    strings: List[Tuple[int, int]] = []
+    pattern = None
+    last_row = 0
+    col_numbers: Dict[bytes, int] = {}
+
+    with zf.open(member) as fh:
+        for block in _blocks(fh, b'row'):
+            if pattern is None:
+                opened = _CELL_OPEN.search(block)
+                if opened is None:
+                    continue
+                prefix = opened.group(1)
+                pattern = _cell_pattern(prefix, letters)
+                # Every writer we ingest leads with r=; anything else is read in full instead
+                if block.count(b'<' + prefix + b'c r="') != len(_CELL_OPEN.findall(block)):
+                    raise ProjectionUnsupported(f"{member}: cells without a leading cell reference")
+
+            for match in pattern.finditer(block):
+                row = int(match.group(2))
+                if max_row is not None and row > max_row:
+                    break
+                attrs, body = match.group(3), match.group(4) or b''
+                kind = b'n'
+                if b't="' in attrs:
+                    kind = _TYPE.search(attrs).group(1)
+
+                if kind == b'inlineStr':
+                    value = _rich_text(body)
+                else:
+                    found = _VALUE.search(body) if body else None
+                    raw = found.group(1) if found else b''
+                    if not raw:
+                        value = ''
+                    elif kind == b'n':
+                        value = float(raw) if b'.' in raw or b'E' in raw or b'e' in raw else int(raw)
+                        style = _STYLE.search(attrs) if b's="' in attrs else None
+                        if style is not None and int(style.group(1)) in dates:
+                            try:
+                                value = from_excel(value, epoch, timedelta=int(style.group(1)) in durations)
+                            except (OverflowError, ValueError):
+                                value = float('nan')
+                        elif isinstance(value, float) and value.is_integer():
+                            value = int(value)
+                    elif kind == b's':
+                        strings.append((len(values), int(raw)))
+                        value = ''
+                    elif kind == b'b':
+                        value = bool(int(raw))
+                    elif kind == b'd':
+                        value = from_ISO8601(_text(raw))
+                    elif kind == b'e':
+                        value = float('nan')
+                    else:
+                        value = _text(raw)
+
+                rows.append(row)
+                ref = match.group(1)
+                col = col_numbers.get(ref)
+                if col is None:
+                    col = col_numbers[ref] = _column_index(ref.decode('ascii'))
+                cols.append(col)
+                values.append(value)
+            else:
+                opened = list(_ROW_OPEN.finditer(block, max(0, len(block) - 65536)))
+                if opened:
+                    last_row = max(last_row, int(opened[-1].group(1)))
+                continue
+            last_row = max(last_row, row)
+            break
+
+    lookup = _shared_strings(zf, {index for _position, index in strings})
+    for position, index in strings:
+        values[position] = lookup.get(index, '')
+    return rows, cols, values, max([last_row] + rows[-1:])
+
+
+def read_projected(path, sheet=0, columns: Optional[Sequence[int]] = None, first_row: int = 0,
+                   max_rows: Optional[int] = None) -> Tuple[pd.DataFrame, int]:
+    """
+    Raw (``header=None``) frame of an xlsx sheet holding only ``columns``
+    (0-based positions, in the order given; all columns when None) from row
+    ``first_row`` (0-based) on, at most ``max_rows`` rows.
+
+    The sheet XML is scanned in blocks for cells of those columns only;
+    every other cell is skipped by the regex scan without being decoded,
+    and only the shared strings the kept cells use are read. Values go
+    through the same ``TextParser`` as ``read_excel`` so the frame matches
+    a full read followed by a column selection (rows past the last value in
+    the kept columns are not materialised). Returns ``(frame, last_row)``
+    where ``last_row`` is the sheet's last row number.
+    """
+    with zipfile.ZipFile(path) as zf:
+        parts = sheet_parts(zf)
+        member = parts[sheet][1] if isinstance(sheet, int) else dict(parts).get(sheet)
+        if member is None:
+            raise ValueError(f"Worksheet named '{sheet}' not found")
+
+        letters = None if columns is None else [get_column_letter(c + 1) for c in columns]
+        max_row = None if max_rows is None else first_row + max_rows
+        rows, cols, values, last_row = _scan(zf, member, letters, max_row)
+
+    if columns is None:
+        slots = {col: col - 1 for col in set(cols)}
+        width = max(cols, default=0)
+    else:
+        slots = {col + 1: slot for slot, col in enumerate(columns)}
+        width = len(columns)
+
+    last = max(rows, default=first_row)
+    grid = [[''] * width for _ in range(max(last - first_row, 0))]
+    for row, col, value in zip(rows, cols, values):
+        if row > first_row:
+            grid[row - first_row - 1][slots[col]] = value
+
+    # Trailing blank rows are dropped by read_excel as well
+    while grid and all(v == '' for v in grid[-1]):
+        grid.pop()
+    if not grid:
+        return pd.DataFrame(columns=range(width)), last_row
+    frame = TextParser(grid, header=None, skip_blank_lines=False).read()
+    return frame, last_row
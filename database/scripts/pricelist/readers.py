@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Excel reader backends
+One read_excel-style entry point over calamine, openpyxl and xlrd, chosen per file with fallback on parse errors
+"""
+
+import importlib.util
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from pricelist import telemetry
+
+# pandas engine -> module that provides it
+BACKENDS = {
+    'calamine': 'python_calamine',   # Rust reader (xlsx, xlsm, xlsb, xls, ods)
+    'openpyxl': 'openpyxl',          # pure Python, xlsx / xlsm only
+    'xlrd': 'xlrd'                   # legacy BIFF .xls only (xlrd >= 2)
+}
+
+# Backends able to read each container format
+CAPABILITIES = {
+    'xlsx': ['calamine', 'openpyxl'],
+    'xls': ['calamine', 'xlrd'],
+    'xlsb': ['calamine'],
+    'ods': ['calamine']
+}
+
+# Fastest first; replaced by the measured order when a benchmark has been saved
+SPEED_ORDER = ['calamine', 'openpyxl', 'xlrd']
+
+# Force a backend for every file (it is still tried first, then the others)
+BACKEND_ENV = 'PRICELIST_READER'
+
+# Raised by pandas for bad parse arguments (usecols, dtype, a missing sheet)
+# the same way on every backend, so they are never retried on the next one
+ARGUMENT_ERRORS = (TypeError, KeyError, ValueError)
+
+# Written by ``python -m pricelist.bench``
+BENCH_RESULTS = Path.home() / '.cache' / 'pricelist-bench' / 'results.json'
+
+_OLE_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+_cache: Dict[str, object] = {}
+
+
+def available_backends() -> List[str]:
+    """Backends whose module is installed (checked without importing it)"""
+    if 'available' not in _cache:
+        _cache['available'] = [name for name, module in BACKENDS.items() if importlib.util.find_spec(module)]
+    return _cache['available']
+
+
+def speed_order() -> List[str]:
+    """Backends by measured seconds per cell, falling back to ``SPEED_ORDER``"""
+    if 'speed' not in _cache:
+        try:
+            measured = json.loads(BENCH_RESULTS.read_text(encoding='utf-8')).get('backends', {})
+        except (OSError, ValueError):
+            measured = {}
+        ranked = sorted(measured, key=measured.get)
+        _cache['speed'] = ranked + [name for name in SPEED_ORDER if name not in ranked]
+    return _cache['speed']
+
+
+def detect_format(path) -> str:
+    """Container format from the file signature (supplier files are often misnamed)"""
+    path = Path(path)
+    suffix = path.suffix.lower().lstrip('.')
+    with open(path, 'rb') as fh:
+        magic = fh.read(8)
+    if magic == _OLE_MAGIC:
+        return 'xls'
+    if magic[:2] == b'PK':
+        return suffix if suffix in ('xlsb', 'ods') else 'xlsx'
+    return suffix
+
+
+def candidates(path, backend: Optional[str] = None) -> List[str]:
+    """
+    Installed backends that can read ``path``, in the order they are tried:
+    ``backend`` (or ``PRICELIST_READER``) first, then fastest first.
+    """
+    capable = CAPABILITIES.get(detect_format(path), list(BACKENDS))
+    order = [name for name in speed_order() if name in capable and name in available_backends()]
+    preferred = backend or os.environ.get(BACKEND_ENV)
+    if preferred:
+        if preferred not in BACKENDS:
+            raise ValueError(f"Unknown reader backend: {preferred} (choose from {', '.join(BACKENDS)})")
+        order = [preferred] + [name for name in order if name != preferred]
+    if not order:
+        raise ImportError(f"No installed reader can open {Path(path).name}; "
+                          f"install one of: {', '.join(BACKENDS[name] for name in capable)}")
+    return order
+
+
+class Workbook:
+    """
+    An open workbook on the first backend that loads it. ``parse`` takes
+    ``pd.read_excel`` arguments; when the current backend fails on a sheet
+    the workbook is reopened on the next candidate and the parse retried.
+    Argument errors (``ARGUMENT_ERRORS``) are raised unchanged.
+    """
+
+    def __init__(self, path, backend: Optional[str] = None):
+        self.path = Path(path)
+        self._remaining = candidates(self.path, backend)
+        self.errors: Dict[str, str] = {}
+        self._book: Optional[pd.ExcelFile] = None
+        self.backend: Optional[str] = None
+        self._open_next()
+
+    def _open_next(self):
+        while self._remaining:
+            name = self._remaining.pop(0)
+            try:
+                self._book = pd.ExcelFile(self.path, engine=name)
+                self.backend = name
+                return
+            except (FileNotFoundError, PermissionError):
+                raise
+            except Exception as e:
+                self._failed(name, e)
+        raise ValueError(f"No reader could read {self.path.name}: {self.errors}")
+
+    def _failed(self, name: str, error: Exception):
+        self.errors[name] = str(error)
+        telemetry.READER_FALLBACKS.inc(backend=name)
+        telemetry.log_event('reader_fallback', file=self.path.name, backend=name, error=str(error))
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return self._book.sheet_names
+
+    def _missing(self, sheet_name) -> bool:
+        names = self.sheet_names
+        wanted = sheet_name if isinstance(sheet_name, list) else [sheet_name]
+        return any((s not in names) if isinstance(s, str) else not -len(names) <= s < len(names)
+                   for s in wanted if s is not None)
+
+    def parse(self, sheet_name=0, **kwargs):
+        while True:
+            try:
+                return self._book.parse(sheet_name, **kwargs)
+            except ARGUMENT_ERRORS:
+                raise
+            except Exception as e:
+                # A missing sheet is missing for every backend
+                if self._missing(sheet_name):
+                    raise
+                self._book.close()
+                self._failed(self.backend, e)
+                self._open_next()
+
+    def close(self):
+        if self._book is not None:
+            self._book.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_excel(path, sheet_name=0, backend: Optional[str] = None, **kwargs):
+    """``pd.read_excel`` on the best available backend for ``path``"""
+    with Workbook(path, backend) as book:
+        return book.parse(sheet_name, **kwargs)
+
+
+def sheet_names(path, backend: Optional[str] = None) -> List[str]:
+    with Workbook(path, backend) as book:
+        return book.sheet_names
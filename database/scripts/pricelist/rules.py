@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Vectorised validation rule engine
+Rules are declared once as dicts and evaluated in a single pass per frame
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Row-level checks set a bit in the per-row violation mask
+ROW_CHECKS = {'not_null', 'required', 'numeric', 'non_negative', 'non_zero', 'positive', 'unique', 'range'}
+
+# Dataset-level checks compare a ratio against a threshold
+DATASET_CHECKS = {'coverage'}
+
+MAX_ROW_RULES = 64
+
+RULE_DEFAULTS = {
+    'severity': 'error',
+    'message': None,
+    'min': None,
+    'max': None,
+    'min_ratio': None
+}
+
+BLANK_VALUES = ['', 'nan', 'none', 'null']
+
+
+def rule(code: str, field: str, check: str, **options) -> Dict:
+    """Build a rule declaration, e.g. ``rule('negative_price', 'Cost Price Excl', 'non_negative')``"""
+    return {'code': code, 'field': field, 'check': check, **options}
+
+
+class RuleSet:
+    """
+    Compiled set of validation rules.
+
+    ``evaluate`` produces, in one pass over the frame, a uint64 violation
+    bitmask per row (bit i = row rule i), per-rule violation counts and
+    dataset-level coverage results. Derived per-field data (missing masks,
+    numeric coercion) is computed once and shared between rules.
+    """
+
+    def __init__(self, rules: List[Dict]):
+        self.row_rules: List[Dict] = []
+        self.dataset_rules: List[Dict] = []
+
+        for declared in rules:
+            spec = {**RULE_DEFAULTS, **declared}
+            if spec['check'] in ROW_CHECKS:
+                self.row_rules.append(spec)
+            elif spec['check'] in DATASET_CHECKS:
+                if spec['min_ratio'] is None:
+                    raise ValueError(f"Coverage rule '{spec['code']}' needs min_ratio")
+                self.dataset_rules.append(spec)
+            else:
+                raise ValueError(f"Unknown check '{spec['check']}' in rule '{spec['code']}'")
+
+        if len(self.row_rules) > MAX_ROW_RULES:
+            raise ValueError(f"At most {MAX_ROW_RULES} row rules fit in the violation mask")
+
+        codes = [r['code'] for r in self.row_rules + self.dataset_rules]
+        if len(set(codes)) != len(codes):
+            raise ValueError("Rule codes must be unique")
+
+        self.bits = {r['code']: np.uint64(1) << np.uint64(i) for i, r in enumerate(self.row_rules)}
+
+    # ───────────────────────────────────────────────────────────────
+    # Evaluation
+    # ───────────────────────────────────────────────────────────────
+
+    def evaluate(self, df: pd.DataFrame) -> Dict:
+        """Run every rule against ``df``"""
+        n = len(df)
+        mask = np.zeros(n, dtype=np.uint64)
+        counts = {}
+        cache: Dict = {}
+
+        for spec in self.row_rules:
+            hits = self._row_hits(df, spec, cache)
+            counts[spec['code']] = int(hits.sum())
+            mask[hits] |= self.bits[spec['code']]
+
+        coverage = {}
+        for spec in self.dataset_rules:
+            missing = self._missing(df, spec['field'], cache, blank=True)
+            filled = n - int(missing.sum())
+            ratio = filled / n if n else 0.0
+            counts[spec['code']] = int(missing.sum())
+            coverage[spec['code']] = {
+                'field': spec['field'],
+                'filled': filled,
+                'ratio': ratio,
+                'min_ratio': spec['min_ratio'],
+                'passed': ratio >= spec['min_ratio']
+            }
+
+        return {
+            'rows': n,
+            'mask': mask,
+            'counts': counts,
+            'coverage': coverage,
+            'invalid_rows': int(np.count_nonzero(mask))
+        }
+
+    def _missing(self, df: pd.DataFrame, field: str, cache: Dict, blank: bool) -> np.ndarray:
+        key = ('missing', field, blank)
+        if key not in cache:
+            if field not in df.columns:
+                cache[key] = np.ones(len(df), dtype=bool)
+            else:
+                col = df[field]
+                missing = col.isna().to_numpy()
+                # Only text columns can hold blank strings ('', 'n/a', ...)
+                if blank and (pd.api.types.is_object_dtype(col) or pd.api.types.is_string_dtype(col)):
+                    text = col[~missing]
+                    if pd.api.types.is_object_dtype(text):
+                        text = text.where(text.map(type) == str, None)
+                    is_blank = text.str.strip().str.lower().isin(BLANK_VALUES)
+                    missing = missing.copy()
+                    missing[~missing] = is_blank.to_numpy(dtype=bool)
+                cache[key] = missing
+        return cache[key]
+
+    def _numeric(self, df: pd.DataFrame, field: str, cache: Dict) -> np.ndarray:
+        key = ('numeric', field)
+        if key not in cache:
+            if field not in df.columns:
+                cache[key] = np.full(len(df), np.nan)
+            else:
+                col = df[field]
+                if not pd.api.types.is_numeric_dtype(col) or pd.api.types.is_bool_dtype(col):
+                    col = pd.to_numeric(col, errors='coerce')
+                cache[key] = col.to_numpy(dtype=float, na_value=np.nan)
+        return cache[key]
+
+    def _row_hits(self, df: pd.DataFrame, spec: Dict, cache: Dict) -> np.ndarray:
+        check, field = spec['check'], spec['field']
+
+        if check == 'not_null':
+            return self._missing(df, field, cache, blank=False)
+        if check == 'required':
+            return self._missing(df, field, cache, blank=True)
+        if field not in df.columns:
+            return np.zeros(len(df), dtype=bool)
+
+        if check == 'unique':
+            present = ~self._missing(df, field, cache, blank=True)
+            hits = np.zeros(len(df), dtype=bool)
+            hits[present] = df[field][present].duplicated(keep='first').to_numpy()
+            return hits
+
+        values = self._numeric(df, field, cache)
+        with np.errstate(invalid='ignore'):
+            if check == 'numeric':
+                return np.isnan(values) & ~self._missing(df, field, cache, blank=True)
+            if check == 'non_negative':
+                return values < 0
+            if check == 'non_zero':
+                return values == 0
+            if check == 'positive':
+                return values <= 0
+            # range
+            hits = np.zeros(len(df), dtype=bool)
+            if spec['min'] is not None:
+                hits |= values < spec['min']
+            if spec['max'] is not None:
+                hits |= values > spec['max']
+            return hits
+
+    # ───────────────────────────────────────────────────────────────
+    # Output mapping
+    # ───────────────────────────────────────────────────────────────
+
+    def message(self, code: str) -> str:
+        spec = next(r for r in self.row_rules + self.dataset_rules if r['code'] == code)
+        return spec['message'] or f"{spec['field']}: {code.replace('_', ' ')}"
+
+    def row_errors(self, result: Dict) -> pd.Series:
+        """
+        Violated rule codes per row (empty list when valid), the shape of
+        ``spp.pricelist_row.validation_errors``.
+
+        Decoding runs once per distinct mask value, not per row.
+        """
+        mask = result['mask']
+        uniques, inverse = np.unique(mask, return_inverse=True)
+        decoded = np.empty(len(uniques), dtype=object)
+        for i, value in enumerate(uniques):
+            decoded[i] = [r['code'] for r in self.row_rules if value & self.bits[r['code']]]
+        return pd.Series(decoded[inverse], dtype=object)
+
+    def error_records(self, df: pd.DataFrame, result: Dict, session_id: Optional[str] = None,
+                      first_row_number: int = 2) -> pd.DataFrame:
+        """
+        One record per violation, matching ``pricelist_validation_errors``
+        (row_number, field_name, error_type, error_message, raw_value,
+        severity). Row numbers are worksheet rows: data row 0 is row 2.
+        """
+        mask = result['mask']
+        frames = []
+        for spec in self.row_rules:
+            rows = np.flatnonzero(mask & self.bits[spec['code']])
+            if not len(rows):
+                continue
+            if spec['field'] in df.columns:
+                raw = [None if pd.isna(v) else str(v) for v in df[spec['field']].iloc[rows]]
+            else:
+                raw = [None] * len(rows)
+            frames.append(pd.DataFrame({
+                'row_number': rows + first_row_number,
+                'field_name': spec['field'],
+                'error_type': spec['code'],
+                'error_message': self.message(spec['code']),
+                'raw_value': pd.Series(raw, dtype=object),
+                'severity': spec['severity']
+            }))
+
+        columns = ['row_number', 'field_name', 'error_type', 'error_message', 'raw_value', 'severity']
+        records = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+        if session_id is not None:
+            records.insert(0, 'session_id', session_id)
+        return records.sort_values('row_number', kind='stable', ignore_index=True)
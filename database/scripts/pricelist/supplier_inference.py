@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Supplier inference index
+Supplier votes from SKU prefixes, brands and description tokens learnt from labelled Master rows,
+plus neighbour fill for orphan rows inside a supplier block
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from pricelist.ids import normalise_sku, normalise_text
+
+# Relative weight of each feature kind in the vote
+FEATURE_WEIGHTS = {'prefix': 2.0, 'brand': 3.0, 'token': 1.0}
+
+# Features seen on fewer labelled rows than this carry no vote
+MIN_SUPPORT = 3
+
+# Description tokens used per row (leading words name the brand and product line)
+MAX_TOKENS = 8
+
+# Predictions below this confidence are left unassigned
+MIN_CONFIDENCE = 0.6
+
+PREDICTION_COLUMNS = ['supplier', 'confidence', 'runner_up', 'features']
+
+
+def sku_prefixes(sku: pd.Series) -> pd.Series:
+    """
+    Leading pattern of each SKU: the segment before the first separator
+    ('AID-1234' -> 'AID'), else the leading letters ('SM58' -> 'SM'), else
+    the first three characters. Each distinct SKU is processed once.
+    """
+    codes, uniques = pd.factorize(sku)
+    # Excel hands numeric SKUs back as floats: 12345.0 is SKU '12345'
+    uniques = [int(v) if isinstance(v, float) and v.is_integer() else v for v in uniques]
+    text = normalise_text(pd.Series(uniques, dtype=object))
+
+    segment = text.str.extract(r'^([0-9A-Z]{2,})[^0-9A-Z]', expand=False)
+    letters = text.str.extract(r'^([A-Z]{2,})', expand=False)
+    fallback = text.str.replace(r'[^0-9A-Z]', '', regex=True).str[:3]
+    prefixes = segment.fillna(letters).fillna(fallback)
+
+    prefixes = np.append(prefixes.to_numpy(dtype=object), '')
+    return pd.Series(prefixes[codes], index=sku.index, dtype=object)
+
+
+def row_features(df: pd.DataFrame, sku: str, brand: str, description: str,
+                 max_tokens: int = MAX_TOKENS) -> pd.DataFrame:
+    """
+    Long (row position, feature, kind) frame of every row's features.
+
+    Features are prefixed by kind ('P:AID', 'B:AIDAIMAGING', 'T:PROJECTOR')
+    so the same text as a brand and as a token stays distinct.
+    """
+    parts = []
+    positions = np.arange(len(df))
+
+    if sku in df.columns:
+        prefix = sku_prefixes(df[sku]).to_numpy()
+        parts.append(pd.DataFrame({'row': positions, 'feature': 'P:' + prefix, 'kind': 'prefix'})[prefix != ''])
+
+    if brand in df.columns:
+        brands = normalise_sku(df[brand]).to_numpy()
+        parts.append(pd.DataFrame({'row': positions, 'feature': 'B:' + brands, 'kind': 'brand'})[brands != ''])
+
+    if description in df.columns:
+        words = normalise_text(df[description]).str.findall(r'\b[A-Z][0-9A-Z]{2,}\b')
+        words = words.map(lambda w: list(dict.fromkeys(w))[:max_tokens])
+        flat = words.reset_index(drop=True).explode().dropna()
+        parts.append(pd.DataFrame({
+            'row': flat.index.to_numpy(dtype=np.int64),
+            'feature': 'T:' + flat.astype(object),
+            'kind': 'token'
+        }))
+
+    if not parts:
+        return pd.DataFrame({'row': np.array([], dtype=np.int64), 'feature': [], 'kind': []})
+    return pd.concat(parts, ignore_index=True)
+
+
+class SupplierIndex:
+    """
+    Supplier frequencies per feature, learnt from rows that have a supplier.
+
+    ``predict`` scores every row at once: each matching feature votes for
+    suppliers in proportion to how often they carry it, weighted by feature
+    kind. Confidence is the winning supplier's share of the vote.
+    """
+
+    def __init__(self, sku: str = 'SKU / MODEL ', brand: str = 'BRAND',
+                 description: str = 'PRODUCT DESCRIPTION', supplier: str = 'Supplier Name ',
+                 weights: Optional[Dict[str, float]] = None, min_support: int = MIN_SUPPORT):
+        self.columns = {'sku': sku, 'brand': brand, 'description': description}
+        self.supplier = supplier
+        self.weights = dict(weights or FEATURE_WEIGHTS)
+        self.min_support = min_support
+        self.table = pd.DataFrame(columns=['feature', 'supplier', 'share', 'weight'])
+
+    def fit(self, df: pd.DataFrame) -> 'SupplierIndex':
+        """Build the feature -> supplier frequency table from labelled rows"""
+        labelled = df[df[self.supplier].notna()]
+        suppliers = labelled[self.supplier].map(str).str.strip().to_numpy(dtype=object)
+
+        features = row_features(labelled, **self.columns)
+        features['supplier'] = suppliers[features['row'].to_numpy()]
+
+        counts = features.groupby(['feature', 'kind', 'supplier'], sort=False).size().rename('count').reset_index()
+        support = counts.groupby('feature', sort=False)['count'].transform('sum')
+        counts = counts[support >= self.min_support]
+        support = support[support >= self.min_support]
+
+        counts['share'] = counts['count'] / support
+        counts['weight'] = counts['kind'].map(self.weights).astype(float)
+        self.table = counts[['feature', 'supplier', 'share', 'weight']].reset_index(drop=True)
+        return self
+
+    def predict(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Best supplier per row of ``df`` (aligned to its index).
+
+        ``supplier`` is None where no feature is known; ``runner_up`` helps
+        review borderline rows; ``features`` counts the features that voted.
+        """
+        result = pd.DataFrame({
+            'supplier': pd.Series(None, index=df.index, dtype=object),
+            'confidence': 0.0,
+            'runner_up': pd.Series(None, index=df.index, dtype=object),
+            'features': 0
+        })
+        if df.empty or self.table.empty:
+            return result[PREDICTION_COLUMNS]
+
+        features = row_features(df, **self.columns)
+        votes = features[['row', 'feature']].merge(self.table, on='feature', how='inner')
+        if votes.empty:
+            return result[PREDICTION_COLUMNS]
+
+        votes['score'] = votes['share'] * votes['weight']
+        # Each matched feature contributes its full weight to the row's total
+        matched = votes.drop_duplicates(['row', 'feature'])
+        total = matched.groupby('row')['weight'].sum()
+        used = matched.groupby('row').size()
+
+        scores = votes.groupby(['row', 'supplier'], sort=False)['score'].sum().reset_index()
+        scores = scores.sort_values(['row', 'score'], ascending=[True, False], kind='stable')
+        rank = scores.groupby('row', sort=False).cumcount()
+        best = scores[rank == 0].set_index('row')
+        second = scores[rank == 1].set_index('row')
+
+        positions = best.index.to_numpy()
+        result.iloc[positions, 0] = best['supplier'].to_numpy()
+        result.iloc[positions, 1] = (best['score'] / total.reindex(best.index)).to_numpy()
+        result.iloc[second.index.to_numpy(), 2] = second['supplier'].to_numpy()
+        result.iloc[positions, 3] = used.reindex(best.index).to_numpy()
+        return result[PREDICTION_COLUMNS]
+
+    def fill(self, df: pd.DataFrame, min_confidence: float = MIN_CONFIDENCE) -> pd.DataFrame:
+        """Predictions for rows with a missing supplier; ``accepted`` marks those to apply"""
+        missing = df[df[self.supplier].isna()]
+        predictions = self.predict(missing)
+        predictions['accepted'] = predictions['supplier'].notna() & (predictions['confidence'] >= min_confidence)
+        return predictions
+
+
+def neighbour_fill(df: pd.DataFrame, supplier: str = 'Supplier Name ', code: str = 'Supplier Code',
+                   max_gap: Optional[int] = None) -> pd.DataFrame:
+    """
+    Supplier of each row with a missing ``supplier`` taken from its neighbours.
+
+    The nearest labelled row before and after every gap is found with one
+    forward and one backward fill over row positions. Rows whose two
+    neighbours name the same supplier (or that only have one neighbour) are
+    ``filled``; rows between two different suppliers are ``conflict`` and
+    left for review. Neighbours further than ``max_gap`` rows away are
+    ignored. Returns a frame aligned to the missing rows of ``df``.
+    """
+    names = df[supplier].to_numpy(dtype=object)
+    codes = df[code].to_numpy(dtype=object) if code in df.columns else np.full(len(df), None, dtype=object)
+    labelled = df[supplier].notna().to_numpy()
+    positions = np.arange(len(df), dtype=np.float64)
+
+    anchors = pd.Series(np.where(labelled, positions, np.nan))
+    before = anchors.ffill().to_numpy()
+    after = anchors.bfill().to_numpy()
+
+    missing = np.flatnonzero(~labelled)
+    before, after, at = before[missing], after[missing], positions[missing]
+    if max_gap is not None:
+        before[at - before > max_gap] = np.nan
+        after[after - at > max_gap] = np.nan
+    has_before, has_after = ~np.isnan(before), ~np.isnan(after)
+
+    def take(values, anchor, present):
+        taken = np.full(len(anchor), None, dtype=object)
+        taken[present] = values[anchor[present].astype(np.int64)]
+        return taken
+
+    result = pd.DataFrame({
+        'previous_supplier': take(names, before, has_before),
+        'next_supplier': take(names, after, has_after),
+        'previous_code': take(codes, before, has_before),
+        'next_code': take(codes, after, has_after),
+        'gap_before': np.where(has_before, at - before, np.nan),
+        'gap_after': np.where(has_after, after - at, np.nan)
+    }, index=df.index[missing])
+
+    conflict = has_before & has_after & (result['previous_supplier'] != result['next_supplier']).to_numpy()
+    fillable = (has_before | has_after) & ~conflict
+
+    result['supplier'] = result['previous_supplier'].where(has_before, result['next_supplier']).where(fillable)
+    previous_code = result['previous_code'].where(has_before)
+    result['code'] = previous_code.fillna(result['next_code']).where(fillable)
+    result['status'] = np.select([conflict, fillable], ['conflict', 'filled'], 'unresolved')
+    return result
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+ETL telemetry
+Prometheus metrics (node-exporter textfile or a /metrics endpoint) and JSON log events for Promtail/Loki
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import re
+import socket
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Exporters are switched on by environment so every entry point shares one setup
+TEXTFILE_ENV = 'PRICELIST_METRICS_TEXTFILE'   # e.g. /var/lib/node_exporter/textfile/pricelist.prom
+PORT_ENV = 'PRICELIST_METRICS_PORT'           # serve /metrics on this port
+LOG_FILE_ENV = 'PRICELIST_LOG_FILE'           # JSON lines for Promtail, e.g. /var/log/pricelist/etl.log
+WORKER_ENV = 'PRICELIST_WORKER'               # worker label / textfile suffix (default: script name or <host>-<role>)
+
+NAMESPACE = 'mantisnxt_pricelist'
+
+# Stage durations range from sub-second validation to multi-minute stockfile parses
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# One id per process run, attached to every log event
+RUN_ID = uuid.uuid4().hex[:12]
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, *extra: str) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(e for e in extra if e)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+# ═══════════════════════════════════════════════════════════════════
+# METRICS
+# ═══════════════════════════════════════════════════════════════════
+
+class Metric:
+    """A labelled metric family rendered in the Prometheus text format"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = f"{NAMESPACE}_{name}"
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def render(self, const: str = '') -> List[str]:
+        """Text-format lines; ``const`` is a rendered label pair added to every sample"""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._samples(key, value, const))
+        return lines
+
+    def _samples(self, key: Tuple, value, const: str = '') -> List[str]:
+        return [f"{self.name}{_labels(self.label_names, key, const)} {_number(value)}"]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.setdefault(key, {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def _samples(self, key: Tuple, value, const: str = '') -> List[str]:
+        bounds = [_number(b) for b in self.buckets] + ['+Inf']
+        counts = value['counts'] + [value['count']]
+        lines = []
+        for bound, n in zip(bounds, counts):
+            le = 'le="' + bound + '"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, const, le)} {n}")
+        lines.append(f"{self.name}_sum{_labels(self.label_names, key, const)} {_number(value['sum'])}")
+        lines.append(f"{self.name}_count{_labels(self.label_names, key, const)} {value['count']}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        # Set by ``configure`` so concurrent processes never export identical series
+        self.worker: Optional[str] = None
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        const = f'worker="{_escape(self.worker)}"' if self.worker else ''
+        return '\n'.join(line for metric in self.metrics for line in metric.render(const)) + '\n'
+
+
+REGISTRY = Registry()
+
+ROWS_PARSED = REGISTRY.register(Counter(
+    'rows_parsed_total', 'Data rows read from supplier pricelists', ('supplier',)))
+ROWS_REJECTED = REGISTRY.register(Counter(
+    'rows_rejected_total', 'Rows dropped for missing required fields', ('supplier',)))
+ROWS_WRITTEN = REGISTRY.register(Counter(
+    'rows_written_total', 'Rows staged or published to the Master store', ('supplier',)))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'stage_duration_seconds', 'Duration of a processing stage per supplier', ('supplier', 'stage')))
+STAGE_FAILURES = REGISTRY.register(Counter(
+    'stage_failures_total', 'Processing stages that raised or returned no data', ('supplier', 'stage')))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    'cache_requests_total', 'Lookups of reusable results (checkpoints, hash caches, ingest ledger)',
+    ('cache', 'result')))
+QUEUE_JOBS = REGISTRY.register(Gauge(
+    'queue_jobs', 'Ingestion jobs per status', ('status',)))
+QUEUE_WAIT_SECONDS = REGISTRY.register(Histogram(
+    'queue_wait_seconds', 'Time from enqueue to claim of ingestion jobs'))
+QUEUE_ROWS_PER_SECOND = REGISTRY.register(Gauge(
+    'queue_rows_per_second', 'Rows/sec of ingestion jobs finished in the metrics window'))
+READER_FALLBACKS = REGISTRY.register(Counter(
+    'reader_fallbacks_total', 'Workbooks a reader backend failed on before the next one was tried', ('backend',)))
+LAST_SUCCESS = REGISTRY.register(Gauge(
+    'last_success_timestamp_seconds', 'Unix time a supplier was last processed successfully', ('supplier',)))
+
+
+def cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def record_rows(supplier: str, stats: Dict, written: int):
+    """Row counters for one successfully processed supplier file"""
+    ROWS_PARSED.inc(stats.get('data_rows', 0), supplier=supplier)
+    ROWS_REJECTED.inc(stats.get('rejected_rows', 0), supplier=supplier)
+    ROWS_WRITTEN.inc(written, supplier=supplier)
+    LAST_SUCCESS.set(time.time(), supplier=supplier)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# JSON LOGS
+# ═══════════════════════════════════════════════════════════════════
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; ``fields`` passed via ``extra`` become top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': record.getMessage(),
+            'run_id': RUN_ID,
+            'worker': REGISTRY.worker,
+            'pid': record.process
+        }
+        payload.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+logger = logging.getLogger('pricelist')
+# Silent until ``configure`` attaches the JSON file handler
+logger.addHandler(logging.NullHandler())
+
+
+def log_event(event: str, level: int = logging.INFO, **fields):
+    logger.log(level, event, extra={'fields': fields})
+
+
+def stage_failed(supplier: str, stage: str, error: str, **fields):
+    STAGE_FAILURES.inc(supplier=supplier, stage=stage)
+    log_event('stage_failed', logging.ERROR, supplier=supplier, stage=stage, error=error, **fields)
+
+
+@contextmanager
+def stage_timer(supplier: str, stage: str, **fields) -> Iterator[Dict]:
+    """
+    Time a processing stage: observes ``stage_duration_seconds`` and logs a
+    ``stage_finished`` / ``stage_failed`` event. Fields added to the yielded
+    dict (e.g. ``rows``) are included in the event.
+    """
+    extra = dict(fields)
+    started = time.perf_counter()
+    try:
+        yield extra
+    except Exception as e:
+        stage_failed(supplier, stage, str(e), seconds=round(time.perf_counter() - started, 3), **extra)
+        raise
+    seconds = time.perf_counter() - started
+    STAGE_SECONDS.observe(seconds, supplier=supplier, stage=stage)
+    log_event('stage_finished', supplier=supplier, stage=stage, seconds=round(seconds, 3), **extra)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════
+
+_state = {'textfile': None, 'server': None}
+
+
+def worker_name(role: str) -> str:
+    """
+    Worker name of a long-running process: ``PRICELIST_WORKER``, else
+    ``<host>-<role>``. Stable across restarts, so a restarted worker rewrites
+    its own textfile and label instead of leaving a stale one behind (the
+    PID is only in the JSON logs). Give each of several same-role workers
+    on one host its own ``PRICELIST_WORKER``.
+    """
+    return os.environ.get(WORKER_ENV) or f"{socket.gethostname().split('.')[0] or 'localhost'}-{role}"
+
+
+def worker_textfile(path, worker: str) -> Path:
+    """Per-worker textfile next to ``path``: pricelist.prom -> pricelist.<worker>.prom"""
+    path = Path(path)
+    slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', worker)
+    return path.with_name(f"{path.stem}.{slug}{path.suffix or '.prom'}")
+
+
+def write_textfile(path) -> Path:
+    """Write the registry for node-exporter's textfile collector (atomic rename)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(REGISTRY.render(), encoding='utf-8')
+    os.replace(tmp, path)
+    return path
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port: int, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from a daemon thread"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='pricelist-metrics', daemon=True).start()
+    return server
+
+
+def configure(textfile: Optional[str] = None, port: Optional[int] = None, log_file: Optional[str] = None,
+              worker: Optional[str] = None):
+    """
+    Enable the exporters given here or by ``PRICELIST_METRICS_TEXTFILE``,
+    ``PRICELIST_METRICS_PORT`` and ``PRICELIST_LOG_FILE``. Safe to call
+    more than once; without any of them telemetry is collected but not
+    exported.
+
+    Every sample carries a ``worker`` label (``worker``, else
+    ``PRICELIST_WORKER``, else the script name) and the textfile is written
+    per worker, so concurrent processes never overwrite each other.
+    """
+    textfile = textfile or os.environ.get(TEXTFILE_ENV)
+    port = port or (int(os.environ[PORT_ENV]) if os.environ.get(PORT_ENV) else None)
+    log_file = log_file or os.environ.get(LOG_FILE_ENV)
+
+    if worker or REGISTRY.worker is None:
+        REGISTRY.worker = worker or os.environ.get(WORKER_ENV) or Path(sys.argv[0]).stem or 'pricelist'
+    if textfile:
+        _state['textfile'] = worker_textfile(textfile, REGISTRY.worker)
+    if port and _state['server'] is None:
+        _state['server'] = serve(port)
+    if log_file and not any(isinstance(h, logging.FileHandler) for h in logger.handlers):
+        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+        # Watched so logrotate can move the file under Promtail
+        handler = logging.handlers.WatchedFileHandler(log_file, encoding='utf-8')
+        handler.setFormatter(JsonFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+def flush():
+    """Write the textfile (if configured); call after each unit of work"""
+    if _state['textfile']:
+        write_textfile(_state['textfile'])
+
+
+def release():
+    """Remove this worker's textfile, so a stopped long-running worker exports no stale gauges"""
+    if _state['textfile']:
+        Path(_state['textfile']).unlink(missing_ok=True)
+        _state['textfile'] = None
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Workbook ingestion helpers
+Parse multi-sheet supplier workbooks once and work on the in-memory frames
+"""
+
+import os
+import xml.etree.ElementTree as ET
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from pricelist.readers import Workbook, read_excel
+
+
+def read_all_sheets(path, skip: Iterable[str] = (), backend: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Parse every sheet of a workbook in a single pass.
+
+    Sheets are returned raw (``header=None``) in workbook order so header
+    detection can run on the frames instead of re-reading the file.
+    ``backend`` overrides the reader chosen by ``pricelist.readers``.
+    """
+    skip = set(skip)
+    frames = read_excel(path, sheet_name=None, backend=backend, header=None)
+    return {name: df for name, df in frames.items() if name not in skip}
+
+
+def locate_header(raw: pd.DataFrame, markers: Iterable[str], max_rows: Optional[int] = None,
+                  min_matches: int = 1) -> Optional[int]:
+    """Return the position of the first row containing at least ``min_matches`` markers"""
+    markers = [m.lower() for m in markers]
+    scan = raw if max_rows is None else raw.head(max_rows)
+
+    for pos, values in enumerate(scan.itertuples(index=False, name=None)):
+        row_text = [str(v).lower() for v in values if pd.notna(v)]
+        matches = sum(1 for m in markers if any(m in cell for cell in row_text))
+        if matches >= min_matches:
+            return pos
+
+    return None
+
+
+def promote_header(raw: pd.DataFrame, header_row: int) -> pd.DataFrame:
+    """Use row ``header_row`` of a raw frame as column names (like ``read_excel(header=n)``)"""
+    names = []
+    seen: Dict[str, int] = {}
+    for idx, value in enumerate(raw.iloc[header_row].tolist()):
+        name = f"Unnamed: {idx}" if pd.isna(value) else value
+        key = str(name)
+        if key in seen:
+            seen[key] += 1
+            name = f"{key}.{seen[key]}"
+        else:
+            seen[key] = 0
+        names.append(name)
+
+    body = raw.iloc[header_row + 1:].reset_index(drop=True)
+    body.columns = names
+    return body.infer_objects()
+
+
+def map_sheets(frames: Dict[str, pd.DataFrame], transform: Callable[[str, pd.DataFrame], pd.DataFrame],
+               max_workers: Optional[int] = None, use_processes: bool = True) -> Dict[str, pd.DataFrame]:
+    """
+    Apply ``transform(sheet_name, frame)`` to every sheet concurrently.
+
+    Results keep workbook order. Row-wise transforms are GIL-bound, so worker
+    processes are used by default; ``transform`` must then be a module-level
+    function.
+    """
+    names = list(frames)
+    if not names:
+        return {}
+
+    workers = min(len(names), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return {name: transform(name, frames[name]) for name in names}
+
+    pool_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with pool_cls(max_workers=workers) as pool:
+        results = list(pool.map(transform, names, [frames[name] for name in names]))
+
+    return dict(zip(names, results))
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SHEET PROBING (no cell parsing)
+# ═══════════════════════════════════════════════════════════════════
+
+def _local(tag: str) -> str:
+    """Strip the XML namespace from a tag or attribute name"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _attr(elem, name: str) -> Optional[str]:
+    """Namespace-agnostic attribute lookup"""
+    for key, value in elem.attrib.items():
+        if _local(key) == name:
+            return value
+    return None
+
+
+def _column_index(letters: str) -> int:
+    """Convert column letters to a 1-based index"""
+    idx = 0
+    for ch in letters:
+        idx = idx * 26 + (ord(ch.upper()) - 64)
+    return idx
+
+
+def _split_ref(ref: str) -> Tuple[int, int]:
+    """Split a cell ref like 'M500' into (row, col)"""
+    letters = ''.join(ch for ch in ref if ch.isalpha())
+    digits = ''.join(ch for ch in ref if ch.isdigit())
+    return int(digits or 1), _column_index(letters or 'A')
+
+
+def parse_dimension(ref: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Return (rows, cols) spanned by a ``<dimension ref="A1:M500">`` value"""
+    if not ref:
+        return None
+    parts = ref.replace('$', '').split(':')
+    first_row, first_col = _split_ref(parts[0])
+    last_row, last_col = _split_ref(parts[-1])
+    return last_row - first_row + 1, last_col - first_col + 1
+
+
+def sheet_parts(zf: zipfile.ZipFile) -> List[Tuple[str, str]]:
+    """(sheet name, zip member) pairs in workbook order"""
+    with zf.open('xl/_rels/workbook.xml.rels') as fh:
+        rels = {_attr(el, 'Id'): _attr(el, 'Target') for el in ET.parse(fh).getroot()}
+
+    parts = []
+    with zf.open('xl/workbook.xml') as fh:
+        for el in ET.parse(fh).getroot().iter():
+            if _local(el.tag) != 'sheet':
+                continue
+            target = rels.get(_attr(el, 'id'), '')
+            member = target.lstrip('/') if target.startswith('/') else f"xl/{target}"
+            parts.append((_attr(el, 'name'), member))
+
+    return parts
+
+
+def _probe_part(zf: zipfile.ZipFile, member: str, sample_rows: int) -> Dict:
+    """Read a sheet's dimension and the fill of its first rows"""
+    info = {'rows': None, 'cols': None, 'sampled_rows': 0, 'filled_cells': 0,
+            'sample_cols': 0, 'bytes': zf.getinfo(member).file_size}
+
+    with zf.open(member) as fh:
+        for event, elem in ET.iterparse(fh, events=('start', 'end')):
+            tag = _local(elem.tag)
+
+            if event == 'start':
+                if tag == 'dimension':
+                    dims = parse_dimension(_attr(elem, 'ref'))
+                    # Some writers emit a placeholder "A1"; treat it as unknown
+                    if dims and dims != (1, 1):
+                        info['rows'], info['cols'] = dims
+                continue
+
+            if tag != 'row':
+                continue
+
+            if info['sampled_rows'] < sample_rows:
+                filled = 0
+                for cell in elem:
+                    if any(_local(child.tag) in ('v', 'is') for child in cell):
+                        filled += 1
+                        ref = _attr(cell, 'r')
+                        col = _split_ref(ref)[1] if ref else filled
+                        info['sample_cols'] = max(info['sample_cols'], col)
+                info['filled_cells'] += filled
+            info['sampled_rows'] += 1
+            elem.clear()
+
+            # With a dimension ref the sample is all we need; without one,
+            # keep streaming row tags to count them (still no cell parsing)
+            if info['rows'] is not None and info['sampled_rows'] >= sample_rows:
+                break
+
+    if info['rows'] is None:
+        info['rows'] = info['sampled_rows']
+        info['cols'] = info['sample_cols']
+
+    return info
+
+
+def probe_sheets(path, sample_rows: int = 20) -> List[Dict]:
+    """
+    Cheaply describe every sheet of a workbook without parsing cell data.
+
+    For xlsx files each sheet's ``<dimension>`` ref and the first
+    ``sample_rows`` rows are read straight from the zip; legacy ``.xls``
+    files fall back to a bounded ``nrows`` read per sheet. Each probe carries
+    a ``density`` score (estimated non-empty cells) used to rank sheets.
+    """
+    probes = []
+
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            for name, member in sheet_parts(zf):
+                info = _probe_part(zf, member, sample_rows)
+                info['name'] = name
+                probes.append(info)
+    else:
+        with Workbook(path) as xl:
+            for name in xl.sheet_names:
+                sample = xl.parse(name, header=None, nrows=sample_rows)
+                probes.append({'name': name, 'rows': None, 'cols': sample.shape[1],
+                               'sampled_rows': len(sample), 'filled_cells': int(sample.notna().sum().sum()),
+                               'sample_cols': sample.shape[1], 'bytes': None})
+
+    for info in probes:
+        cols = info['cols'] or info['sample_cols'] or 0
+        seen = min(info['sampled_rows'], sample_rows)
+        info['fill_ratio'] = info['filled_cells'] / (seen * cols) if seen and cols else 0.0
+        rows = info['rows'] if info['rows'] is not None else info['sampled_rows']
+        info['density'] = rows * cols * info['fill_ratio']
+
+    return probes
+
+
+def rank_sheets(probes: List[Dict], min_rows: int = 0) -> List[Dict]:
+    """Sheets with more than ``min_rows`` rows, densest first"""
+    eligible = [p for p in probes if (p['rows'] if p['rows'] is not None else p['sampled_rows']) > min_rows]
+    return sorted(eligible, key=lambda p: p['density'], reverse=True)
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Consolidated workbook write session
+Stage supplier tabs and Master rows, then load and save the workbook once
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import openpyxl
+import pandas as pd
+
+from pricelist.master_store import MasterStore, read_partitions
+from pricelist.readers import read_excel
+from pricelist.workbook import sheet_parts
+
+MANIFEST_NAME = 'manifest.json'
+
+# Master tabs of Consolidated_Supplier_Data.xlsx: the shared tab batch scripts
+# append to, and the tab Batch 2 regenerates from its MasterStore
+MASTER_SHEET = 'Master'
+BATCH2_MASTER_SHEET = 'Batch 2 Master'
+MASTER_SHEETS = (MASTER_SHEET, BATCH2_MASTER_SHEET)
+
+
+def frame_rows(df: pd.DataFrame, columns: List[str]):
+    """Yield row tuples in ``columns`` order with missing values as None"""
+    block = df.reindex(columns=columns).astype(object)
+    block = block.where(block.notna(), None)
+    return block.itertuples(index=False, name=None)
+
+
+class ConsolidatedWriteSession:
+    """
+    Collects supplier frames (and their Master rows) and writes them in a
+    single load/save of the consolidated workbook.
+
+    With ``checkpoint=True`` every staged frame is persisted to a staging
+    directory next to the workbook as soon as it is added; a crashed run
+    re-created with ``resume=True`` picks up the staged frames, while a run
+    without ``resume`` discards them. The staging directory is removed after
+    a successful flush. The workbook itself is written to a temporary file
+    and atomically moved into place.
+
+    ``engine='xlsx'`` renders the staged sheets in parallel with
+    ``pricelist.xlsx_writer`` instead of openpyxl. Rewritten tabs hold values
+    only; every other tab is copied from the existing file byte for byte.
+
+    With a ``master_store`` the Master sheet becomes a derived artefact:
+    Master rows replace the supplier's partition in the store and the sheet
+    is regenerated from all partitions on flush. An existing Master sheet is
+    imported into an empty store once (grouped by ``supplier_column``).
+    A regenerated sheet only holds the store's rows, so ``master_sheet`` must
+    be a tab owned by the store, never one that other scripts append to.
+    """
+
+    def __init__(self, path, master_columns: Optional[List[str]] = None, master_sheet: str = MASTER_SHEET,
+                 create_master: bool = True, checkpoint: bool = False, resume: bool = False,
+                 engine: str = 'openpyxl', master_store: Optional[MasterStore] = None,
+                 supplier_column: Optional[str] = None):
+        if engine not in ('openpyxl', 'xlsx'):
+            raise ValueError(f"Unknown write engine: {engine}")
+
+        self.path = Path(path)
+        self.engine = engine
+        self.master_columns = master_columns
+        self.master_sheet = master_sheet
+        self.create_master = create_master
+        self.checkpoint_dir = self.path.parent / f".{self.path.stem}.staging" if checkpoint else None
+        self.master_store = master_store
+        self.sheets: Dict[str, Dict] = {}
+        self.resumed: List[str] = []
+
+        if master_store is not None and not master_store.exists():
+            self._seed_master_store(supplier_column)
+
+        if self.checkpoint_dir is not None:
+            if resume:
+                self._load_checkpoint()
+            else:
+                self._clear_checkpoint()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
+
+    # ───────────────────────────────────────────────────────────────
+    # Staging
+    # ───────────────────────────────────────────────────────────────
+
+    def add_supplier(self, sheet_name: str, df: pd.DataFrame, columns: Optional[List[str]] = None,
+                     append_to_master: bool = False) -> int:
+        """Stage a supplier tab (replacing any earlier staging of the same tab)"""
+        sheet_name = sheet_name[:31]  # Excel sheet name limit
+        entry = {
+            'df': df,
+            'columns': list(columns) if columns is not None else list(df.columns),
+            'append_to_master': append_to_master
+        }
+        self.sheets[sheet_name] = entry
+
+        if append_to_master and self.master_store is not None:
+            self.master_store.put(sheet_name, df)
+
+        if self.checkpoint_dir is not None:
+            self._write_checkpoint(sheet_name, entry)
+
+        return len(df)
+
+    def _seed_master_store(self, supplier_column: Optional[str]):
+        """One-off import of a pre-existing Master sheet into an empty store"""
+        if supplier_column is None or not self.path.exists():
+            return
+        try:
+            existing = read_excel(self.path, sheet_name=self.master_sheet)
+        except ValueError:
+            return  # no Master sheet yet
+        # Columns outside the store schema mean the tab is shared with other
+        # writers; regenerating it would drop their columns and rows
+        foreign = [col for col in existing.columns if col not in self.master_store.columns]
+        if foreign:
+            raise ValueError(f"'{self.master_sheet}' has columns outside the Master store schema "
+                             f"({', '.join(map(str, foreign))}); use a sheet owned by the store")
+        if supplier_column in existing.columns and len(existing):
+            self.master_store.import_frame(existing, supplier_column)
+
+    @property
+    def pending_rows(self) -> int:
+        return sum(len(entry['df']) for entry in self.sheets.values())
+
+    # ───────────────────────────────────────────────────────────────
+    # Flush
+    # ───────────────────────────────────────────────────────────────
+
+    def _open_workbook(self):
+        try:
+            return openpyxl.load_workbook(self.path)
+        except FileNotFoundError:
+            wb = openpyxl.Workbook()
+            if 'Sheet' in wb.sheetnames:
+                wb.remove(wb['Sheet'])
+            return wb
+
+    def flush(self) -> Dict:
+        """Write all staged tabs and Master rows with one workbook save"""
+        result = {
+            'sheets_written': [],
+            'rows_written': 0,
+            'master_rows_appended': 0,
+            'master_start_row': None,
+            'master_rows': None
+        }
+
+        if not self.sheets:
+            return result
+
+        if self.engine == 'xlsx':
+            self._flush_parallel(result)
+            self.sheets.clear()
+            self._clear_checkpoint()
+            return result
+
+        wb = self._open_workbook()
+
+        for sheet_name, entry in self.sheets.items():
+            if sheet_name in wb.sheetnames:
+                wb.remove(wb[sheet_name])
+            ws = wb.create_sheet(sheet_name)
+            ws.append(entry['columns'])
+            for row in frame_rows(entry['df'], entry['columns']):
+                ws.append(row)
+
+            result['sheets_written'].append(sheet_name)
+            result['rows_written'] += len(entry['df'])
+
+        master_entries = [e for e in self.sheets.values() if e['append_to_master']]
+        if self._derived_master():
+            self._regenerate_master(wb, result, master_entries)
+        elif master_entries:
+            if self.master_sheet in wb.sheetnames:
+                master_ws = wb[self.master_sheet]
+            elif self.create_master:
+                master_ws = wb.create_sheet(self.master_sheet, 0)
+                master_ws.append(self.master_columns)
+            else:
+                master_ws = None
+
+            if master_ws is not None:
+                result['master_start_row'] = master_ws.max_row + 1
+                for entry in master_entries:
+                    for row in frame_rows(entry['df'], self.master_columns or entry['columns']):
+                        master_ws.append(row)
+                    result['master_rows_appended'] += len(entry['df'])
+
+        self._atomic_save(wb)
+        self.sheets.clear()
+        self._clear_checkpoint()
+
+        return result
+
+    def _derived_master(self) -> bool:
+        return self.master_store is not None and self.master_store.exists()
+
+    def _regenerate_master(self, wb, result: Dict, master_entries: List[Dict]):
+        """Rebuild the Master sheet from the partition store in one pass"""
+        if self.master_sheet in wb.sheetnames:
+            wb.remove(wb[self.master_sheet])
+        master_ws = wb.create_sheet(self.master_sheet, 0)
+        master_ws.append(self.master_store.columns)
+
+        for _supplier, df in self.master_store.iter_partitions():
+            for row in frame_rows(df, self.master_store.columns):
+                master_ws.append(row)
+
+        result['master_rows_appended'] = sum(len(e['df']) for e in master_entries)
+        result['master_rows'] = self.master_store.row_count()
+
+    def _flush_parallel(self, result: Dict):
+        """Render the staged tabs (and Master) with the parallel xlsx engine; other tabs are copied as is"""
+        from pricelist.xlsx_writer import write_workbook
+
+        sheets = {}
+        columns = {}
+        row_counts = {}
+
+        for sheet_name, entry in self.sheets.items():
+            sheets[sheet_name] = entry['df']
+            columns[sheet_name] = entry['columns']
+            result['sheets_written'].append(sheet_name)
+            result['rows_written'] += len(entry['df'])
+
+        master_entries = [e for e in self.sheets.values() if e['append_to_master']]
+        if self._derived_master():
+            # Streamed from the partition files inside the worker process
+            store = self.master_store
+            paths = [str(path) for _, path in store.partition_files()]
+            sheets = {self.master_sheet: partial(read_partitions, paths, store.columns), **sheets}
+            columns[self.master_sheet] = store.columns
+            row_counts[self.master_sheet] = store.row_count()
+            result['master_rows_appended'] = sum(len(e['df']) for e in master_entries)
+            result['master_rows'] = row_counts[self.master_sheet]
+        elif master_entries:
+            # Appending rewrites the Master tab, so only that tab is read back
+            current = None
+            if self.path.exists():
+                with zipfile.ZipFile(self.path) as zf:
+                    if self.master_sheet in dict(sheet_parts(zf)):
+                        current = read_excel(self.path, sheet_name=self.master_sheet)
+
+            if current is not None or self.create_master:
+                master_columns = self.master_columns or master_entries[0]['columns']
+                if current is None:
+                    current = pd.DataFrame(columns=master_columns)
+                appended = [e['df'].reindex(columns=master_columns) for e in master_entries]
+
+                result['master_start_row'] = len(current) + 2
+                result['master_rows_appended'] = sum(len(df) for df in appended)
+
+                master = pd.concat([current.reindex(columns=master_columns)] + appended, ignore_index=True)
+                sheets = {self.master_sheet: master, **sheets}
+                columns[self.master_sheet] = master_columns
+
+        # A new Master becomes the first tab; existing tabs keep their position
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_workbook(self.path, sheets, columns=columns, row_counts=row_counts,
+                       base=self.path, leading=[self.master_sheet])
+
+    def _atomic_save(self, wb):
+        """Save next to the target and move into place so a crash never leaves a torn file"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=f".{self.path.stem}.", suffix=self.path.suffix, dir=self.path.parent)
+        os.close(fd)
+        try:
+            wb.save(tmp)
+            os.replace(tmp, self.path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    # ───────────────────────────────────────────────────────────────
+    # Checkpointing
+    # ───────────────────────────────────────────────────────────────
+
+    def _manifest(self) -> Dict:
+        manifest_path = self.checkpoint_dir / MANIFEST_NAME
+        if manifest_path.exists():
+            return json.loads(manifest_path.read_text(encoding='utf-8'))
+        return {'target': str(self.path), 'sheets': {}}
+
+    def _write_checkpoint(self, sheet_name: str, entry: Dict):
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self._manifest()
+
+        frame_file = f"{len(manifest['sheets']):04d}.pkl"
+        if sheet_name in manifest['sheets']:
+            frame_file = manifest['sheets'][sheet_name]['file']
+        # Frame and manifest are each replaced atomically, the frame first
+        tmp_frame = self.checkpoint_dir / f"{frame_file}.tmp"
+        entry['df'].to_pickle(tmp_frame)
+        os.replace(tmp_frame, self.checkpoint_dir / frame_file)
+
+        manifest['sheets'][sheet_name] = {
+            'file': frame_file,
+            'columns': entry['columns'],
+            'append_to_master': entry['append_to_master'],
+            'rows': len(entry['df'])
+        }
+
+        tmp = self.checkpoint_dir / f"{MANIFEST_NAME}.tmp"
+        tmp.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        os.replace(tmp, self.checkpoint_dir / MANIFEST_NAME)
+
+    def _load_checkpoint(self):
+        if not (self.checkpoint_dir / MANIFEST_NAME).exists():
+            return
+
+        for sheet_name, meta in self._manifest()['sheets'].items():
+            self.sheets[sheet_name] = {
+                'df': pd.read_pickle(self.checkpoint_dir / meta['file']),
+                'columns': meta['columns'],
+                'append_to_master': meta['append_to_master']
+            }
+            self.resumed.append(sheet_name)
+
+    def _clear_checkpoint(self):
+        if self.checkpoint_dir is not None and self.checkpoint_dir.exists():
+            shutil.rmtree(self.checkpoint_dir)
@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""
+Parallel xlsx writer
+Render each sheet's XML in a worker process and assemble the .xlsx zip directly
+"""
+
+import os
+import posixpath
+import re
+import struct
+import time
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from xml.sax.saxutils import escape, quoteattr, unescape
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_integer_dtype, is_numeric_dtype
+
+from pricelist.workbook import sheet_parts
+
+# Rows rendered per string chunk before it is fed to the compressor
+RENDER_CHUNK_ROWS = 20000
+
+# Characters not allowed in XML 1.0 (openpyxl raises on these; we drop them)
+ILLEGAL_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+EXCEL_EPOCH = pd.Timestamp('1899-12-30')
+
+# A sheet is a frame, or a picklable zero-argument callable yielding frames
+SheetSource = Union[pd.DataFrame, Callable[[], Iterable[pd.DataFrame]]]
+
+NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+NS_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+XML_DECL = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CELL / SHEET RENDERING
+# ═══════════════════════════════════════════════════════════════════
+
+def column_letter(idx: int) -> str:
+    """1-based column index to letters (1 -> A, 27 -> AA)"""
+    letters = ''
+    while idx:
+        idx, rem = divmod(idx - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _text_cell(value) -> str:
+    text = ILLEGAL_XML_CHARS.sub('', str(value))
+    space = ' xml:space="preserve"' if text[:1].isspace() or text[-1:].isspace() else ''
+    return f'<is><t{space}>{escape(text)}</t></is>'
+
+
+def _render_value(ref: str, value, date_style: int = 1) -> str:
+    """Render one cell of an object column"""
+    if value is None or value is pd.NA or value is pd.NaT:
+        return ''
+    if isinstance(value, (float, np.floating)) and not np.isfinite(value):
+        return ''
+    if isinstance(value, (bool, np.bool_)):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    if isinstance(value, (datetime, date)):
+        serial = (pd.Timestamp(value) - EXCEL_EPOCH) / pd.Timedelta(days=1)
+        return f'<c r="{ref}" s="{date_style}"><v>{serial}</v></c>'
+    return f'<c r="{ref}" t="inlineStr">{_text_cell(value)}</c>'
+
+
+def _column_cells(series: pd.Series, refs: pd.Series, date_style: int = 1) -> pd.Series:
+    """Render a whole column of cells, vectorised for typed columns"""
+    if is_bool_dtype(series) and not series.isna().any():
+        text = pd.Series(series.astype(int).to_numpy(), dtype=object).map(str).to_numpy()
+        return '<c r="' + refs + '" t="b"><v>' + text + '</v></c>'
+
+    if is_integer_dtype(series) and not series.isna().any():
+        text = pd.Series(series.to_numpy(), dtype=object).map(str).to_numpy()
+        return '<c r="' + refs + '"><v>' + text + '</v></c>'
+
+    if is_numeric_dtype(series) and not is_bool_dtype(series):
+        values = series.astype(float)
+        finite = np.isfinite(values.to_numpy())
+        text = pd.Series(values.to_numpy(), dtype=object).map(str).to_numpy()
+        cells = '<c r="' + refs + '"><v>' + text + '</v></c>'
+        return cells.where(finite, '')
+
+    if is_datetime64_any_dtype(series):
+        serial = ((series - EXCEL_EPOCH) / pd.Timedelta(days=1)).to_numpy()
+        text = pd.Series(serial, dtype=object).map(str).to_numpy()
+        cells = '<c r="' + refs + f'" s="{date_style}"><v>' + text + '</v></c>'
+        return cells.where(series.notna().to_numpy(), '')
+
+    return pd.Series([_render_value(ref, value, date_style) for ref, value in zip(refs.tolist(), series.tolist())],
+                     dtype=object)
+
+
+def render_rows(df: pd.DataFrame, first_row: int, date_style: int = 1):
+    """Yield XML for the frame's rows, ``RENDER_CHUNK_ROWS`` at a time"""
+    letters = [column_letter(i) for i in range(1, df.shape[1] + 1)]
+
+    for start in range(0, len(df), RENDER_CHUNK_ROWS):
+        chunk = df.iloc[start:start + RENDER_CHUNK_ROWS]
+        rownums = pd.Series(range(first_row + start, first_row + start + len(chunk)), dtype=object).map(str)
+
+        rows = '<row r="' + rownums + '">'
+        for pos, letter in enumerate(letters):
+            column = chunk.iloc[:, pos].reset_index(drop=True)
+            rows = rows + _column_cells(column, letter + rownums, date_style)
+        rows = rows + '</row>'
+
+        yield ''.join(rows.tolist())
+
+
+def _render_sheet(job: Tuple[SheetSource, Sequence[str], int, Optional[int], int]) -> Tuple[int, bytes, int, int]:
+    """
+    Worker: render one worksheet part and deflate it.
+
+    The source is a frame or a zero-argument callable yielding frames, which
+    are rendered one after another so the sheet never has to exist as a
+    single frame. Returns (crc32, compressed bytes, uncompressed size, rows)
+    so the parent only has to copy the compressed stream into the zip.
+    """
+    source, columns, compresslevel, total_rows, date_style = job
+    columns = list(columns)
+    last_col = column_letter(max(len(columns), 1))
+
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+    parts = []
+    crc = 0
+    size = 0
+
+    def feed(text: str):
+        nonlocal crc, size
+        data = text.encode('utf-8')
+        crc = zlib.crc32(data, crc)
+        size += len(data)
+        parts.append(compressor.compress(data))
+
+    # Dimension is only emitted when the row count is known up front
+    dimension = f'<dimension ref="A1:{last_col}{total_rows + 1}"/>' if total_rows is not None else ''
+    header = ''.join(f'<c r="{column_letter(i)}1" t="inlineStr">{_text_cell(name)}</c>'
+                     for i, name in enumerate(columns, 1))
+    feed(f'{XML_DECL}<worksheet xmlns="{NS_MAIN}">{dimension}'
+         f'<sheetData><row r="1">{header}</row>')
+
+    frames = [source] if isinstance(source, pd.DataFrame) else source()
+    next_row = 2
+    for frame in frames:
+        frame = frame.reindex(columns=columns)
+        for chunk in render_rows(frame, next_row, date_style):
+            feed(chunk)
+        next_row += len(frame)
+    feed('</sheetData></worksheet>')
+
+    parts.append(compressor.flush())
+    return crc, b''.join(parts), size, next_row - 2
+
+
+# ═══════════════════════════════════════════════════════════════════
+# ZIP ASSEMBLY
+# ═══════════════════════════════════════════════════════════════════
+
+class ZipAssembler:
+    """Minimal zip writer that accepts already-deflated member data"""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.entries = []
+        now = time.localtime()
+        self.dos_time = (now.tm_hour << 11) | (now.tm_min << 5) | (now.tm_sec // 2)
+        self.dos_date = ((now.tm_year - 1980) << 9) | (now.tm_mon << 5) | now.tm_mday
+
+    def add(self, name: str, data: bytes, compresslevel: int = 6):
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        self.add_deflated(name, zlib.crc32(data), compressed, len(data))
+
+    def add_deflated(self, name: str, crc: int, compressed: bytes, size: int, method: int = 8):
+        """Add member data already compressed with ``method`` (8 = deflate, 0 = stored)"""
+        if size > 0xFFFFFFFF or len(compressed) > 0xFFFFFFFF:
+            raise ValueError(f"Zip member too large for non-zip64 archive: {name}")
+
+        encoded = name.encode('utf-8')
+        offset = self.fh.tell()
+        self.fh.write(struct.pack('<IHHHHHIIIHH', 0x04034b50, 20, 0x800, method,
+                                  self.dos_time, self.dos_date, crc, len(compressed), size, len(encoded), 0))
+        self.fh.write(encoded)
+        self.fh.write(compressed)
+        self.entries.append((encoded, crc, len(compressed), size, offset, method))
+
+    def copy(self, src: zipfile.ZipFile, info: zipfile.ZipInfo):
+        """Copy a member of another archive without inflating it"""
+        if info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            self.add(info.filename, src.read(info))
+            return
+
+        fh = src.fp
+        fh.seek(info.header_offset)
+        name_len, extra_len = struct.unpack('<HH', fh.read(30)[26:30])
+        fh.seek(info.header_offset + 30 + name_len + extra_len)
+        self.add_deflated(info.filename, info.CRC, fh.read(info.compress_size), info.file_size,
+                          info.compress_type)
+
+    def close(self):
+        cd_offset = self.fh.tell()
+        for encoded, crc, csize, usize, offset, method in self.entries:
+            self.fh.write(struct.pack('<IHHHHHHIIIHHHHHII', 0x02014b50, 20, 20, 0x800, method,
+                                      self.dos_time, self.dos_date, crc, csize, usize,
+                                      len(encoded), 0, 0, 0, 0, 0, offset))
+            self.fh.write(encoded)
+        cd_size = self.fh.tell() - cd_offset
+        if cd_offset > 0xFFFFFFFF:
+            raise ValueError("Workbook too large for non-zip64 archive")
+        self.fh.write(struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, len(self.entries), len(self.entries),
+                                  cd_size, cd_offset, 0))
+
+
+def _package_parts(sheet_names: List[str]) -> Dict[str, str]:
+    """workbook.xml, rels, content types and styles matching the sheet list"""
+    sheets = ''.join(f'<sheet name={quoteattr(name)} sheetId="{i}" r:id="rId{i}"/>'
+                     for i, name in enumerate(sheet_names, 1))
+    sheet_rels = ''.join(f'<Relationship Id="rId{i}" Type="{NS_REL}/worksheet" '
+                         f'Target="worksheets/sheet{i}.xml"/>' for i in range(1, len(sheet_names) + 1))
+    styles_id = len(sheet_names) + 1
+    overrides = ''.join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                        f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                        for i in range(1, len(sheet_names) + 1))
+
+    return {
+        '[Content_Types].xml': (
+            f'{XML_DECL}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{overrides}</Types>'
+        ),
+        '_rels/.rels': (
+            f'{XML_DECL}<Relationships xmlns="{NS_PKG_REL}">'
+            f'<Relationship Id="rId1" Type="{NS_REL}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ),
+        'xl/workbook.xml': (
+            f'{XML_DECL}<workbook xmlns="{NS_MAIN}" xmlns:r="{NS_REL}">'
+            f'<sheets>{sheets}</sheets></workbook>'
+        ),
+        'xl/_rels/workbook.xml.rels': (
+            f'{XML_DECL}<Relationships xmlns="{NS_PKG_REL}">{sheet_rels}'
+            f'<Relationship Id="rId{styles_id}" Type="{NS_REL}/styles" Target="styles.xml"/>'
+            '</Relationships>'
+        ),
+        # cellXfs 0 = general, 1 = date (numFmt 22: m/d/yy h:mm)
+        'xl/styles.xml': (
+            f'{XML_DECL}<styleSheet xmlns="{NS_MAIN}">'
+            '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+            '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+            '<fill><patternFill patternType="gray125"/></fill></fills>'
+            '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+            '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+            '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+            '</styleSheet>'
+        ),
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════
+# EXISTING WORKBOOKS
+# ═══════════════════════════════════════════════════════════════════
+
+SHEET_ELEMENT = re.compile(r'<((?:\w+:)?)sheet\s[^>]*?/>')
+DATE_XF = 'xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+WORKSHEET_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+
+
+def _attr_value(element: str, name: str) -> Optional[str]:
+    match = re.search(rf'\s{name}="([^"]*)"', element)
+    return unescape(match.group(1), {'&quot;': '"', '&apos;': "'"}) if match else None
+
+
+def _insert_before_close(xml: str, part: str) -> str:
+    """Insert ``part`` before the root element's closing tag"""
+    close = xml.rindex('</')
+    return xml[:close] + part + xml[close:]
+
+
+def _rels_member(member: str) -> str:
+    folder, name = posixpath.split(member)
+    return f"{folder}/_rels/{name}.rels"
+
+
+class BasePackage:
+    """
+    An existing workbook whose untouched parts are carried over as is.
+
+    Sheets being written replace the worksheet part of an existing sheet of
+    the same name (keeping its position, relationship and tab settings);
+    other sheets are added, ``leading`` ones before the existing tabs.
+    Everything else (untouched sheets, shared strings, styles, drawings,
+    defined names) is copied byte for byte. The rewritten sheets use a date
+    style appended to the existing ``cellXfs``; ``calcChain.xml`` is dropped
+    so Excel rebuilds it.
+    """
+
+    def __init__(self, zf: zipfile.ZipFile, names: List[str], leading: Sequence[str] = ()):
+        self.zf = zf
+        existing = dict(sheet_parts(zf))
+        taken = set(zf.namelist())
+
+        self.members: Dict[str, str] = {}
+        added = []
+        k = 1
+        for name in names:
+            if name in existing:
+                self.members[name] = existing[name]
+                continue
+            while f'xl/worksheets/sheet{k}.xml' in taken:
+                k += 1
+            self.members[name] = f'xl/worksheets/sheet{k}.xml'
+            taken.add(self.members[name])
+            added.append(name)
+
+        self.added = added
+        replaced = [self.members[name] for name in names if name in existing]
+        self.skip = set(replaced) | {_rels_member(member) for member in replaced} | {'xl/calcChain.xml'}
+
+        self.parts: Dict[str, str] = {}
+        self.date_style = 1
+        rel_ids = self._rewrite_rels(added)
+        self._rewrite_workbook(added, rel_ids, [name for name in added if name in set(leading)])
+        self._rewrite_content_types(added)
+
+    def _read(self, member: str) -> str:
+        return self.zf.read(member).decode('utf-8')
+
+    def _rewrite_rels(self, added: List[str]) -> Dict[str, str]:
+        rels = self._read('xl/_rels/workbook.xml.rels')
+        rels = re.sub(r'<(?:\w+:)?Relationship\s[^>]*calcChain[^>]*/>', '', rels)
+        next_id = max([int(n) for n in re.findall(r'\sId="rId(\d+)"', rels)] + [0]) + 1
+
+        rel_ids = {}
+        new = ''
+        for name in added:
+            rel_ids[name] = f'rId{next_id}'
+            target = posixpath.relpath(self.members[name], 'xl')
+            new += f'<Relationship Id="rId{next_id}" Type="{NS_REL}/worksheet" Target="{target}"/>'
+            next_id += 1
+
+        styles = re.search(r'<(?:\w+:)?Relationship\s[^>]*Type="[^"]*/styles"[^>]*/>', rels)
+        if styles is None:
+            new += f'<Relationship Id="rId{next_id}" Type="{NS_REL}/styles" Target="styles.xml"/>'
+            self.parts['xl/styles.xml'] = _package_parts([])['xl/styles.xml']
+        else:
+            target = _attr_value(styles.group(0), 'Target')
+            member = target.lstrip('/') if target.startswith('/') else posixpath.normpath(f"xl/{target}")
+            self.parts[member] = self._add_date_style(self._read(member))
+
+        self.parts['xl/_rels/workbook.xml.rels'] = _insert_before_close(rels, new)
+        return rel_ids
+
+    def _add_date_style(self, styles: str) -> str:
+        match = re.search(r'<((?:\w+:)?)cellXfs\b[^>]*>(.*?)</\1cellXfs>', styles, re.S)
+        if match is None:
+            # No cell formats to extend: dates are written with the default style
+            self.date_style = 0
+            return styles
+
+        prefix = match.group(1)
+        self.date_style = len(re.findall(rf'<{prefix}xf\b', match.group(2)))
+        opening = re.sub(r'\scount="\d+"', '', styles[match.start():match.start(2)])
+        opening = opening[:-1] + f' count="{self.date_style + 1}">'
+        return (styles[:match.start()] + opening + match.group(2) + f'<{prefix}{DATE_XF}'
+                + styles[match.end(2):])
+
+    def _rewrite_workbook(self, added: List[str], rel_ids: Dict[str, str], leading: List[str]):
+        xml = self._read('xl/workbook.xml')
+        elements = list(SHEET_ELEMENT.finditer(xml))
+        prefix = elements[0].group(1) if elements else ''
+        rel_prefix = re.search(rf'xmlns:(\w+)="{re.escape(NS_REL)}"', xml)
+        rel_attr = f'{rel_prefix.group(1)}:id' if rel_prefix else 'r:id'
+        next_sheet_id = max([int(_attr_value(el.group(0), 'sheetId') or 0) for el in elements] + [0]) + 1
+
+        def element(name: str) -> str:
+            nonlocal next_sheet_id
+            next_sheet_id += 1
+            return f'<{prefix}sheet name={quoteattr(name)} sheetId="{next_sheet_id - 1}" {rel_attr}="{rel_ids[name]}"/>'
+
+        head = ''.join(element(name) for name in leading)
+        tail = ''.join(element(name) for name in added if name not in leading)
+        if elements:
+            xml = xml[:elements[-1].end()] + tail + xml[elements[-1].end():]
+            xml = xml[:elements[0].start()] + head + xml[elements[0].start():]
+        else:
+            close = xml.index(f'</{prefix}sheets>')
+            xml = xml[:close] + head + tail + xml[close:]
+
+        # Sheet-scoped names and the active tab refer to sheet positions
+        if leading:
+            shift = lambda m: f'{m.group(1)}{int(m.group(2)) + len(leading)}"'
+            xml = re.sub(r'(\s(?:localSheetId|activeTab|firstSheet)=")(\d+)"', shift, xml)
+
+        self.parts['xl/workbook.xml'] = xml
+
+    def _rewrite_content_types(self, added: List[str]):
+        types = self._read('[Content_Types].xml')
+        types = re.sub(r'<(?:\w+:)?Override\s[^>]*calcChain[^>]*/>', '', types)
+        new = ''.join(f'<Override PartName="/{self.members[name]}" ContentType="{WORKSHEET_TYPE}"/>'
+                      for name in added)
+        if 'spreadsheetml.styles+xml' not in types:
+            new += ('<Override PartName="/xl/styles.xml" '
+                    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>')
+        self.parts['[Content_Types].xml'] = _insert_before_close(types, new)
+
+    def assemble(self, zipper: 'ZipAssembler', rendered: Dict[str, Tuple[int, bytes, int, int]]):
+        """Write the merged package: rewritten parts, copied parts and rendered sheets"""
+        sheet_data = {self.members[name]: data for name, data in rendered.items()}
+        zipper.add('[Content_Types].xml', self.parts['[Content_Types].xml'].encode('utf-8'))
+
+        for info in self.zf.infolist():
+            member = info.filename
+            if member == '[Content_Types].xml' or (member in self.skip and member not in sheet_data):
+                continue
+            if member in self.parts:
+                zipper.add(member, self.parts.pop(member).encode('utf-8'))
+            elif member in sheet_data:
+                crc, compressed, size, _rows = sheet_data.pop(member)
+                zipper.add_deflated(member, crc, compressed, size)
+            else:
+                zipper.copy(self.zf, info)
+
+        self.parts.pop('[Content_Types].xml')
+        for member, xml in self.parts.items():
+            zipper.add(member, xml.encode('utf-8'))
+        for member, (crc, compressed, size, _rows) in sheet_data.items():
+            zipper.add_deflated(member, crc, compressed, size)
+
+
+def write_workbook(path, sheets: Dict[str, SheetSource], columns: Optional[Dict[str, Sequence[str]]] = None,
+                   row_counts: Optional[Dict[str, int]] = None, max_workers: Optional[int] = None,
+                   compresslevel: int = 6, base=None, leading: Sequence[str] = ()) -> Dict:
+    """
+    Write ``{sheet name: frame}`` to an .xlsx file.
+
+    Each sheet is rendered (inline strings, no shared-strings table) and
+    deflated in its own worker process, so wall time tracks the largest
+    sheet rather than the sum. ``columns`` optionally fixes the column order
+    per sheet (required for streamed sources) and ``row_counts`` supplies
+    the dimension for streamed sources. Values only: no fonts, widths or
+    other formatting.
+
+    With an existing ``base`` workbook only ``sheets`` are rendered; every
+    other part is copied from ``base`` unchanged (see ``BasePackage``) and
+    new sheets named in ``leading`` go before its tabs.
+    """
+    started = time.perf_counter()
+    names = [name[:31] for name in sheets]
+    if len(set(names)) != len(names):
+        raise ValueError("Sheet names must be unique after truncation to 31 characters")
+
+    tmp = f"{path}.tmp"
+    base_zip = zipfile.ZipFile(base) if base is not None and os.path.exists(base) else None
+    try:
+        try:
+            package = BasePackage(base_zip, names, [name[:31] for name in leading]) if base_zip else None
+            date_style = package.date_style if package else 1
+
+            columns = columns or {}
+            row_counts = row_counts or {}
+            jobs = []
+            for name, source in sheets.items():
+                if isinstance(source, pd.DataFrame):
+                    jobs.append((source, list(columns.get(name, source.columns)), compresslevel, len(source),
+                                 date_style))
+                else:
+                    jobs.append((source, list(columns[name]), compresslevel, row_counts.get(name), date_style))
+
+            workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+            if workers > 1:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    rendered = list(pool.map(_render_sheet, jobs))
+            else:
+                rendered = [_render_sheet(job) for job in jobs]
+
+            with open(tmp, 'wb') as fh:
+                zipper = ZipAssembler(fh)
+                if package is not None:
+                    package.assemble(zipper, dict(zip(names, rendered)))
+                else:
+                    for part_name, xml in _package_parts(names).items():
+                        zipper.add(part_name, xml.encode('utf-8'))
+                    for i, (crc, compressed, size, _rows) in enumerate(rendered, 1):
+                        zipper.add_deflated(f'xl/worksheets/sheet{i}.xml', crc, compressed, size)
+                zipper.close()
+        finally:
+            if base_zip is not None:
+                base_zip.close()
+        os.replace(tmp, path)
+    finally:
+        # A failed render or assembly must not leave a partial file next to the output
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    return {
+        'sheets': len(names),
+        'rows': sum(r[3] for r in rendered),
+        'bytes': os.path.getsize(path),
+        'seconds': round(time.perf_counter() - started, 3)
+    }
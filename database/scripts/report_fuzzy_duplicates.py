@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Report fuzzy duplicate SKUs in the Master tabs of a consolidated workbook."""
+
+import argparse
+import sys
+from pathlib import Path
+
+from pricelist.dedupe import MATCH_THRESHOLD, cluster_summary, duplicate_clusters, duplicate_report
+from pricelist.readers import Workbook
+from pricelist.writer import BATCH2_MASTER_SHEET, MASTER_SHEET, MASTER_SHEETS
+
+DEFAULT_FILE = '/mnt/k/00Project/MantisNXT/database/Uploads/Consolidated_Supplier_Data.xlsx'
+
+# Default supplier, brand, SKU and description columns per tab
+TAB_COLUMNS = {
+    MASTER_SHEET: ('Supplier Name ', 'BRAND', 'SKU / MODEL ', 'PRODUCT DESCRIPTION'),
+    BATCH2_MASTER_SHEET: ('Supplier', 'Brand', 'SKU', 'Product Description'),
+}
+
+
+def scan_sheet(df, sheet, args, output):
+    """Cluster one tab's SKUs and save its report; returns False when columns are missing"""
+    supplier, brand, sku, description = TAB_COLUMNS.get(sheet, TAB_COLUMNS[MASTER_SHEET])
+    supplier = args.supplier or supplier
+    brand = brand if args.brand is None else args.brand
+    sku = args.sku or sku
+
+    missing = [col for col in [sku, brand, supplier] if col and col not in df.columns]
+    if missing:
+        print(f"❌ [{sheet}] Columns not found: {missing}")
+        return False
+
+    group_by = [] if args.across_suppliers else [supplier]
+    clusters = duplicate_clusters(df, sku, brand=brand or None, group_by=group_by, threshold=args.threshold)
+    summary = cluster_summary(clusters)
+
+    print(f"🔍 [{sheet}] {len(df):,} rows scanned")
+    print(f"   Clusters:          {summary['clusters']:,}")
+    print(f"   Rows in clusters:  {summary['clustered_rows']:,}")
+    print(f"   Exact duplicates:  {summary['exact_duplicates']:,}")
+    print(f"   Fuzzy candidates:  {summary['fuzzy_candidates']:,}")
+
+    columns = [col for col in [supplier, brand, sku, description] if col and col in df.columns]
+    duplicate_report(df, clusters, columns).to_csv(output, index=False)
+    print(f"✅ Report saved: {output}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('file', nargs='?', default=DEFAULT_FILE, help='Workbook to scan')
+    parser.add_argument('--sheet', action='append',
+                        help=f"Sheet to scan, repeatable (default: {' and '.join(MASTER_SHEETS)})")
+    parser.add_argument('--sku', help='SKU column (default: per tab)')
+    parser.add_argument('--brand', help='Brand column ("" to skip brand blocking; default: per tab)')
+    parser.add_argument('--supplier',
+                        help='Supplier column; only SKUs of the same supplier are compared (default: per tab)')
+    parser.add_argument('--across-suppliers', action='store_true',
+                        help='Compare SKUs across suppliers instead of within each')
+    parser.add_argument('--threshold', type=float, default=MATCH_THRESHOLD, help='Minimum similarity')
+    parser.add_argument('--output', help='CSV report path (default: next to the workbook, one per tab)')
+    args = parser.parse_args()
+
+    path = Path(args.file)
+    with Workbook(path) as book:
+        sheets = args.sheet or [sheet for sheet in MASTER_SHEETS if sheet in book.sheet_names]
+        if not sheets:
+            print(f"❌ No Master tab in {path.name}")
+            return 1
+
+        ok = True
+        for sheet in sheets:
+            print(f"📖 Reading {path.name} [{sheet}]...")
+            df = book.parse(sheet)
+            output = Path(args.output) if args.output else path.with_name(f"{path.stem}_duplicate_clusters.csv")
+            if len(sheets) > 1:
+                output = output.with_name(f"{output.stem}_{sheet.lower().replace(' ', '_')}{output.suffix}")
+            ok = scan_sheet(df, sheet, args, output) and ok
+
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())